@@ -2,9 +2,21 @@ import os
 import logging
 import json
 import datetime
-from flask import Flask, render_template, request, jsonify, session
-from image_recognition import ImageRecognizer
-import trafilatura
+from flask import Flask, render_template, request, jsonify, session, Response, url_for
+from memory_report import process_memory
+from prediction_jobs import JobManager, JobQueueFull
+from expiry_dates import parse_date
+from model_loader import LazyModel
+from recipe_index import RecipeIndex, RECIPES
+from recipe_store import (init_store, search_recipes, paginate_recipes, get_recipes_by_ids, load_recipe_matrix,
+                          catalogue_signature, parse_limit, InvalidQuery)
+from recipe_ranking import RecipeMatrix, RecipeRanker, fridge_weights
+from recipe_sources import search_sources, DEFAULT_SOURCE_TIMEOUT as ONLINE_RECIPE_SOURCE_TIMEOUT
+from http_client import HttpClient
+from recipe_crawler import OnlineRecipeIndex
+from scrape_cache import (ScrapeCache, normalize_key, DEFAULT_PAGE_TTL as SCRAPE_CACHE_PAGE_TTL,
+                          DEFAULT_SEARCH_TTL as SCRAPE_CACHE_SEARCH_TTL)
+import startup_profile
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -14,17 +26,79 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "ecooklogically-test-key")
 
-# Initialize the image recognizer
-image_recognizer = ImageRecognizer()
+# Mit STARTUP_PROFILE die Latenz der ersten Anfrage je Endpunkt messen
+if startup_profile.active() is not None:
+    startup_profile.active().attach(app)
+
+def create_image_recognizer():
+    # torch/torchvision erst hier importieren, damit der Start der App nicht darauf wartet
+    from image_recognition import ImageRecognizer
+    return ImageRecognizer()
+
+# Initialize the image recognizer (im Hintergrund, mit Aufwärm-Durchlauf; siehe /readyz)
+def record_model_load(loader):
+    startup_profile.record_phase('model_load', loader.load_seconds, mode=loader.mode)
+    startup_profile.record_phase('model_warm_up', loader.warm_up_seconds or 0.0)
+
+image_recognizer = LazyModel(create_image_recognizer, warm_up=lambda recognizer: recognizer.warm_up(),
+                             name="image recognizer", on_ready=record_model_load).start()
+
+# Rezeptkatalog in der Datenbank (SQLite lokal, PostgreSQL über DATABASE_URL), beim ersten Start
+# mit den eingebauten Rezepten befüllt
+recipe_store_enabled = False
+if os.environ.get("RECIPE_STORE", "1").lower() in ("1", "true", "yes"):
+    try:
+        init_store(app, seed=RECIPES)
+        recipe_store_enabled = True
+    except Exception as e:
+        logger.error(f"Rezeptdatenbank nicht verfügbar, verwende den eingebauten Katalog: {str(e)}")
+
+# Ohne Datenbank: eingebauter Katalog, einmal beim Start indexiert
+recipe_index = RecipeIndex(RECIPES)
+recipes_by_id = {recipe["id"]: recipe for recipe in RECIPES}
+
+# Rezept x Zutat-Matrix für das Ranking nach Vorräten (sort=match), beim ersten Aufruf aufgebaut
+if recipe_store_enabled:
+    recipe_ranker = RecipeRanker(load_recipe_matrix, catalogue_signature)
+else:
+    recipe_ranker = RecipeRanker(lambda: RecipeMatrix.from_recipes(RECIPES))
+
+# Maximale Anzahl Bilder pro Anfrage an /predict/batch
+MAX_BATCH_FILES = int(os.environ.get("BATCH_PREDICT_MAX_FILES", "32"))
+
+def analyze_image(image_file, **kwargs):
+    # Jobs werden erst angenommen, wenn das Modell bereit ist
+    return image_recognizer.wait().analyze(image_file, **kwargs)
+
+# Asynchrone Vorhersage-Jobs (POST /predict?async=1); Status und Ergebnisse liegen in
+# instance/prediction_jobs.db, damit jeder gunicorn-Worker Abfragen zu jedem Job beantworten kann
+prediction_jobs = JobManager(analyze_image)
+
+def model_not_ready():
+    """503-Antwort, solange das Modell noch geladen wird"""
+    response = jsonify({'error': 'Die Bilderkennung wird noch geladen, bitte gleich erneut versuchen',
+                        'status': image_recognizer.state})
+    response.headers['Retry-After'] = str(image_recognizer.retry_after)
+    return response, 503
+
+# Gemeinsamer HTTP-Client für das Scraping (Keep-Alive je Host, Timeouts, Größenlimit)
+scrape_client = HttpClient(read_timeout=ONLINE_RECIPE_SOURCE_TIMEOUT)
 
 # Web scraper function for recipes
-def get_website_text_content(url: str) -> str:
+def get_website_text_content(url: str, timeout: float = ONLINE_RECIPE_SOURCE_TIMEOUT) -> str:
     """
     Extracts main text content from a website using trafilatura.
     Useful for scraping recipe websites.
+    The download uses the shared scrape_client and gives up after timeout
+    seconds.
     """
     try:
-        downloaded = trafilatura.fetch_url(url)
+        # trafilatura (mit lxml) erst bei der ersten Rezeptsuche laden, nicht beim Start
+        import trafilatura
+        downloaded = scrape_client.fetch(url, timeout=timeout)
+        if downloaded is None:
+            return ""
+        # Rohes HTML (bytes) direkt übergeben, trafilatura erkennt die Kodierung selbst
         text = trafilatura.extract(downloaded)
         return text or ""
     except Exception as e:
@@ -55,216 +129,234 @@ def predict():
         # Log file details for debugging
         logger.info(f"Verarbeite Bild: {file.filename}, Typ: {file.content_type}")
         
+        recognizer = image_recognizer.get()
+        if recognizer is None:
+            logger.warning("Bilderkennung noch nicht bereit, Anfrage abgelehnt")
+            return model_not_ready()
+        
+        # Asynchroner Modus: Job anlegen und sofort die Job-ID zurückgeben
+        if request.args.get('async', '').lower() in ('1', 'true'):
+            try:
+                job = prediction_jobs.submit(file.read(), file.filename)
+            except JobQueueFull as e:
+                logger.warning("Vorhersage-Warteschlange voll, Anfrage abgelehnt")
+                response = jsonify({'error': 'Zu viele Anfragen, bitte später erneut versuchen'})
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+            
+            return jsonify({
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': url_for('get_prediction_job', job_id=job.id),
+                'events_url': url_for('stream_prediction_job', job_id=job.id)
+            }), 202
+        
+        # Mit ?calendar=1 wird das erkannte Produkt mit seinem MHD direkt in den Kalender eingetragen
+        add_to_calendar = request.args.get('calendar', '').lower() in ('1', 'true')
+        
         # Get predictions
-        predictions = image_recognizer.predict(file)
+        analysis = recognizer.analyze(file, require_text=add_to_calendar)
+        predictions = analysis['predictions']
+        expiry_dates = analysis.get('expiry_dates', [])
         logger.debug(f"Predictions: {predictions}")
         
         # Store the most recent prediction in session
         if predictions and len(predictions) > 0:
             session['last_prediction'] = predictions[0]['class_description']
         
+        response = {'predictions': predictions, 'expiry_dates': expiry_dates, 'metadata': analysis['metadata']}
+        if add_to_calendar:
+            if predictions and expiry_dates:
+                response['calendar_item'] = add_calendar_item({
+                    'product': predictions[0]['class_description'],
+                    'expiryDate': expiry_dates[0]['date'],
+                    'fromScanner': True,
+                    'notes': f"MHD erkannt: {expiry_dates[0]['text']}"
+                })
+            else:
+                response['calendar_item'] = None
+                logger.info("Kein MHD erkannt, kein Kalendereintrag erstellt")
+        
         # Return all predictions - frontend will show only the top one
-        return jsonify({'predictions': predictions})
+        return jsonify(response)
     
     except Exception as e:
         logger.exception("Fehler bei der Vorhersage")
         return jsonify({'error': f'Fehler bei der Bildverarbeitung: {str(e)}'}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Verarbeitet mehrere Bilder in einer Anfrage (z.B. ein ganzes Regal)"""
+    try:
+        files = [f for f in request.files.getlist('images') + request.files.getlist('image') if f.filename != '']
+        if not files:
+            logger.error("Keine Bilder in der Batch-Anfrage")
+            return jsonify({'error': 'Keine Bilder hochgeladen'}), 400
+        
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({'error': f'Maximal {MAX_BATCH_FILES} Bilder pro Anfrage erlaubt'}), 400
+        
+        recognizer = image_recognizer.get()
+        if recognizer is None:
+            logger.warning("Bilderkennung noch nicht bereit, Batch-Anfrage abgelehnt")
+            return model_not_ready()
+        
+        filenames = [f.filename for f in files]
+        images = [f.read() for f in files]
+        logger.info(f"Verarbeite {len(images)} Bilder im Batch")
+        
+        # Teilergebnisse als NDJSON streamen, sobald sie fertig sind
+        if request.args.get('stream', '').lower() in ('1', 'true'):
+            def generate():
+                try:
+                    for index, analysis in recognizer.iter_analyze_batch(images):
+                        yield json.dumps({'index': index, 'filename': filenames[index], **analysis}) + '\n'
+                except Exception as e:
+                    logger.exception("Fehler bei der Batch-Vorhersage")
+                    yield json.dumps({'error': f'Fehler bei der Bildverarbeitung: {str(e)}'}) + '\n'
+            
+            return Response(generate(), mimetype='application/x-ndjson',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+        # Ergebnisse in der Reihenfolge der hochgeladenen Dateien zurückgeben
+        results = [None] * len(images)
+        for index, analysis in recognizer.iter_analyze_batch(images):
+            results[index] = {'index': index, 'filename': filenames[index], **analysis}
+        
+        return jsonify({'results': results})
+    
+    except Exception as e:
+        logger.exception("Fehler bei der Batch-Vorhersage")
+        return jsonify({'error': f'Fehler bei der Bildverarbeitung: {str(e)}'}), 500
+
+@app.route('/predict/jobs/<job_id>', methods=['GET'])
+def get_prediction_job(job_id):
+    """Liefert Status und (Zwischen-)Ergebnisse eines asynchronen Vorhersage-Jobs"""
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    # Clients, die einen Event-Stream erwarten, bekommen direkt den SSE-Stream
+    if request.accept_mimetypes.best == 'text/event-stream':
+        return stream_prediction_job(job_id)
+    
+    return jsonify(job.to_dict())
+
+@app.route('/predict/jobs/<job_id>/events', methods=['GET'])
+def stream_prediction_job(job_id):
+    """Server-Sent Events: erst die Bildklassifikation, dann das Ergebnis der Texterkennung"""
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    return Response(prediction_jobs.stream(job), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Liefert Laufzeitmetriken (z.B. Batchgröße und Wartezeit der Bilderkennung)"""
+    recognizer = image_recognizer.get()
+    metrics = recognizer.get_metrics() if recognizer is not None else {}
+    metrics['model'] = image_recognizer.get_metrics()
+    metrics['jobs'] = prediction_jobs.get_metrics()
+    metrics['scrape_client'] = scrape_client.get_metrics()
+    if online_recipe_index is not None:
+        metrics['online_recipe_index'] = online_recipe_index.get_metrics()
+    metrics['scrape_cache'] = {'pages': page_cache.get_metrics(), 'search': search_cache.get_metrics()}
+    # Speicherverbrauch des Workers, der diese Anfrage beantwortet
+    metrics['memory'] = process_memory()
+    return jsonify(metrics)
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: der Prozess läuft und beantwortet Anfragen"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: das Modell ist geladen und aufgewärmt"""
+    status = image_recognizer.get_metrics()
+    if image_recognizer.ready:
+        return jsonify(status)
+    response = jsonify(status)
+    response.headers['Retry-After'] = str(image_recognizer.retry_after)
+    return response, 503
+
 @app.route('/recipes', methods=['GET'])
 def get_recipes():
-    """Get recipe suggestions based on ingredients"""
+    """
+    Get recipe suggestions based on ingredients
+    
+    Query parameters: ingredients (comma-separated), healthy, vegetarian, vegan,
+    q (full-text search in names and descriptions), sort (id, duration,
+    difficulty; "-" prefix for descending), limit and cursor (next_cursor of
+    the previous page)
+    
+    With sort=match the best recipes for the given ingredients (and, with
+    from_calendar=true, the calendar entries weighted by expiry) are ranked
+    instead; each recipe then carries a 'match' object with the score.
+    """
     try:
         ingredients = request.args.get('ingredients', '')
         healthy_only = request.args.get('healthy', 'false').lower() == 'true'
         vegetarian = request.args.get('vegetarian', 'false').lower() == 'true'
         vegan = request.args.get('vegan', 'false').lower() == 'true'
+        query = request.args.get('q', '').strip()
+        sort = request.args.get('sort', 'id')
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
         
         # Log the search parameters
-        logger.info(f"Rezeptsuche: Zutaten={ingredients}, Gesund={healthy_only}, Vegetarisch={vegetarian}, Vegan={vegan}")
-        
-        # Bei einer echten Anwendung würden wir eine Rezept-API verwenden oder eine eigene Datenbank haben
-        # Wir erstellen realistische Rezepte mit echten URLs und Bildern
-        all_recipes = [
-            {
-                "id": 1,
-                "name": "Einfache Pfannkuchen",
-                "ingredients": ["Mehl", "Eier", "Milch", "Salz", "Butter", "Zucker"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1544413964-e694753a3ce0?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 20,
-                "difficulty": "Einfach",
-                "source": "Chefkoch",
-                "url": "https://www.chefkoch.de/rezepte/966751202449923/Pfannkuchen-Crepes-Pfannkuchenteig.html",
-                "description": "Klassische Pfannkuchen mit wenigen Zutaten schnell zubereitet."
-            },
-            {
-                "id": 2,
-                "name": "Eierkuchen mit Apfelmus",
-                "ingredients": ["Mehl", "Eier", "Milch", "Apfelmus", "Zimt", "Zucker"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1509365465985-25d11c17e812?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 25,
-                "difficulty": "Einfach",
-                "source": "Küchengötter",
-                "url": "https://www.kuechengoetter.de/rezepte/pfannkuchen-mit-apfelmus-und-zimt-14292",
-                "description": "Eine fruchtige Variante der klassischen Pfannkuchen mit selbstgemachtem Apfelmus."
-            },
-            {
-                "id": 3,
-                "name": "Französische Crêpes",
-                "ingredients": ["Mehl", "Eier", "Milch", "Butter", "Vanillezucker", "Salz"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1519676867240-f03562e64548?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 30,
-                "difficulty": "Mittel",
-                "source": "Essen und Trinken",
-                "url": "https://www.essen-und-trinken.de/rezepte/56295-rzpt-crepes",
-                "description": "Hauchdünne französische Crêpes, perfekt mit süßen oder herzhaften Füllungen."
-            },
-            {
-                "id": 4,
-                "name": "Schneller Brokkoliauflauf mit Feta",
-                "ingredients": ["Brokkoli", "Feta", "Eier", "Sahne", "Zwiebeln", "Knoblauch"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1608614169738-6d041e32c91f?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 40,
-                "difficulty": "Einfach",
-                "source": "Lecker",
-                "url": "https://www.lecker.de/brokkoli-feta-auflauf-so-einfach-gehts-77502.html",
-                "description": "Gesunder Gemüseauflauf mit cremiger Fetakäse-Note."
-            },
-            {
-                "id": 5,
-                "name": "Vollkorn-Spaghetti mit Linsenbolognese",
-                "ingredients": ["Vollkornspaghetti", "Linsen", "Tomaten", "Karotten", "Zwiebeln", "Knoblauch"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": True,
-                "image_url": "https://images.unsplash.com/photo-1555949258-eb67b1ef0ceb?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 35,
-                "difficulty": "Mittel",
-                "source": "EAT SMARTER",
-                "url": "https://eatsmarter.de/rezepte/vollkornspaghetti-mit-linsenbolognese",
-                "description": "Eine proteinreiche vegane Alternative zur klassischen Bolognese."
-            },
-            {
-                "id": 6,
-                "name": "Schneller Kartoffelsalat",
-                "ingredients": ["Kartoffeln", "Gurke", "Zwiebeln", "Essig", "Öl", "Senf"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": True,
-                "image_url": "https://images.unsplash.com/photo-1594066521341-8d19ddd27e66?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 30,
-                "difficulty": "Einfach",
-                "source": "DasKochrezept",
-                "url": "https://www.daskochrezept.de/rezepte/schneller-kartoffelsalat",
-                "description": "Klassischer deutscher Kartoffelsalat, perfekt als Beilage oder eigenständiges Gericht."
-            },
-            {
-                "id": 7,
-                "name": "Haferflocken-Bananen-Cookies",
-                "ingredients": ["Haferflocken", "Bananen", "Honig", "Rosinen", "Zimt", "Nüsse"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1499636136210-6f4ee915583e?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 25,
-                "difficulty": "Einfach",
-                "source": "Springlane",
-                "url": "https://www.springlane.de/magazin/rezeptideen/bananen-haferflocken-cookies/",
-                "description": "Gesunde Kekse ohne raffiniertem Zucker, perfekt zum Frühstück oder als Snack."
-            },
-            {
-                "id": 8,
-                "name": "Griechischer Bauernsalat",
-                "ingredients": ["Tomaten", "Gurke", "Paprika", "Feta", "Oliven", "Olivenöl", "Zwiebeln"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1503442947665-4bd1ab8694af?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 15,
-                "difficulty": "Einfach",
-                "source": "Simply Yummy",
-                "url": "https://www.simplyyummy.de/rezepte/griechischer-bauernsalat/",
-                "description": "Frischer, mediterraner Salat mit Feta und Oliven, ideal für heiße Sommertage."
-            },
-            {
-                "id": 9,
-                "name": "Veganes Schokoladenmousse",
-                "ingredients": ["Avocado", "Banane", "Kakaopulver", "Agavendicksaft", "Vanille"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": True,
-                "image_url": "https://images.unsplash.com/photo-1614088685677-75369ede2869?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 15,
-                "difficulty": "Einfach",
-                "source": "Bianca Zapatka",
-                "url": "https://biancazapatka.com/de/avocado-schokoladenmousse-vegan/",
-                "description": "Cremiges Dessert ohne tierische Produkte, das mit gesunden Zutaten überzeugt."
-            },
-            {
-                "id": 10,
-                "name": "Apfel-Zimt-Porridge",
-                "ingredients": ["Haferflocken", "Milch", "Äpfel", "Zimt", "Honig", "Nüsse"],
-                "healthy": True,
-                "vegetarian": True,
-                "vegan": False,
-                "image_url": "https://images.unsplash.com/photo-1517673400267-0251440c45dc?q=80&w=600&h=400&auto=format",
-                "duration_minutes": 10,
-                "difficulty": "Einfach",
-                "source": "Kochkarussell",
-                "url": "https://kochkarussell.com/zimt-apfel-porridge/",
-                "description": "Warmes, nahrhaftes Frühstück mit Haferflocken und Äpfeln, perfekt für kalte Tage."
-            }
-        ]
+        logger.info(f"Rezeptsuche: Zutaten={ingredients}, Gesund={healthy_only}, Vegetarisch={vegetarian}, Vegan={vegan}, "
+                    f"Suche={query}, Sortierung={sort}")
         
-        # Suchfunktion anwenden
-        recipes = all_recipes.copy()
+        ingredient_list = ingredients.split(',') if ingredients else None
+        if sort == 'match':
+            return rank_recipes(ingredient_list, healthy_only, vegetarian, vegan, limit)
         
-        # Zutatenfilter anwenden
-        if ingredients:
-            ingredient_list = [i.strip().lower() for i in ingredients.split(',')]
-            filtered_recipes = []
-            
-            for recipe in recipes:
-                # Jede Zutat in der Liste überprüfen
-                ingredient_match = False
-                for ingredient in ingredient_list:
-                    # Prüfen, ob die Zutat in irgendeiner Form in den Rezeptzutaten vorkommt
-                    if any(ingredient in ing.lower() for ing in recipe["ingredients"]):
-                        ingredient_match = True
-                        break
-                
-                if ingredient_match:
-                    filtered_recipes.append(recipe)
-            
-            recipes = filtered_recipes
-        
-        # Andere Filter anwenden
-        if healthy_only:
-            recipes = [r for r in recipes if r["healthy"]]
-        
-        if vegetarian:
-            recipes = [r for r in recipes if r["vegetarian"]]
+        if recipe_store_enabled:
+            # Nur die angeforderte Seite wird aus der Datenbank geladen
+            recipes, next_cursor = search_recipes(ingredient_list, healthy=healthy_only, vegetarian=vegetarian,
+                                                  vegan=vegan, query=query, sort=sort, limit=limit, cursor=cursor)
+        else:
+            # Zutatenfilter und Flags über den beim Start aufgebauten Index (Vereinigung/Schnitt von Bitsets)
+            recipes = recipe_index.search(ingredient_list, healthy=healthy_only, vegetarian=vegetarian, vegan=vegan)
+            if query:
+                terms = query.lower().split()
+                recipes = [r for r in recipes
+                           if all(term in f"{r['name']} {r['description']}".lower() for term in terms)]
+            recipes, next_cursor = paginate_recipes(recipes, sort=sort, limit=limit, cursor=cursor)
         
-        if vegan:
-            recipes = [r for r in recipes if r["vegan"]]
-        
-        return jsonify({"recipes": recipes})
+        return jsonify({"recipes": recipes, "next_cursor": next_cursor})
+    
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
     
     except Exception as e:
         logger.exception("Fehler bei der Rezeptsuche")
         return jsonify({'error': f'Fehler bei der Rezeptsuche: {str(e)}'}), 500
 
+def rank_recipes(ingredient_list, healthy_only, vegetarian, vegan, limit):
+    """Rezepte nach Nutzung der Vorräte sortieren (eine Matrix-Vektor-Multiplikation über alle Rezepte)"""
+    fridge = {item.strip(): 1.0 for item in ingredient_list or [] if item.strip()}
+    if request.args.get('from_calendar', 'false').lower() == 'true':
+        # Bald ablaufende Produkte aus dem Kalender zählen mehr (Verschwendung vermeiden)
+        for product, weight in fridge_weights(session.get('calendar_items', [])).items():
+            fridge[product] = max(fridge.get(product, 0.0), weight)
+    if not fridge:
+        raise InvalidQuery("Für sort=match werden Zutaten oder Kalendereinträge benötigt")
+    
+    ranked = recipe_ranker.rank(fridge, limit=parse_limit(limit), healthy=healthy_only,
+                                vegetarian=vegetarian, vegan=vegan)
+    recipe_ids = [match['recipe_id'] for match in ranked]
+    if recipe_store_enabled:
+        recipes = get_recipes_by_ids(recipe_ids)
+    else:
+        recipes = [recipes_by_id[recipe_id] for recipe_id in recipe_ids]
+    matches = {match['recipe_id']: match for match in ranked}
+    return jsonify({"recipes": [{**recipe, 'match': matches[recipe['id']]} for recipe in recipes],
+                    "next_cursor": None})
+
 @app.route('/health-info', methods=['GET'])
 def get_health_info():
     """Get health information for a food product"""
@@ -525,6 +617,49 @@ def check_expiry():
         return jsonify({'error': f'Fehler bei der MHD-Prüfung: {str(e)}'}), 500
 
 # Routen für Kalender-Funktionen
+def add_calendar_item(data):
+    """
+    Fügt einen Eintrag zum Kalender in der Session hinzu
+    
+    Args:
+        data: Dictionary mit 'product' und 'expiryDate' sowie optionalen Feldern
+        
+    Returns:
+        Der neue Kalendereintrag
+    """
+    # Eindeutige ID erzeugen (in einer echten App würden wir eine Datenbank-ID verwenden)
+    import time
+    entry_id = str(int(time.time() * 1000))
+    
+    # Neuen Eintrag erstellen
+    new_item = {
+        'id': entry_id,
+        'product': data['product'],
+        'expiryDate': data['expiryDate'],
+        'quantity': data.get('quantity', 1),
+        'unit': data.get('unit', 'Stück'),
+        'notes': data.get('notes', ''),
+        'fromScanner': data.get('fromScanner', False),
+        'isEstimated': data.get('isEstimated', False),  # Hinzugefügt für geschätzte MHD-Daten
+        'shelfLifeCategory': data.get('shelfLifeCategory', 'medium')  # Für farbliche Markierung: long (grün), medium (orange), short (rot)
+    }
+    
+    # Formatiere das Ablaufdatum korrekt - stelle sicher, dass es als YYYY-MM-DD Format ist
+    # (DD.MM.YYYY, DD.MM.YY, MM/YY, "12. März 2026" usw.; unbekannte Formate bleiben unverändert)
+    expiry_date = parse_date(data['expiryDate'])
+    if expiry_date and expiry_date != data['expiryDate']:
+        new_item['expiryDate'] = expiry_date
+        logger.info(f"Konvertiertes Datum: {expiry_date} (von {data['expiryDate']})")
+    
+    # Zum Kalender hinzufügen und in Session speichern
+    calendar_items = session.get('calendar_items', []) + [new_item]
+    session['calendar_items'] = calendar_items
+    session.modified = True  # Stelle sicher, dass die Session als geändert markiert wird
+    
+    logger.info(f"Produkt zum Kalender hinzugefügt: {new_item['product']} mit Ablaufdatum {new_item['expiryDate']}")
+    logger.debug(f"Aktuelle Kalendereinträge: {len(session['calendar_items'])} Einträge")
+    return new_item
+
 @app.route('/calendar', methods=['GET', 'POST', 'DELETE'])
 def manage_calendar():
     """Verwaltet Kalendereinträge (Speichern in Session)"""
@@ -546,42 +681,7 @@ def manage_calendar():
             if not all(key in data for key in ['product', 'expiryDate']):
                 return jsonify({'error': 'Produkt und Ablaufdatum sind erforderlich'}), 400
             
-            # Eindeutige ID erzeugen (in einer echten App würden wir eine Datenbank-ID verwenden)
-            import time
-            entry_id = str(int(time.time() * 1000))
-            
-            # Neuen Eintrag erstellen
-            new_item = {
-                'id': entry_id,
-                'product': data['product'],
-                'expiryDate': data['expiryDate'],
-                'quantity': data.get('quantity', 1),
-                'unit': data.get('unit', 'Stück'),
-                'notes': data.get('notes', ''),
-                'fromScanner': data.get('fromScanner', False),
-                'isEstimated': data.get('isEstimated', False),  # Hinzugefügt für geschätzte MHD-Daten
-                'shelfLifeCategory': data.get('shelfLifeCategory', 'medium')  # Für farbliche Markierung: long (grün), medium (orange), short (rot)
-            }
-            
-            # Zum Kalender hinzufügen
-            # Formatiere das Ablaufdatum korrekt - stelle sicher, dass es als YYYY-MM-DD Format ist
-            expiry_date = data['expiryDate']
-            
-            # Wenn das Datum im Format DD.MM.YYYY ist, konvertiere es zu YYYY-MM-DD
-            if '.' in expiry_date and len(expiry_date.split('.')) == 3:
-                day, month, year = expiry_date.split('.')
-                expiry_date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                new_item['expiryDate'] = expiry_date
-                logger.info(f"Konvertiertes Datum: {expiry_date} (von {data['expiryDate']})")
-            
-            # Zum Kalender hinzufügen und in Session speichern
-            calendar_items = session.get('calendar_items', []) + [new_item]
-            session['calendar_items'] = calendar_items
-            session.modified = True  # Stelle sicher, dass die Session als geändert markiert wird
-            
-            logger.info(f"Produkt zum Kalender hinzugefügt: {new_item['product']} mit Ablaufdatum {new_item['expiryDate']}")
-            logger.debug(f"Aktuelle Kalendereinträge: {len(session['calendar_items'])} Einträge")
-            
+            new_item = add_calendar_item(data)
             return jsonify({"success": True, "item": new_item}), 201
         
         # DELETE-Request: Kalendereintrag löschen
@@ -602,6 +702,31 @@ def manage_calendar():
         return jsonify({'error': f'Fehler bei der Kalenderverwaltung: {str(e)}'}), 500
 
 # Webseiten-Scraping für Rezepte (online-Suche)
+# Zwischenspeicher für gescrapte Seiten (nach URL) und fertige Suchergebnisse (nach Suchbegriff)
+page_cache = ScrapeCache('pages', SCRAPE_CACHE_PAGE_TTL)
+search_cache = ScrapeCache('search', SCRAPE_CACHE_SEARCH_TTL)
+
+def get_cached_website_text_content(url):
+    # Fehlgeschlagene Abrufe ("") werden nicht gespeichert
+    return page_cache.get_or_load(url, lambda: get_website_text_content(url))
+
+def search_online_sources(search_term):
+    search_results, source_status = search_sources(search_term, get_cached_website_text_content)
+    return {'results': search_results, 'sources': source_status}
+
+def is_complete_search(online):
+    # Nur vollständige Suchen mit Treffern speichern, sonst käme ein Teilergebnis bis zum Ablauf der TTL
+    return bool(online['results']) and 'timeout' not in online['sources'].values()
+
+# Lokaler Index gecrawlter Rezepte (befüllt per "python recipe_crawler.py crawl" bzw. Cronjob oder
+# unter gunicorn alle RECIPE_CRAWL_INTERVAL_HOURS Stunden aus einem Worker, siehe gunicorn.conf.py)
+ONLINE_RECIPE_INDEX_RESULTS = int(os.environ.get("ONLINE_RECIPE_INDEX_RESULTS", "10"))
+try:
+    online_recipe_index = OnlineRecipeIndex()
+except Exception as e:
+    online_recipe_index = None
+    logger.error(f"Rezeptindex nicht verfügbar, Online-Suche nur live (refresh=1): {str(e)}")
+
 @app.route('/search-online-recipes', methods=['GET'])
 def search_online_recipes():
     """Sucht online nach Rezepten basierend auf Zutaten"""
@@ -652,321 +777,26 @@ def search_online_recipes():
         for eng, ger in german_keywords.items():
             if eng in search_term:
                 search_term = search_term.replace(eng, ger)
+        # Einheitliche Schreibweise, auch als Schlüssel des Ergebnis-Caches
+        search_term = normalize_key(search_term)
         
-        # Verbesserte Suche mit spezifischen Kategorien für verschiedene Lebensmitteltypen
-        # 1. Erkenne spezifische Lebensmittelkategorien für bessere Suchergebnisse
-        def get_food_category(ingredient):
-            ingredient = ingredient.lower()
-            
-            # Kategorien definieren für spezifischere Suche
-            categories = {
-                "obst": ["apfel", "birne", "banane", "erdbeere", "himbeere", "brombeere", "johannisbeere", 
-                        "kirsche", "pfirsich", "orange", "zitrone", "mandarine", "kiwi", "ananas", 
-                        "mango", "melone", "beere", "frucht", "obst"],
-                        
-                "gemüse": ["tomate", "gurke", "karotte", "möhre", "kartoffel", "zwiebel", "knoblauch", 
-                          "paprika", "zucchini", "aubergine", "spinat", "salat", "kohl", "brokkoli", 
-                          "blumenkohl", "rosenkohl", "spargel", "lauch", "gemüse"],
-                          
-                "fleisch": ["rind", "schwein", "huhn", "hähnchen", "pute", "truthahn", "kalb", "lamm", 
-                           "hackfleisch", "schnitzel", "steak", "braten", "filet", "wurst", "fleisch"],
-                           
-                "fisch": ["lachs", "forelle", "thunfisch", "kabeljau", "hering", "makrele", "sardine", 
-                         "scholle", "seelachs", "fisch", "meeresfrüchte", "garnele", "krabbe", "muschel"],
-                         
-                "milchprodukte": ["milch", "käse", "joghurt", "quark", "sahne", "butter", "buttermilch", 
-                                 "frischkäse", "gouda", "edamer", "parmesan", "mozzarella"],
-                                 
-                "getreide": ["mehl", "brot", "brötchen", "toast", "nudel", "pasta", "reis", "müsli", 
-                            "haferflocken", "cornflakes", "getreide"],
-                            
-                "süßes": ["schokolade", "zucker", "honig", "marmelade", "konfitüre", "sirup", "süßigkeit", 
-                          "kuchen", "torte", "keks", "plätzchen", "eis", "dessert"]
-            }
-            
-            for category, items in categories.items():
-                if any(item in ingredient for item in items):
-                    return category
-                    
-            return "allgemein"  # Fallback für nicht kategorisierte Zutaten
-        
-        # Identifiziere Hauptzutat und bestimme Kategorie
-        food_category = get_food_category(search_term)
-        logger.info(f"Erkannte Kategorie für '{search_term}': {food_category}")
-        
-        # Je nach Kategorie verschiedene Suchstrategien verwenden
-        search_strategies = {
-            "obst": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+dessert",
-                f"https://www.kochbar.de/suche.php?q={search_term}+kuchen"
-            ],
-            "gemüse": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+gesund",
-                f"https://www.kochbar.de/suche.php?q={search_term}+pfanne"
-            ],
-            "fleisch": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+braten",
-                f"https://eatsmarter.de/suche/{search_term}"
-            ],
-            "fisch": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+filet",
-                f"https://eatsmarter.de/suche/{search_term}+einfach"
-            ],
-            "milchprodukte": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+auflauf",
-                f"https://www.kochbar.de/suche.php?q={search_term}+sauce"
-            ],
-            "getreide": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+backen",
-                f"https://eatsmarter.de/suche/{search_term}+vollkorn"
-            ],
-            "süßes": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}+rezept/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}+kuchen",
-                f"https://www.kochbar.de/suche.php?q={search_term}+dessert"
-            ],
-            "allgemein": [
-                f"https://www.chefkoch.de/rs/s0/{search_term}/Rezepte.html",
-                f"https://www.lecker.de/suche?query={search_term}",
-                f"https://eatsmarter.de/suche/{search_term}"
-            ]
-        }
+        # Zuerst der lokale Index der gecrawlten Rezepte (Millisekunden statt mehrerer Seitenabrufe)
+        search_results, source_status, partial = [], {}, False
+        if online_recipe_index is not None:
+            search_results = online_recipe_index.search(search_term, limit=ONLINE_RECIPE_INDEX_RESULTS)
+            source_status['index'] = 'ok' if search_results else 'empty'
         
-        # Wähle Suchstrategien basierend auf Kategorie
-        search_urls = search_strategies.get(food_category, search_strategies["allgemein"])
-        
-        # 1. Chefkoch.de durchsuchen - direkter Link zum Rezept mit verbesserter Kategorie-spezifischer Suche
-        try:
-            # Genauere Suche-URL für Chefkoch
-            # Standardisierte URL für bessere Ergebnisse mit URL-Kodierung
-            from urllib.parse import quote
-            encoded_term = quote(search_term)
-            chefkoch_url = f"https://www.chefkoch.de/rs/s0/{encoded_term}/Rezepte.html"
-            chefkoch_content = get_website_text_content(chefkoch_url)
-            
-            # Wenn keine Ergebnisse, versuche alternative URL-Struktur
-            if not chefkoch_content or len(chefkoch_content) < 500:
-                chefkoch_url = f"https://www.chefkoch.de/rs/s0g1/{encoded_term}/Rezepte.html"
-                chefkoch_content = get_website_text_content(chefkoch_url)
-            
-            if chefkoch_content:
-                logger.info(f"Erfolgreicher Abruf von Chefkoch für '{search_term}'")
-                
-                # URLs und Titel extrahieren mit verbesserten Regex-Patterns
-                import re
-                
-                # Da Trafilatura HTML-Struktur entfernt, nutze regex für typische Rezepttitel
-                import re
-                
-                # Suchbegriffe für beliebte Rezepte aufbauend auf dem Hauptsuchbegriff
-                search_variants = [
-                    f"{search_term}",
-                    f"{search_term} rezept",
-                    f"{search_term} einfach",
-                    f"{search_term} schnell"
-                ]
-                
-                # Rezeptblöcke manuell erstellen für typische Rezepte
-                recipe_blocks = []
-                
-                # Für jeden Suchbegriff ein oder zwei Rezepte generieren
-                for variant in search_variants[:3]:  # Begrenze auf 3 Varianten
-                    variant_cap = ' '.join(word.capitalize() for word in variant.split())
-                    # Erstelle unterschiedliche Rezepttitel aus den Varianten
-                    recipe_title = f"{variant_cap}"
-                    # Erstelle eine Chefkoch-Suchseiten-URL
-                    recipe_url = f"https://www.chefkoch.de/rs/s0/{quote(variant)}/Rezepte.html"
-                    recipe_blocks.append((recipe_title, recipe_url))
-                    
-                    # Wenn wir noch nicht genug Rezepte haben, füge ein zweites hinzu
-                    if len(recipe_blocks) < 3:
-                        second_title = f"{variant_cap} klassisch"
-                        second_url = f"https://www.chefkoch.de/rs/s0/{quote(variant)}+klassisch/Rezepte.html"
-                        recipe_blocks.append((second_title, second_url))
-                
-                # Begrenze auf max. 3 Ergebnisse
-                recipe_blocks = recipe_blocks[:3]
-                
-                # Erstellen von Ergebniseinträgen
-                for i, (title, url) in enumerate(recipe_blocks[:3]):  # Begrenzung auf 3 Ergebnisse
-                    # Bereinige den Titel von HTML-Tags
-                    title = re.sub(r'<[^>]+>', '', title).strip()
-                    
-                    # Extrahiere Zutaten aus der URL oder dem Titel
-                    ingredients_list = []
-                    for word in search_term.split():
-                        if len(word) > 3:  # Nur sinnvolle Wörter
-                            ingredients_list.append(word.capitalize())
-                    
-                    if not ingredients_list:
-                        ingredients_list = [search_term.capitalize()]
-                    
-                    # Stelle sicher, dass die URL vollständig ist
-                    if not url.startswith("http"):
-                        url = "https://www.chefkoch.de" + url
-                    
-                    search_results.append({
-                        "title": title,
-                        "url": url,
-                        "source": "Chefkoch.de",
-                        "image_url": "https://img.chefkoch-cdn.de/img/crop-360x240/assets/img/placeholder/chefkoch-rezeptbild-placeholder.webp", 
-                        "ingredient_match": ingredients_list,
-                        "rating": 4.8,
-                        "review_count": 100
-                    })
-        except Exception as e:
-            logger.error(f"Fehler bei der Chefkoch-Suche: {e}")
-        
-        # 2. Essen und Trinken durchsuchen - spezifischere URL
-        try:
-            # Bessere URL für direkte Rezeptsuche mit URL-Kodierung
-            from urllib.parse import quote
-            encoded_term = quote(search_term)
-            eat_url = f"https://www.essen-und-trinken.de/rezepte/{encoded_term}"
-            eat_content = get_website_text_content(eat_url)
-            
-            if not eat_content or len(eat_content) < 100:
-                # Alternative URL probieren
-                eat_url = f"https://www.essen-und-trinken.de/suche?term={encoded_term}"
-                eat_content = get_website_text_content(eat_url)
-            
-            if eat_content:
-                logger.info(f"Erfolgreicher Abruf von Essen und Trinken für '{search_term}'")
-                
-                # Verbesserte Regex-Muster für E&T
-                import re
-                
-                # Versuche verschiedene Muster für die Extraktion
-                recipe_blocks = re.findall(r'<a\s+href="(https://www\.essen-und-trinken\.de/rezepte/[^"\']+)".*?itemprop="name">(.*?)</span>', eat_content, re.DOTALL)
-                
-                # Alternatives Pattern
-                if not recipe_blocks:
-                    recipe_blocks = re.findall(r'<a\s+href="(https://www\.essen-und-trinken\.de/rezepte/[^"\']+)".*?class="teaser-title[^"]*"[^>]*>(.*?)</span>', eat_content, re.DOTALL)
-                
-                # Einfachere Fallback-Extraktion
-                if not recipe_blocks:
-                    recipe_urls = re.findall(r'(https://www\.essen-und-trinken\.de/rezepte/[^"\']+)', eat_content)
-                    recipe_blocks = [(url, f"Rezept mit {search_term}") for url in recipe_urls[:3]]
-                
-                # Erstellen von Ergebniseinträgen
-                for i, (url, title) in enumerate(recipe_blocks[:3]):  # Begrenzung auf 3 Ergebnisse
-                    # Bereinige den Titel von HTML-Tags
-                    title = re.sub(r'<[^>]+>', '', title).strip()
-                    if not title:
-                        title = f"Rezept mit {search_term.capitalize()}"
-                    
-                    # Extrahiere Zutaten aus der URL
-                    ingredients_list = []
-                    for word in search_term.split():
-                        if len(word) > 3:  # Nur sinnvolle Wörter
-                            ingredients_list.append(word.capitalize())
-                    
-                    if not ingredients_list:
-                        ingredients_list = [search_term.capitalize()]
-                    
-                    search_results.append({
-                        "title": title,
-                        "url": url,
-                        "source": "Essen und Trinken",
-                        "image_url": "https://images.essen-und-trinken.de/images/image-default-et.jpg",
-                        "ingredient_match": ingredients_list,
-                        "rating": 4.5,
-                        "review_count": 75
-                    })
-        except Exception as e:
-            logger.error(f"Fehler bei der Essen-und-Trinken-Suche: {e}")
-            
-        # Eine zweite Runde Suche mit spezifischeren Suchmustern, falls bisher keine Treffer
-        if not search_results:
-            logger.info(f"Keine Rezepte mit standardsuche gefunden, versuche alternative Suche für '{search_term}'")
-            
-            # Alternative Suche für Chefkoch - mit Zusatzparametern
-            try:
-                # Direkte Suche mit spezifischeren Parametern und URL-Kodierung
-                from urllib.parse import quote
-                encoded_term = quote(search_term)
-                chefkoch_url = f"https://www.chefkoch.de/rs/s0g1/{encoded_term}/Rezepte.html"
-                chefkoch_content = get_website_text_content(chefkoch_url)
-                
-                if chefkoch_content:
-                    # Extrahiere die direkten Rezept-URLs mit alternativen Mustern
-                    import re
-                    recipe_blocks = re.findall(r'<a\s+[^>]*?class="ds-recipe-card__link"[^>]*?href="([^"]+)"[^>]*>.*?<h2[^>]*>(.*?)</h2>', chefkoch_content, re.DOTALL)
-                    
-                    # Wenn keine Treffer, versuche einfacheres Muster
-                    if not recipe_blocks:
-                        recipe_urls = re.findall(r'<a\s+[^>]*?href="(https://www\.chefkoch\.de/rezepte/\d+/[^"\']+)"[^>]*>', chefkoch_content)
-                        recipe_titles = re.findall(r'<h2[^>]*?>(.*?)</h2>', chefkoch_content)
-                        recipe_blocks = [(url, recipe_titles[i]) if i < len(recipe_titles) else (url, f"Rezept mit {search_term}") for i, url in enumerate(recipe_urls[:3])]
-                    
-                    # Füge gefundene Rezepte hinzu
-                    for i, (url, title) in enumerate(recipe_blocks[:3]):
-                        # Bereinige den Titel
-                        title = re.sub(r'<[^>]+>', '', title).strip()
-                        
-                        # Erstelle Zutaten-Liste basierend auf dem Suchwort
-                        if search_term:
-                            ingredient_match = [search_term.capitalize()]
-                        else:
-                            ingredient_match = ["Hauptzutat"]
-                        
-                        # Füge das Rezept hinzu
-                        search_results.append({
-                            "title": title,
-                            "url": url if url.startswith('http') else f"https://www.chefkoch.de{url}",
-                            "source": "Chefkoch.de",
-                            "image_url": "https://img.chefkoch-cdn.de/img/crop-360x240/assets/img/placeholder/chefkoch-rezeptbild-placeholder.webp",
-                            "ingredient_match": ingredient_match,
-                            "rating": 4.5 + (0.1 * i),  # Variiere die Bewertung leicht
-                            "review_count": 400 + (i * 50)
-                        })
-                        
-            except Exception as e:
-                logger.error(f"Fehler bei der alternativen Chefkoch-Suche: {e}")
-            
-            # Alternative Suche bei "Lecker.de" - oft bessere Ergebnisse für spezifische Zutaten
-            try:
-                # Verbesserte URL-Kodierung für Lecker.de-Suche
-                from urllib.parse import quote
-                encoded_term = quote(search_term)
-                lecker_url = f"https://www.lecker.de/search?query={encoded_term}"
-                lecker_content = get_website_text_content(lecker_url)
-                
-                if lecker_content:
-                    import re
-                    # Extrahiere Rezept-URLs und Titel
-                    recipe_blocks = re.findall(r'<a\s+[^>]*?href="(https://www\.lecker\.de/[^"\']+)"[^>]*>.*?<h2[^>]*>(.*?)</h2>', lecker_content, re.DOTALL)
-                    
-                    # Füge bis zu 2 Rezepte hinzu
-                    for i, (url, title) in enumerate(recipe_blocks[:2]):
-                        # Bereinige den Titel
-                        title = re.sub(r'<[^>]+>', '', title).strip()
-                        
-                        # Erstelle Zutaten-Liste basierend auf dem Suchwort
-                        if search_term:
-                            ingredient_match = [search_term.capitalize()]
-                        else:
-                            ingredient_match = ["Hauptzutat"]
-                        
-                        # Füge das Rezept hinzu
-                        search_results.append({
-                            "title": title,
-                            "url": url,
-                            "source": "Lecker.de",
-                            "image_url": "https://images.lecker.de/lecker-logo.jpg,id=58fdbedb,b=lecker,w=200,h=200,ca=0,0,0,0,rm=sk.jpeg",
-                            "ingredient_match": ingredient_match,
-                            "rating": 4.4 + (0.1 * i),
-                            "review_count": 350 + (i * 40)
-                        })
-                        
-            except Exception as e:
-                logger.error(f"Fehler bei der Lecker.de-Suche: {e}")
+        # Live-Scraping nur auf Wunsch (refresh=1): alle Quellen (inkl. Ausweichseiten) gleichzeitig abrufen,
+        # mit Zeitlimit je Quelle und insgesamt; bei Erreichen des Limits wird mit den bis dahin
+        # eingetroffenen Seiten geantwortet
+        # (Ergebnisse und Seiten kommen bevorzugt aus dem Cache, abgelaufene werden im Hintergrund erneuert)
+        if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+            online = search_cache.get_or_load(search_term, lambda: search_online_sources(search_term),
+                                              cacheable=is_complete_search)
+            known_urls = {result['url'] for result in search_results}
+            search_results += [result for result in online['results'] if result['url'] not in known_urls]
+            source_status.update(online['sources'])
+            partial = 'timeout' in online['sources'].values()
         
         # Letzte Chance: Wenn immer noch keine Rezepte gefunden wurden, biete relevante Standard-Rezepte an
         # Die werden nun dynamisch basierend auf dem Suchbegriff ausgewählt
@@ -1118,7 +948,7 @@ def search_online_recipes():
                     }
                 ]
         
-        return jsonify({"results": search_results})
+        return jsonify({"results": search_results, "sources": source_status, "partial": partial})
     
     except Exception as e:
         logger.exception("Fehler bei der Online-Rezeptsuche")
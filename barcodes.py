@@ -0,0 +1,210 @@
+import logging
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Breiten (Modulanzahl) der vier Balken/Lücken je Ziffer. L- und R-Code haben dieselben Breiten
+# (L beginnt mit einer Lücke, R mit einem Balken), der G-Code ist der gespiegelte L-Code.
+_L_WIDTHS = {
+    (3, 2, 1, 1): 0, (2, 2, 2, 1): 1, (2, 1, 2, 2): 2, (1, 4, 1, 1): 3, (1, 1, 3, 2): 4,
+    (1, 2, 3, 1): 5, (1, 1, 1, 4): 6, (1, 3, 1, 2): 7, (1, 2, 1, 3): 8, (3, 1, 1, 2): 9,
+}
+_G_WIDTHS = {widths[::-1]: digit for widths, digit in _L_WIDTHS.items()}
+
+# Parität (L/G) der ersten sechs Ziffern kodiert bei EAN-13 die führende Ziffer
+_FIRST_DIGIT = {
+    "LLLLLL": 0, "LLGLGG": 1, "LLGGLG": 2, "LLGGGL": 3, "LGLLGG": 4,
+    "LGGLLG": 5, "LGGGLL": 6, "LGLGLG": 7, "LGLGGL": 8, "LGGLGL": 9,
+}
+
+# Anzahl Balken/Lücken eines vollständigen Codes (Randzeichen + Ziffern + Mittelzeichen)
+_EAN13_RUNS = 3 + 6 * 4 + 5 + 6 * 4 + 3
+_EAN8_RUNS = 3 + 4 * 4 + 5 + 4 * 4 + 3
+
+# Symbologien, die pyzbar liefert und die eine GTIN enthalten
+_GTIN_SYMBOLOGIES = ("EAN13", "EAN8", "UPCA", "UPCE")
+
+
+def gtin_checksum_valid(code):
+    """Check the GS1 check digit of an EAN-8/UPC-A/EAN-13/GTIN-14 code"""
+    if not code.isdigit() or len(code) not in (8, 12, 13, 14):
+        return False
+    digits = [int(char) for char in code]
+    # Von rechts (ohne Prüfziffer): abwechselnd Gewicht 3 und 1
+    total = sum(digit * (3 if index % 2 == 0 else 1) for index, digit in enumerate(reversed(digits[:-1])))
+    return (10 - total % 10) % 10 == digits[-1]
+
+
+def normalize_gtin(code):
+    """Pad a valid code to the 14-digit GTIN form used as index key"""
+    return code.zfill(14)
+
+
+def _module_counts(widths, modules):
+    # Gemessene Pixelbreiten auf ganze Modulbreiten runden, Summe muss stimmen
+    unit = sum(widths) / modules
+    scaled = [width / unit for width in widths]
+    counts = [min(4, max(1, round(value))) for value in scaled]
+    difference = modules - sum(counts)
+    while difference:
+        # Das Element mit dem größten Rundungsfehler in die nötige Richtung korrigieren
+        step = 1 if difference > 0 else -1
+        candidates = [index for index in range(len(counts)) if 1 <= counts[index] + step <= 4]
+        if not candidates:
+            return None
+        index = max(candidates, key=lambda i: (scaled[i] - counts[i]) * step)
+        counts[index] += step
+        difference -= step
+    return tuple(counts)
+
+
+def _is_guard(widths, unit):
+    return all(0.5 * unit <= width <= 1.6 * unit for width in widths)
+
+
+def _decode_runs(runs, count_digits):
+    """
+    Decode a sequence of bar/space widths that starts with the left guard bar
+
+    Args:
+        runs: Pixel widths, alternating bar/space, starting with a bar
+        count_digits: 13 for EAN-13, 8 for EAN-8
+
+    Returns:
+        Code as string, or None
+    """
+    half = 6 if count_digits == 13 else 4
+    expected_runs = _EAN13_RUNS if count_digits == 13 else _EAN8_RUNS
+    if len(runs) < expected_runs:
+        return None
+    runs = runs[:expected_runs]
+    unit = sum(runs) / (95 if count_digits == 13 else 67)
+    if not _is_guard(runs[:3], unit) or not _is_guard(runs[-3:], unit):
+        return None
+
+    digits = []
+    parity = ""
+    position = 3
+    for _ in range(half):
+        counts = _module_counts(runs[position:position + 4], 7)
+        position += 4
+        if counts in _L_WIDTHS:
+            digits.append(_L_WIDTHS[counts])
+            parity += "L"
+        elif counts in _G_WIDTHS:
+            digits.append(_G_WIDTHS[counts])
+            parity += "G"
+        else:
+            return None
+
+    if not _is_guard(runs[position:position + 5], unit):
+        return None
+    position += 5
+
+    for _ in range(half):
+        counts = _module_counts(runs[position:position + 4], 7)
+        position += 4
+        if counts not in _L_WIDTHS:
+            return None
+        digits.append(_L_WIDTHS[counts])
+
+    if count_digits == 13:
+        first = _FIRST_DIGIT.get(parity)
+        if first is None:
+            return None
+        digits.insert(0, first)
+    elif parity != "L" * half:
+        return None
+
+    code = ''.join(str(digit) for digit in digits)
+    return code if gtin_checksum_valid(code) else None
+
+
+def _scanline_runs(line):
+    # Binarisieren mit lokalem Mittelwert, dann Lauflängen (Balken = dunkel)
+    window = max(15, len(line) // 16) | 1
+    kernel = np.ones(window) / window
+    padded = np.pad(line, window // 2, mode='edge')
+    local_mean = np.convolve(padded, kernel, mode='valid')
+    dark = line < local_mean - 8
+    changes = np.flatnonzero(np.diff(dark.astype(np.int8))) + 1
+    bounds = np.concatenate(([0], changes, [len(line)]))
+    widths = np.diff(bounds)
+    return dark[bounds[:-1]], widths
+
+
+def _decode_line(line):
+    colors, widths = _scanline_runs(line)
+    widths = widths.tolist()
+    colors = colors.tolist()
+    for start in range(1, len(widths)):
+        # Ein Code beginnt mit einem Balken nach einer ausreichend breiten Ruhezone
+        if not colors[start] or colors[start - 1] or widths[start - 1] < 3 * widths[start]:
+            continue
+        for count_digits in (13, 8):
+            code = _decode_runs(widths[start:], count_digits)
+            if code:
+                return code
+    return None
+
+
+def _decode_builtin(img, lines=24):
+    """Scanline EAN-13/EAN-8 decoder in numpy (horizontal and vertical, both directions)"""
+    gray = img.convert('L')
+    if max(gray.size) > 1600:
+        scale = 1600 / max(gray.size)
+        gray = gray.resize((round(gray.width * scale), round(gray.height * scale)))
+    pixels = np.asarray(gray, dtype=np.float32)
+
+    votes = Counter()
+    for plane in (pixels, pixels.T):
+        height = plane.shape[0]
+        for row in np.linspace(height * 0.1, height * 0.9, lines).astype(int):
+            line = plane[row]
+            for candidate in (line, line[::-1]):
+                code = _decode_line(candidate)
+                if code:
+                    votes[code] += 1
+        if votes:
+            break
+    return [code for code, _ in votes.most_common()]
+
+
+def _decode_pyzbar(img):
+    from pyzbar import pyzbar
+    codes = []
+    for symbol in pyzbar.decode(img.convert('L'), symbols=None):
+        code = symbol.data.decode('ascii', errors='ignore')
+        if symbol.type in _GTIN_SYMBOLOGIES and gtin_checksum_valid(code) and code not in codes:
+            codes.append(code)
+    return codes
+
+
+_pyzbar_available = None
+
+
+def decode_barcodes(img):
+    """
+    Find EAN/UPC barcodes in an image
+
+    Uses pyzbar (libzbar) if it is installed and otherwise a built-in
+    scanline decoder for EAN-13 and EAN-8. Only codes with a valid check
+    digit are returned.
+
+    Args:
+        img: PIL Image object
+
+    Returns:
+        List of codes as digit strings, most likely first
+    """
+    global _pyzbar_available
+    if _pyzbar_available is not False:
+        try:
+            return _decode_pyzbar(img)
+        except ImportError as e:
+            # pyzbar ist optional; ohne libzbar bleibt der eingebaute Decoder
+            logger.debug(f"pyzbar not available, using built-in barcode decoder: {e}")
+            _pyzbar_available = False
+    return _decode_builtin(img)
@@ -0,0 +1,222 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Standardwerte für das Micro-Batching, überschreibbar per Umgebungsvariable
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "8"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("BATCH_WINDOW_MS", "5"))
+
+
+def run_topk(model, batch, k=5):
+    """
+    Run one forward pass and return the top-k predictions per image
+
+    Args:
+        model: Callable classification model
+        batch: Tensor of shape (N, C, H, W)
+        k: Number of predictions per image
+
+    Returns:
+        List of (probabilities, class indices) tuples, one per image
+    """
+    with torch.no_grad():
+        output = model(batch)
+        probabilities = torch.nn.functional.softmax(output, dim=1)
+        top_prob, top_indices = torch.topk(probabilities, k, dim=1)
+
+    top_prob = top_prob.numpy().tolist()
+    top_indices = top_indices.numpy().tolist()
+    return list(zip(top_prob, top_indices))
+
+
+class BatchMetrics:
+    """Thread-safe counters for batch sizes, queue wait and forward time"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.batch_sizes = {}
+        self.max_queue_wait_ms = 0.0
+        self.total_queue_wait_ms = 0.0
+        self.total_forward_ms = 0.0
+        # Die letzten Werte für Perzentile
+        self._recent_waits = deque(maxlen=window)
+        self._recent_forwards = deque(maxlen=window)
+
+    def record_batch(self, waits_ms, forward_ms):
+        with self._lock:
+            size = len(waits_ms)
+            self.batches += 1
+            self.items += size
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+            self.total_forward_ms += forward_ms
+            self._recent_forwards.append(forward_ms)
+            for wait_ms in waits_ms:
+                self.total_queue_wait_ms += wait_ms
+                self.max_queue_wait_ms = max(self.max_queue_wait_ms, wait_ms)
+                self._recent_waits.append(wait_ms)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    @staticmethod
+    def _percentile(values, pct):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self):
+        with self._lock:
+            waits = list(self._recent_waits)
+            forwards = list(self._recent_forwards)
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'errors': self.errors,
+                'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                'queue_wait_ms': {
+                    'avg': self.total_queue_wait_ms / self.items if self.items else 0.0,
+                    'p50': self._percentile(waits, 50),
+                    'p95': self._percentile(waits, 95),
+                    'max': self.max_queue_wait_ms
+                },
+                'forward_ms': {
+                    'avg': self.total_forward_ms / self.batches if self.batches else 0.0,
+                    'p50': self._percentile(forwards, 50),
+                    'p95': self._percentile(forwards, 95)
+                }
+            }
+
+
+class BatchScheduler:
+    """
+    Collects preprocessed image tensors from concurrent requests and runs
+    them through the model as one batch
+
+    A batch is closed when it reaches max_batch_size or when the oldest
+    queued tensor has waited max_wait_ms. Each caller receives only the
+    top-k slice for its own image.
+    """
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, top_k=5):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.top_k = top_k
+        self.metrics = BatchMetrics()
+
+        self._start_lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        """
+        Start the batching thread on first use
+
+        Threads do not survive fork(), so the thread is started lazily in the
+        process that actually serves requests (e.g. a gunicorn worker).
+        """
+        if self._pid == os.getpid() and self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._start_lock:
+            if self._pid == os.getpid() and self._worker is not None and self._worker.is_alive():
+                return
+
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="batch-inference", daemon=True)
+            self._worker.start()
+            logger.info("Batch inference worker started (max_batch_size=%d, max_wait_ms=%.1f)",
+                        self.max_batch_size, self.max_wait * 1000.0)
+
+    def submit(self, img_tensor):
+        """
+        Queue one preprocessed image for the next batch
+
+        Args:
+            img_tensor: Tensor of shape (1, C, H, W)
+
+        Returns:
+            Future resolving to a (probabilities, class indices) tuple
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((img_tensor, future, time.perf_counter()))
+        return future
+
+    def infer(self, img_tensor, timeout=None):
+        """
+        Classify one image through the batch queue and wait for its result
+
+        Args:
+            img_tensor: Tensor of shape (1, C, H, W)
+            timeout: Optional maximum wait in seconds
+
+        Returns:
+            Tuple of (top-k probabilities, top-k class indices)
+        """
+        return self.submit(img_tensor).result(timeout=timeout)
+
+    def _collect_batch(self, work_queue):
+        first = work_queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    # Bereits wartende Anfragen trotzdem mitnehmen
+                    batch.append(work_queue.get_nowait())
+                else:
+                    batch.append(work_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        work_queue = self._queue
+        while True:
+            batch = self._collect_batch(work_queue)
+            started = time.perf_counter()
+            waits_ms = [(started - enqueued) * 1000.0 for _, _, enqueued in batch]
+
+            try:
+                tensors = torch.cat([tensor for tensor, _, _ in batch], dim=0)
+                results = run_topk(self.model, tensors, self.top_k)
+                forward_ms = (time.perf_counter() - started) * 1000.0
+                self.metrics.record_batch(waits_ms, forward_ms)
+
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error during batched inference: {str(e)}")
+                self.metrics.record_error()
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def get_metrics(self):
+        """Return batching configuration and metrics as a dictionary"""
+        metrics = self.metrics.snapshot()
+        metrics['max_batch_size'] = self.max_batch_size
+        metrics['max_wait_ms'] = self.max_wait * 1000.0
+        metrics['queue_depth'] = self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+        return metrics
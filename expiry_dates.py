@@ -0,0 +1,173 @@
+import re
+import calendar
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Monatsnamen (deutsch und englisch, auch abgekürzt) -> Monatsnummer
+MONTH_NAMES = {
+    'januar': 1, 'jan': 1, 'jänner': 1, 'january': 1,
+    'februar': 2, 'feb': 2, 'february': 2,
+    'märz': 3, 'maerz': 3, 'mär': 3, 'mrz': 3, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'mai': 5, 'may': 5,
+    'juni': 6, 'jun': 6, 'june': 6,
+    'juli': 7, 'jul': 7, 'july': 7,
+    'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9,
+    'oktober': 10, 'okt': 10, 'october': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'dezember': 12, 'dez': 12, 'december': 12, 'dec': 12,
+}
+
+# Begriffe, die ein folgendes Datum als Mindesthaltbarkeits- oder Verbrauchsdatum kennzeichnen
+_KEYWORD_PATTERN = re.compile(
+    r'\b(?:mhd|mindestens\s+haltbar(?:\s+bis)?|mind\.?\s*haltbar(?:\s+bis)?|haltbar\s+bis|'
+    r'zu\s+verbrauchen\s+bis|verbrauchsdatum|verbr\.?\s*bis|best\s+before(?:\s+end)?|bbe|exp(?:iry)?)\b',
+    re.IGNORECASE
+)
+
+# Typische OCR-Verwechslungen neben Ziffern (z.B. "12.O3.2O26")
+_CONFUSABLES = str.maketrans({'O': '0', 'o': '0', 'D': '0', 'I': '1', 'l': '1', 'i': '1', 'S': '5', 's': '5',
+                              'B': '8', 'Z': '2', 'z': '2'})
+_CONFUSABLE_PATTERN = re.compile(r'(?<=[\d./-])[OoDIliSsBZz](?=[\d./-])|(?<=\d)[OoIlSsBZz]|[OoIlSsBZz](?=\d)')
+
+_SEP = r'\s?[./-]\s?'
+
+# Reihenfolge = Priorität: längere/eindeutigere Formate zuerst, Treffer überdecken kürzere
+_DATE_PATTERNS = [
+    # 2026-03-12
+    ('YYYY-MM-DD', re.compile(r'(?<!\d)(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})(?!\d)'), 0.75),
+    # 12.03.2026, 12/03/2026, 12-03-2026
+    ('DD.MM.YYYY', re.compile(rf'(?<!\d)(?P<day>\d{{1,2}}){_SEP}(?P<month>\d{{1,2}}){_SEP}(?P<year>\d{{4}})(?!\d)'), 0.7),
+    # 12.03.26
+    ('DD.MM.YY', re.compile(rf'(?<!\d)(?P<day>\d{{1,2}}){_SEP}(?P<month>\d{{1,2}}){_SEP}(?P<year>\d{{2}})(?![\d./-])'), 0.6),
+    # 12. März 2026, 12 Mar 26
+    ('DD MONTH YYYY', re.compile(r'(?<!\d)(?P<day>\d{1,2})\.?\s*(?P<month_name>[a-zäA-ZÄ]{3,9})\.?\s*(?P<year>\d{4}|\d{2})(?!\d)'), 0.65),
+    # März 2026
+    ('MONTH YYYY', re.compile(r'(?<![\w])(?P<month_name>[a-zäA-ZÄ]{3,9})\.?\s*(?P<year>\d{4})(?!\d)'), 0.5),
+    # 03/2026, 03.2026
+    ('MM.YYYY', re.compile(rf'(?<![\d./-])(?P<month>\d{{1,2}}){_SEP}(?P<year>\d{{4}})(?![\d./-])'), 0.55),
+    # 03/26 (nur mit Schrägstrich, sonst zu leicht mit Preisen oder Gewichten verwechselbar)
+    ('MM/YY', re.compile(r'(?<![\d./-])(?P<month>\d{1,2})\s?/\s?(?P<year>\d{2})(?![\d./-])'), 0.45),
+    # MHD 120326 (nur direkt nach einem Schlüsselwort)
+    ('DDMMYY', re.compile(r'(?<=\s)(?P<day>\d{2})(?P<month>\d{2})(?P<year>\d{2})(?!\d)'), 0.35),
+]
+
+# Wie weit (Zeichen) ein Schlüsselwort vor dem Datum stehen darf
+KEYWORD_DISTANCE = 30
+KEYWORD_BONUS = 0.25
+# Abzug für Daten, die nur nach OCR-Korrekturen lesbar waren oder in der Vergangenheit liegen
+CORRECTION_PENALTY = 0.1
+PAST_PENALTY = 0.2
+
+
+def _normalize_ocr(text):
+    # Verwechselte Buchstaben nur in Ziffernumgebung ersetzen; Textlänge bleibt gleich
+    return _CONFUSABLE_PATTERN.sub(lambda match: match.group(0).translate(_CONFUSABLES), text)
+
+
+def _expand_year(year_text):
+    year = int(year_text)
+    if len(year_text) == 2:
+        year += 2000
+    return year
+
+
+def _build_date(match, fmt):
+    groups = match.groupdict()
+    year = _expand_year(groups['year'])
+    if groups.get('month_name') is not None:
+        month = MONTH_NAMES.get(groups['month_name'].lower().rstrip('.'))
+        if month is None:
+            return None
+    else:
+        month = int(groups['month'])
+    if not 1 <= month <= 12:
+        return None
+
+    if groups.get('day') is not None:
+        day = int(groups['day'])
+    else:
+        # Nur Monat und Jahr: haltbar bis zum Monatsende
+        day = calendar.monthrange(year, month)[1]
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_expiry_dates(text, today=None, min_year_offset=-1, max_year_offset=10):
+    """
+    Find best-before / use-by dates in OCR text
+
+    Args:
+        text: Text from OCR
+        today: Reference date (defaults to today)
+        min_year_offset: Earliest plausible year relative to today
+        max_year_offset: Latest plausible year relative to today
+
+    Returns:
+        List of dictionaries with 'date' (ISO format), 'text' (as found),
+        'format' and 'confidence', best candidate first
+    """
+    if not text:
+        return []
+    today = today or datetime.date.today()
+    normalized = _normalize_ocr(text)
+    keyword_ends = [match.end() for match in _KEYWORD_PATTERN.finditer(normalized)]
+
+    candidates = {}
+    taken = []
+    for fmt, pattern, base_confidence in _DATE_PATTERNS:
+        for match in pattern.finditer(normalized):
+            start, end = match.span()
+            # Bereits von einem eindeutigeren Format erfasste Stellen überspringen
+            if any(start < taken_end and taken_start < end for taken_start, taken_end in taken):
+                continue
+
+            has_keyword = any(0 <= start - keyword_end <= KEYWORD_DISTANCE for keyword_end in keyword_ends)
+            if fmt == 'DDMMYY' and not has_keyword:
+                continue
+
+            date = _build_date(match, fmt)
+            if date is None or not today.year + min_year_offset <= date.year <= today.year + max_year_offset:
+                continue
+
+            confidence = base_confidence
+            if has_keyword:
+                confidence += KEYWORD_BONUS
+            if normalized[start:end] != text[start:end]:
+                confidence -= CORRECTION_PENALTY
+            if date < today:
+                confidence -= PAST_PENALTY
+            confidence = round(max(0.05, min(0.99, confidence)), 2)
+
+            taken.append((start, end))
+            iso = date.isoformat()
+            if iso not in candidates or confidence > candidates[iso]['confidence']:
+                candidates[iso] = {'date': iso, 'text': text[start:end], 'format': fmt, 'confidence': confidence}
+
+    return sorted(candidates.values(), key=lambda candidate: (-candidate['confidence'], candidate['date']))
+
+
+def parse_date(value, today=None):
+    """
+    Normalize a single date string (e.g. a user-entered expiry date)
+
+    Accepts every format parse_expiry_dates understands, including ISO dates.
+
+    Returns:
+        Date in ISO format (YYYY-MM-DD) or None if the value is not a date
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    # Für Benutzereingaben gilt keine Plausibilitätsgrenze für das Jahr
+    dates = parse_expiry_dates(value, today=today, min_year_offset=-100, max_year_offset=100)
+    return dates[0]['date'] if dates else None
@@ -0,0 +1,271 @@
+import os
+import re
+import time
+import json
+import logging
+import argparse
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Erlaubte Editierdistanz je Begriffslänge: "ab_länge:distanz,..." (kürzere Begriffe nur exakt).
+# Unter 6 Buchstaben liegen zu viele gewöhnliche Wörter eine Änderung von einem Produkt entfernt
+# ("auch" -> "Buch", "sein" -> "Wein", "Boot" -> "Brot")
+DEFAULT_THRESHOLDS = os.environ.get("FUZZY_MAX_DISTANCE", "6:1,9:2")
+# Verrauschte OCR-Texte mit erwartetem Begriff für den Benchmark
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ocr_noise_corpus.tsv")
+
+# Rand-Markierungen, damit auch Anfang und Ende eines Wortes eigene Trigramme bekommen
+_START = "\x02"
+_END = "\x03"
+
+
+def parse_thresholds(spec):
+    """
+    Parse a per-length distance specification
+
+    Args:
+        spec: String like "6:1,9:2" (terms with 6+ characters allow one edit,
+            9+ characters two) or a list of (min_length, distance) pairs
+
+    Returns:
+        List of (min_length, distance) pairs sorted by length
+    """
+    if isinstance(spec, str):
+        pairs = []
+        for part in spec.split(','):
+            if part.strip():
+                length, distance = part.split(':')
+                pairs.append((int(length), int(distance)))
+        spec = pairs
+    return sorted(spec)
+
+
+def trigrams(text):
+    """Return the set of character trigrams of a (padded) word"""
+    padded = f"{_START}{text}{_END}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Levenshtein distance, computed only within a band of max_distance
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+
+    limit = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        # Nur Spalten innerhalb des Bandes |i - j| <= max_distance berechnen
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [limit] * (len(b) + 1)
+        if low == 1:
+            current[0] = i
+        char = a[i - 1]
+        row_min = current[0] if low == 1 else limit
+        for j in range(low, high + 1):
+            cost = 0 if char == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return limit
+        previous = current
+    return previous[len(b)] if previous[len(b)] <= max_distance else limit
+
+
+class TrigramIndex:
+    """
+    Inverted character-trigram index for OCR-tolerant lookups
+
+    Candidates are narrowed down with the q-gram lemma: a term within edit
+    distance k of the query shares at least |trigrams(query)| - 3k trigrams
+    with it and differs in length by at most k. Only the remaining candidates
+    are verified with a banded Levenshtein distance.
+    """
+
+    def __init__(self, terms, thresholds=DEFAULT_THRESHOLDS):
+        """
+        Build the index
+
+        Args:
+            terms: Iterable of terms; a term's position is its ID
+            thresholds: Allowed edit distance per term length (see parse_thresholds)
+        """
+        self.thresholds = parse_thresholds(thresholds)
+        self.terms = [term.lower() for term in terms]
+        self._lengths = np.array([len(term) for term in self.terms], dtype=np.int32)
+        # Erlaubte Distanz und Anzahl verschiedener Trigramme je Begriff für die Filter
+        self._allowed = np.array([self.max_distance(len(term)) for term in self.terms], dtype=np.int32)
+
+        postings = {}
+        gram_counts = []
+        for term_id, term in enumerate(self.terms):
+            grams = trigrams(term)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(term_id)
+        self._gram_counts = np.array(gram_counts, dtype=np.int32)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def max_distance(self, length):
+        """Allowed edit distance for a term of the given length"""
+        allowed = 0
+        for min_length, distance in self.thresholds:
+            if length >= min_length:
+                allowed = distance
+        return allowed
+
+    def lookup(self, query, limit=5):
+        """
+        Find the terms closest to a query
+
+        Args:
+            query: Word as read by OCR
+            limit: Maximum number of results
+
+        Returns:
+            List of (term_id, distance) pairs, closest first; a term is only
+            returned if the distance is within its length's threshold
+        """
+        query = query.lower()
+        if not query or not self.terms:
+            return []
+
+        query_grams = trigrams(query)
+        lists = [self._postings[gram] for gram in query_grams if gram in self._postings]
+        if not lists:
+            return []
+
+        ids, shared = np.unique(np.concatenate(lists), return_counts=True)
+        # Jede Änderung zerstört höchstens drei Trigramme der Anfrage wie des Begriffs,
+        # daher muss ein Begriff mit Distanz k mindestens max(|Q|, |T|) - 3k Trigramme teilen
+        allowed = self._allowed[ids]
+        required = np.maximum(np.maximum(len(query_grams), self._gram_counts[ids]) - 3 * allowed, 1)
+        keep = (shared >= required) & (np.abs(self._lengths[ids] - len(query)) <= allowed)
+
+        results = []
+        for term_id, max_distance in zip(ids[keep].tolist(), allowed[keep].tolist()):
+            distance = bounded_levenshtein(query, self.terms[term_id], max_distance)
+            if distance <= max_distance:
+                results.append((distance, term_id))
+        results.sort()
+        return [(term_id, distance) for distance, term_id in results[:limit]]
+
+
+def run_benchmark(corpus_path, terms, thresholds=DEFAULT_THRESHOLDS, synthetic=0, overrides=None):
+    """
+    Measure lookup latency and accuracy on a corpus of noisy OCR strings
+
+    Every word of an OCR string is looked up; the closest hit (longer term
+    on equal distance) counts as the match of the string, as in the
+    product matcher.
+
+    Args:
+        corpus_path: Tab-separated file with "OCR string<TAB>expected term" per
+            line (expected term empty if nothing should match) and an optional
+            third column "text" or "image": whether the match has to win
+            against a moderately confident image classification
+        terms: Dictionary terms to index
+        thresholds: Allowed edit distance per term length
+        synthetic: Number of additional generated terms, to measure scaling
+        overrides: Optional callable (term, distance) -> bool deciding whether
+            a match wins against the image; needed to check the third column
+
+    Returns:
+        Dictionary with build time, latency percentiles and accuracy
+    """
+    terms = list(terms)
+    if synthetic:
+        rng = np.random.default_rng(0)
+        alphabet = np.array(list("abcdefghiklmnoprstuwzäöüß"))
+        for _ in range(synthetic):
+            terms.append(''.join(rng.choice(alphabet, size=int(rng.integers(4, 16)))))
+
+    started = time.perf_counter()
+    index = TrigramIndex(terms, thresholds)
+    build_seconds = time.perf_counter() - started
+
+    samples = []
+    with open(corpus_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                noisy, _, rest = line.rstrip('\n').partition('\t')
+                expected, _, winner = rest.partition('\t')
+                samples.append((noisy, expected.strip().lower(), winner.strip()))
+    if not samples:
+        raise ValueError(f"No samples in {corpus_path}")
+
+    latencies = []
+    correct = 0
+    false_matches = 0
+    override_samples = 0
+    override_correct = 0
+    for noisy, expected, winner in samples:
+        started = time.perf_counter()
+        hits = [hit for word in re.findall(r'\w+', noisy) for hit in index.lookup(word, limit=1)]
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        best = min(hits, key=lambda hit: (hit[1], -len(index.terms[hit[0]])), default=None)
+        found = index.terms[best[0]] if best is not None else ""
+        if found == expected:
+            correct += 1
+        elif found and not expected:
+            false_matches += 1
+        if winner and overrides is not None:
+            override_samples += 1
+            text_wins = found == expected and bool(found) and overrides(found, best[1])
+            override_correct += text_wins == (winner == "text")
+
+    latencies.sort()
+    return {
+        "terms": len(index),
+        "samples": len(samples),
+        "build_seconds": round(build_seconds, 3),
+        "latency_ms_p50": round(latencies[len(latencies) // 2], 4),
+        "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+        "latency_ms_max": round(latencies[-1], 4),
+        "accuracy": round(correct / len(samples), 4),
+        "false_matches": false_matches,
+        "override_samples": override_samples,
+        "override_accuracy": round(override_correct / override_samples, 4) if override_samples else None
+    }
+
+
+if __name__ == "__main__":
+    # Aufruf: python fuzzy_matcher.py [korpus.tsv] [--catalog datei] [--synthetic anzahl]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark the fuzzy product matcher on noisy OCR strings")
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS_PATH, help="TSV file: OCR string<TAB>expected term")
+    parser.add_argument("--catalog", default=os.environ.get("PRODUCT_CATALOG", ""),
+                        help="Compiled product catalog (default: built-in terms)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Add generated terms to test larger dictionaries")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help='Distance per term length, e.g. "6:1,9:2"')
+    args = parser.parse_args()
+
+    from product_catalog import ProductCatalog, is_specific_match
+    catalog = ProductCatalog(args.catalog).current
+    dictionary = [catalog.term(term_id) for term_id in range(catalog.term_count)]
+    products = {term.lower(): catalog.value(term_id) for term_id, term in enumerate(dictionary)}
+
+    def overrides(term, distance):
+        # Wie im Produktabgleich: Treffer mit Korrekturen tragen Begriff und Distanz
+        product = products[term]
+        if distance:
+            product = dict(product, matched_term=term, ocr_distance=distance)
+        return is_specific_match(product)
+
+    print(json.dumps(run_benchmark(args.corpus, dictionary, args.thresholds, args.synthetic, overrides), indent=2))
@@ -0,0 +1,156 @@
+import os
+import json
+import mmap
+import logging
+import argparse
+
+from barcodes import gtin_checksum_valid, normalize_gtin
+from product_catalog import _read_records
+
+logger = logging.getLogger(__name__)
+
+# Produktindex für Barcodes (GTIN -> Produkt); ohne Datei ist der Barcode-Schnellpfad aus
+DEFAULT_INDEX_PATH = os.environ.get("BARCODE_INDEX", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "data", "gtin_index.bin"))
+
+# Kennung des Dateiformats
+INDEX_MAGIC = b"EFGTIN01"
+_KEY_SIZE = 14
+
+
+def build_gtin_index(records, path):
+    """
+    Write a GTIN index file
+
+    Layout: magic, uint32 count, count sorted 14-digit ASCII keys, count + 1
+    uint32 offsets into a blob of UTF-8 JSON product records. The file is
+    written next to the target and renamed into place, so readers that
+    still map the old version are not affected.
+
+    Args:
+        records: Iterable of (gtin, product dict) pairs; invalid codes are skipped
+        path: Output path
+
+    Returns:
+        Dictionary with the number of entries and skipped codes
+    """
+    entries = {}
+    skipped = 0
+    for gtin, product in records:
+        gtin = str(gtin).strip()
+        if not gtin_checksum_valid(gtin):
+            skipped += 1
+            continue
+        entries[normalize_gtin(gtin)] = product
+
+    keys = sorted(entries)
+    blob = bytearray()
+    offsets = [0]
+    for key in keys:
+        blob += json.dumps(entries[key], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        offsets.append(len(blob))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(INDEX_MAGIC)
+        f.write(len(keys).to_bytes(4, 'little'))
+        f.write(''.join(keys).encode('ascii'))
+        f.write(b''.join(offset.to_bytes(4, 'little') for offset in offsets))
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+    logger.info("Built GTIN index %s: %d entries, %d invalid codes skipped", path, len(keys), skipped)
+    return {"entries": len(keys), "skipped": skipped}
+
+
+class GtinIndex:
+    """
+    Read-only, memory-mapped GTIN -> product lookup
+
+    Lookups are a binary search over the fixed-width keys, so opening the
+    index costs nothing and all worker processes share its pages.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a GTIN index file")
+
+        start = len(INDEX_MAGIC)
+        self.count = int.from_bytes(self._mmap[start:start + 4], 'little')
+        self._keys_start = start + 4
+        view = memoryview(self._mmap)
+        offsets_start = self._keys_start + self.count * _KEY_SIZE
+        self._offsets = view[offsets_start:offsets_start + (self.count + 1) * 4].cast('I')
+        self._blob_start = offsets_start + (self.count + 1) * 4
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, index):
+        position = self._keys_start + index * _KEY_SIZE
+        return self._mmap[position:position + _KEY_SIZE]
+
+    def get(self, code):
+        """
+        Look up a product by barcode
+
+        Args:
+            code: EAN-8/UPC-A/EAN-13/GTIN-14 as digit string
+
+        Returns:
+            Product dictionary or None
+        """
+        key = normalize_gtin(code).encode('ascii')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self._key(low) != key:
+            return None
+        start = self._blob_start + self._offsets[low]
+        end = self._blob_start + self._offsets[low + 1]
+        return json.loads(self._mmap[start:end])
+
+
+def load_gtin_records(path):
+    """
+    Read products with barcodes from a CSV or JSONL file
+
+    Each record needs a "gtin" (or "ean") and a "name"; "description" defaults
+    to the name. Further fields are kept in the product.
+
+    Returns:
+        List of (gtin, product dict) pairs
+    """
+    records = []
+    for record in _read_records(path):
+        gtin = (record.get("gtin") or record.get("ean") or "").strip()
+        name = (record.get("name") or "").strip()
+        if not gtin or not name:
+            continue
+        product = {key: value for key, value in record.items()
+                   if key not in ("gtin", "ean") and value not in (None, "")}
+        product["description"] = product.get("description") or name
+        records.append((gtin, product))
+    return records
+
+
+if __name__ == "__main__":
+    # Aufruf: python gtin_index.py <ausgabe> <produkte.csv|.jsonl> [...]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the GTIN product index for the barcode fast path")
+    parser.add_argument("output", help="Path of the index file")
+    parser.add_argument("products", nargs="+", help="CSV/JSONL files with gtin, name, description")
+    args = parser.parse_args()
+
+    records = []
+    for products_path in args.products:
+        records.extend(load_gtin_records(products_path))
+    print(json.dumps(build_gtin_index(records, args.output), indent=2))
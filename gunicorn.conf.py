@@ -0,0 +1,60 @@
+import gc
+import os
+import logging
+
+from memory_report import process_memory
+
+# Produktionskonfiguration für gunicorn (gunicorn -c gunicorn.conf.py main:app)
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+pidfile = os.environ.get("GUNICORN_PIDFILE")
+
+# Die App (und damit ResNet50) wird einmal im Master geladen, bevor die Worker
+# geforkt werden. Die Gewichte werden im Inferenzmodus nie geschrieben und
+# bleiben daher copy-on-write zwischen allen Workern geteilt.
+preload_app = True
+# Dafür muss das Modell beim Import blockierend geladen werden (nicht im Hintergrund-Thread,
+# der den Fork nicht überleben würde); die Worker sind damit sofort bereit
+os.environ.setdefault("MODEL_LOADING", "eager")
+
+# Der Warm-up-Forward-Pass läuft beim Preload im Master. Mit mehreren Intra-Op-Threads
+# würde er dort den OpenMP/MKL-Threadpool starten, dessen Zustand der Fork nicht
+# übersteht (Worker können dann in der ersten Inferenz hängen bleiben). Im Master
+# daher einthreadig rechnen; die Worker setzen ihre Threadzahl in post_fork
+import torch
+torch.set_num_threads(1)
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def pre_fork(server, worker):
+    # Alle bis hierhin erzeugten Objekte in die permanente Generation verschieben,
+    # damit der Garbage Collector im Worker nicht deren Header beschreibt und so
+    # die geteilten Speicherseiten kopiert
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Jeder Worker bekommt einen Teil der CPU-Kerne, sonst konkurrieren die
+    # Intra-Op-Threads aller Worker um dieselben Kerne
+    import torch
+    torch_threads = os.environ.get("TORCH_NUM_THREADS")
+    if torch_threads:
+        torch.set_num_threads(int(torch_threads))
+    else:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, workers)))
+
+    # Rezept-Crawler erst im Worker starten: ein Thread aus dem Master überlebt den Fork nicht.
+    # Alle Worker starten ihn, gecrawlt wird nur von dem mit der Dateisperre
+    from recipe_crawler import start_background_crawler
+    start_background_crawler()
+
+
+def post_worker_init(worker):
+    report = process_memory()
+    logger.info("Worker %s memory: rss=%s kB pss=%s kB shared=%s kB private=%s kB",
+                worker.pid, report.get("rss_kb"), report.get("pss_kb"),
+                report.get("shared_kb"), report.get("private_kb"))
@@ -0,0 +1,160 @@
+import os
+import ssl
+import logging
+import threading
+
+import certifi
+import urllib3
+from urllib3.util import Retry, Timeout, make_headers
+
+logger = logging.getLogger(__name__)
+
+# Standardwerte, überschreibbar per Umgebungsvariable
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "5"))
+# Größere Antworten werden verworfen (dekomprimierte Größe)
+DEFAULT_MAX_BYTES = int(float(os.environ.get("HTTP_MAX_RESPONSE_MB", "5")) * 1024 * 1024)
+# Offene Keep-Alive-Verbindungen je Host bzw. Anzahl Hosts im Pool
+DEFAULT_CONNECTIONS_PER_HOST = int(os.environ.get("HTTP_CONNECTIONS_PER_HOST", "8"))
+DEFAULT_MAX_HOSTS = int(os.environ.get("HTTP_MAX_HOSTS", "32"))
+DEFAULT_USER_AGENT = os.environ.get("HTTP_USER_AGENT", "Mozilla/5.0 (compatible; ecooklogically recipe search)")
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """The response body exceeds the configured size limit"""
+
+
+class HttpClient:
+    """
+    Shared HTTP client for scraping
+
+    One urllib3 PoolManager per process keeps connections to each host
+    alive, so repeated requests to the same site reuse an open connection
+    and skip the TCP and TLS handshakes; all connections share one TLS
+    context. TLS sessions are not resumed: a newly opened connection does a
+    full handshake. Every request has connect and read timeouts, the body is
+    streamed and dropped once it exceeds max_bytes, and gzip/deflate are
+    decoded transparently.
+    """
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_bytes=DEFAULT_MAX_BYTES, connections_per_host=DEFAULT_CONNECTIONS_PER_HOST,
+                 max_hosts=DEFAULT_MAX_HOSTS, user_agent=DEFAULT_USER_AGENT):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_bytes = max_bytes
+        self.connections_per_host = connections_per_host
+        self.max_hosts = max_hosts
+        # make_headers meldet nur Kodierungen an, die urllib3 hier dekomprimieren kann
+        self.headers = {
+            **make_headers(keep_alive=True, accept_encoding=True, user_agent=user_agent),
+            'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'de-DE,de;q=0.9,en;q=0.5'
+        }
+
+        self._lock = threading.Lock()
+        self._manager = None
+        self._pid = None
+
+        self.requests = 0
+        self.errors = 0
+        self.too_large = 0
+        self.bytes_received = 0
+
+    def _pool_manager(self):
+        # Nach fork() einen eigenen Pool anlegen, Sockets dürfen nicht zwischen Workern geteilt werden
+        pid = os.getpid()
+        if self._manager is not None and self._pid == pid:
+            return self._manager
+        with self._lock:
+            if self._manager is None or self._pid != pid:
+                context = ssl.create_default_context(cafile=certifi.where())
+                self._manager = urllib3.PoolManager(
+                    num_pools=self.max_hosts,
+                    maxsize=self.connections_per_host,
+                    block=False,
+                    ssl_context=context,
+                    retries=Retry(total=3, connect=1, read=0, redirect=5, status=0, backoff_factor=0.2),
+                    timeout=Timeout(connect=self.connect_timeout, read=self.read_timeout)
+                )
+                self._pid = pid
+            return self._manager
+
+    def fetch(self, url, timeout=None):
+        """
+        Download a URL
+
+        Args:
+            url: http(s) URL
+            timeout: Optional total time limit in seconds (on top of the
+                connect and read timeouts)
+
+        Returns:
+            Decoded body as bytes (for trafilatura.extract), or None if the
+            request failed, did not return 200 or exceeded max_bytes
+        """
+        with self._lock:
+            self.requests += 1
+        try:
+            response = self._pool_manager().request(
+                'GET', url, headers=self.headers, preload_content=False,
+                timeout=Timeout(connect=self.connect_timeout, read=self.read_timeout, total=timeout))
+            try:
+                if response.status != 200:
+                    logger.info(f"GET {url} returned status {response.status}")
+                    with self._lock:
+                        self.errors += 1
+                    # Ungelesenen Body nicht abwarten, die Verbindung wird verworfen
+                    response.close()
+                    return None
+                return self._read_body(response)
+            except ResponseTooLarge:
+                response.close()
+                raise
+            finally:
+                response.release_conn()
+        except ResponseTooLarge:
+            logger.warning(f"GET {url}: response larger than {self.max_bytes} bytes, skipped")
+            with self._lock:
+                self.too_large += 1
+            return None
+        except (urllib3.exceptions.HTTPError, OSError) as e:
+            logger.warning(f"GET {url} failed: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+    def _read_body(self, response):
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > self.max_bytes \
+                and not response.headers.get('Content-Encoding'):
+            raise ResponseTooLarge()
+
+        # Dekomprimierte Blöcke sammeln und nach max_bytes abbrechen; nur ein join am Ende, kein Dekodieren zu str
+        chunks = []
+        size = 0
+        for chunk in response.stream(_CHUNK_SIZE, decode_content=True):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ResponseTooLarge()
+        with self._lock:
+            self.bytes_received += size
+        return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+    def get_metrics(self):
+        """Return request counters and the number of pooled connections (fewer than requests = reuse)"""
+        with self._lock:
+            manager = self._manager if self._pid == os.getpid() else None
+            pools = [manager.pools[key] for key in manager.pools.keys()] if manager is not None else []
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'too_large': self.too_large,
+                'bytes_received': self.bytes_received,
+                'hosts': len(pools),
+                'connections': sum(pool.num_connections for pool in pools)
+            }
+
@@ -1,79 +1,582 @@
 import io
+import os
+import math
+import time
 import logging
+import threading
+import signal
+import subprocess
 import torch
 import numpy as np
 import pytesseract
 import re
-from PIL import Image
-from torchvision import models, transforms
-from torchvision.models.resnet import ResNet50_Weights
+from concurrent.futures import as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from PIL import Image, ImageEnhance, ImageOps
+from batch_inference import BatchScheduler, run_topk, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from inference_backends import build_model, backend_weights, DEFAULT_CACHE_DIR
+from model_zoo import resolve_name, get_default_weights
+from worker_pools import get_pool
+from prediction_cache import PredictionCache, content_hash, perceptual_hash
+from product_catalog import ProductCatalog, is_specific_match
+from text_regions import detect_text_regions, region_coverage, looks_like_date, MAX_REGION_COVERAGE
+from expiry_dates import parse_expiry_dates
+from barcodes import decode_barcodes
+from gtin_index import GtinIndex, DEFAULT_INDEX_PATH
 
 logger = logging.getLogger(__name__)
 
 # ImageNet class mapping
 # We'll load this dynamically from the model
 
-# Definieren von Produktkategorien basierend auf erkanntem Text
-PRODUCT_TEXT_MAPPING = {
-    # Mehl-Kategorien
-    "Weizenmehl": {"name": "Weizenmehl", "description": "Weizenmehl", "confidence_boost": 0.8},
-    "Mehl": {"name": "Mehl", "description": "Mehl", "confidence_boost": 0.6},
-    "TYP 405": {"name": "Weizenmehl_405", "description": "Weizenmehl Type 405", "confidence_boost": 0.7},
+# Batchgröße für mehrere Bilder, wenn kein BatchScheduler aktiv ist
+DIRECT_BATCH_SIZE = 16
+
+# Erlaubte Zeichen für den MHD-Durchlauf
+MHD_WHITELIST = "0123456789MHD./-: "
+
+# Textzeilen in Ausschnitten werden für Tesseract auf mindestens diese Höhe vergrößert
+MIN_CROP_HEIGHT = 48
+
+def _kill_process(process):
+    """Kill a tesseract process together with any child processes of a wrapper script"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        process.kill()
+
+
+class OcrCancellation:
+    """
+    Cancels running OCR passes
     
-    # Milchprodukte
-    "Milch": {"name": "Milch", "description": "Milch", "confidence_boost": 0.7},
-    "Vollmilch": {"name": "Vollmilch", "description": "Vollmilch", "confidence_boost": 0.8},
-    "Joghurt": {"name": "Joghurt", "description": "Joghurt", "confidence_boost": 0.7},
+    Passes register their tesseract process; cancel() kills every registered
+    process and makes passes that start afterwards return right away.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes = set()
+        self.cancelled = False
+    
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            _kill_process(process)
+    
+    def register(self, process):
+        """Track a running process; returns False (and kills it) if already cancelled"""
+        with self._lock:
+            if not self.cancelled:
+                self._processes.add(process)
+                return True
+        _kill_process(process)
+        return False
     
-    # Getränke
-    "Cola": {"name": "Cola", "description": "Cola", "confidence_boost": 0.7},
-    "Fanta": {"name": "Fanta", "description": "Fanta", "confidence_boost": 0.7},
-    "Wasser": {"name": "Wasser", "description": "Wasser", "confidence_boost": 0.6},
+    def unregister(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+
+class PytesseractBackend:
+    """
+    OCR via the tesseract command line program: starts one process per call
     
-    # Snacks
-    "Schokolade": {"name": "Schokolade", "description": "Schokolade", "confidence_boost": 0.7},
-    "Chips": {"name": "Chips", "description": "Chips", "confidence_boost": 0.7},
+    The image is piped to the process instead of a temp file, so the process
+    can be killed on timeout or cancellation. The program is the one
+    configured for pytesseract (pytesseract.pytesseract.tesseract_cmd).
+    """
     
-    # Konserven
-    "Tomaten": {"name": "Tomaten", "description": "Tomaten", "confidence_boost": 0.6},
-    "Mais": {"name": "Mais", "description": "Mais", "confidence_boost": 0.6},
+    name = "pytesseract"
     
-    # Allgemeine Lebensmittelkategorien
-    "Bio": {"name": "Bio_Produkt", "description": "Bio-Produkt", "confidence_boost": 0.5},
-    "Zucker": {"name": "Zucker", "description": "Zucker", "confidence_boost": 0.7},
-    "Salz": {"name": "Salz", "description": "Salz", "confidence_boost": 0.7}
+    def image_to_string(self, img, psm, whitelist=None, timeout=0, cancellation=None):
+        """
+        Recognize text in an image
+        
+        Args:
+            img: PIL Image object
+            psm: Tesseract page segmentation mode
+            whitelist: Optional string of allowed characters
+            timeout: Timeout in seconds (0 = none), the process is killed when it expires
+            cancellation: Optional OcrCancellation that can kill the process
+            
+        Returns:
+            Recognized text as string ("" if cancelled)
+        """
+        if cancellation is not None and cancellation.cancelled:
+            return ""
+        args = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout', '--psm', str(psm), '--oem', '3']
+        if whitelist:
+            args += ['-c', f'tessedit_char_whitelist={whitelist}']
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        
+        try:
+            # Eigene Prozessgruppe, damit beim Abbruch auch Kindprozesse beendet werden
+            process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       start_new_session=True)
+        except FileNotFoundError:
+            raise pytesseract.TesseractNotFoundError()
+        if cancellation is not None and not cancellation.register(process):
+            process.communicate()
+            return ""
+        try:
+            output, errors = process.communicate(buffer.getvalue(), timeout=timeout or None)
+        except subprocess.TimeoutExpired:
+            _kill_process(process)
+            process.communicate()
+            raise RuntimeError("Tesseract process timeout")
+        finally:
+            if cancellation is not None:
+                cancellation.unregister(process)
+        
+        if cancellation is not None and cancellation.cancelled:
+            return ""
+        if process.returncode:
+            raise pytesseract.TesseractError(process.returncode, errors.decode('utf-8', errors='replace').strip())
+        return output.decode('utf-8', errors='replace')
+
+
+class TesserocrBackend:
+    """
+    OCR via tesserocr (libtesseract in-process)
+    
+    Every thread keeps its own warm Tesseract API handle, so language data is
+    loaded once per thread and images are passed as raw buffers without temp
+    files. The timeout is enforced by Tesseract's own recognition deadline;
+    a handle that hit it is closed and not reused. A cancellation only stops
+    passes that have not started yet.
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self, lang="eng"):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self._local = threading.local()
+    
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=self.lang, oem=self._tesserocr.OEM.DEFAULT)
+            self._local.api = api
+        return api
+    
+    def image_to_string(self, img, psm, whitelist=None, timeout=0, cancellation=None):
+        """
+        Recognize text in an image
+        
+        Args:
+            img: PIL Image object
+            psm: Tesseract page segmentation mode
+            whitelist: Optional string of allowed characters
+            timeout: Timeout in seconds (0 = none)
+            cancellation: Optional OcrCancellation, checked before the recognition starts
+            
+        Returns:
+            Recognized text as string ("" if cancelled)
+            
+        Raises:
+            RuntimeError: If the recognition did not finish within timeout
+        """
+        if cancellation is not None and cancellation.cancelled:
+            return ""
+        api = self._api()
+        timed_out = False
+        try:
+            api.SetPageSegMode(psm)
+            api.SetVariable("tessedit_char_whitelist", whitelist or "")
+            if img.mode == 'L':
+                # Graustufenbild direkt als Puffer übergeben (1 Byte pro Pixel)
+                api.SetImageBytes(img.tobytes(), img.width, img.height, 1, img.width)
+            else:
+                api.SetImage(img)
+            started = time.monotonic()
+            # Recognize bricht selbst ab, wenn die Frist (Millisekunden) überschritten ist
+            if not api.Recognize(timeout=int(timeout * 1000) if timeout else 0):
+                if timeout and time.monotonic() - started >= timeout:
+                    timed_out = True
+                    raise RuntimeError("Tesseract process timeout")
+                return ""
+            return api.GetUTF8Text()
+        finally:
+            if timed_out:
+                # Nach einem Abbruch wird der Zustand des Handles nicht weiterverwendet
+                self._local.api = None
+                api.End()
+            else:
+                api.Clear()
+
+
+OCR_BACKENDS = {
+    "pytesseract": PytesseractBackend,
+    "tesserocr": TesserocrBackend,
 }
 
+
+def get_ocr_backend(name="auto"):
+    """
+    Create an OCR backend by name
+    
+    Args:
+        name: 'pytesseract', 'tesserocr' or 'auto' (tesserocr if installed, else pytesseract)
+        
+    Returns:
+        OCR backend instance
+    """
+    if name not in ("auto",) + tuple(OCR_BACKENDS):
+        raise ValueError(f"Unknown OCR backend '{name}', expected one of: auto, {', '.join(OCR_BACKENDS)}")
+    
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend()
+        except Exception as e:
+            # pytesseract bleibt der Fallback, wenn tesserocr/libtesseract fehlt
+            log = logger.warning if name == "tesserocr" else logger.debug
+            log(f"tesserocr not available, falling back to pytesseract: {e}")
+    return PytesseractBackend()
+
+
+class Classifier:
+    """One classification model together with its preprocessing and batch queue"""
+
+    def __init__(self, model_name, backend="eager", cache_dir=DEFAULT_CACHE_DIR,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, batch_window_ms=DEFAULT_MAX_WAIT_MS):
+        self.name = resolve_name(model_name)
+        logger.info("Loading %s model (backend: %s)...", self.name, backend)
+        # static_int8 läuft mit den vorquantisierten Gewichten und braucht deren Vorverarbeitung
+        self.weights = backend_weights(backend, self.name, get_default_weights(self.name))
+        self.model = build_model(backend, model_name=self.name, weights=self.weights, cache_dir=cache_dir)
+        
+        # Get the preprocessing transform and class names from the weights
+        self.preprocess = self.weights.transforms()
+        self.categories = self.weights.meta["categories"]
+        
+        # Kürzeste Bildseite, die die Vorverarbeitung vor dem Zuschneiden erwartet
+        resize_size = getattr(self.preprocess, 'resize_size', None) or [256]
+        self.resize_side = max(resize_size) if isinstance(resize_size, (list, tuple)) else int(resize_size)
+        
+        # Gleichzeitige Anfragen werden zu einem Batch zusammengefasst
+        self.batcher = None
+        if max_batch_size > 1:
+            self.batcher = BatchScheduler(self.model, max_batch_size=max_batch_size, max_wait_ms=batch_window_ms)
+        
+        logger.info("Model %s loaded successfully with %d categories", self.name, len(self.categories))
+
+    def prepare(self, img):
+        """Convert a PIL image into a model input tensor with batch dimension"""
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return self.preprocess(img).unsqueeze(0)
+
+    def classify(self, img_tensor):
+        """
+        Run the model on a preprocessed image
+        
+        Args:
+            img_tensor: Preprocessed image tensor with batch dimension
+            
+        Returns:
+            Tuple of (top 5 probabilities, top 5 class indices) as Python lists
+        """
+        if self.batcher is not None:
+            return self.batcher.infer(img_tensor)
+        return run_topk(self.model, img_tensor, 5)[0]
+
+    def classify_many(self, img_tensors):
+        """
+        Run the model on several preprocessed images
+        
+        With batching enabled all images are queued at once, so they end up
+        in as few forward passes as the batch size allows.
+        
+        Args:
+            img_tensors: List of image tensors with batch dimension
+            
+        Returns:
+            List of (top 5 probabilities, top 5 class indices) tuples in input order
+        """
+        if self.batcher is not None:
+            futures = [self.batcher.submit(img_tensor) for img_tensor in img_tensors]
+            return [future.result() for future in futures]
+        
+        results = []
+        for start in range(0, len(img_tensors), DIRECT_BATCH_SIZE):
+            batch = torch.cat(img_tensors[start:start + DIRECT_BATCH_SIZE], dim=0)
+            results.extend(run_topk(self.model, batch, 5))
+        return results
+
+
 class ImageRecognizer:
-    def __init__(self):
-        """Initialize the image recognition model"""
+    def __init__(self, model_name=None, fast_model_name=None, cascade_threshold=None,
+                 backend=None, model_cache_dir=DEFAULT_CACHE_DIR,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, batch_window_ms=DEFAULT_MAX_WAIT_MS,
+                 ocr_backend=None):
+        """
+        Initialize the image recognition model
+        
+        Args:
+            model_name: Classification model from the model zoo, defaults to CLASSIFIER_MODEL or resnet50
+            fast_model_name: Optional lightweight model that answers first (cascade mode),
+                defaults to FAST_CLASSIFIER_MODEL
+            cascade_threshold: Top-1 confidence below which the fast model escalates to the full model,
+                defaults to CASCADE_THRESHOLD or 0.6
+            backend: Inference backend (eager, channels_last, torchscript, dynamic_int8, static_int8),
+                defaults to the INFERENCE_BACKEND environment variable
+            model_cache_dir: Directory for compiled models
+            max_batch_size: Maximum number of images per batched forward pass (1 disables batching)
+            batch_window_ms: How long the first queued image waits for others to join its batch
+            ocr_backend: OCR backend (auto, pytesseract, tesserocr), defaults to OCR_BACKEND
+        """
         try:
-            logger.info("Loading ResNet50 model...")
-            # Load pre-trained ResNet50 model
-            self.weights = ResNet50_Weights.DEFAULT
-            self.model = models.resnet50(weights=self.weights)
-            self.model.eval()  # Set model to evaluation mode
+            self.backend = backend or os.environ.get("INFERENCE_BACKEND", "eager")
+            model_name = model_name or os.environ.get("CLASSIFIER_MODEL", "resnet50")
+            fast_model_name = fast_model_name or os.environ.get("FAST_CLASSIFIER_MODEL")
+            if cascade_threshold is None:
+                cascade_threshold = float(os.environ.get("CASCADE_THRESHOLD", "0.6"))
+            self.cascade_threshold = cascade_threshold
+            
+            # Klassifikatoren in Kaskaden-Reihenfolge: zuerst das schnelle, zuletzt das vollständige Modell
+            self.classifiers = []
+            if fast_model_name:
+                self.classifiers.append(Classifier(fast_model_name, self.backend, model_cache_dir,
+                                                   max_batch_size, batch_window_ms))
+            full_classifier = Classifier(model_name, self.backend, model_cache_dir, max_batch_size, batch_window_ms)
+            self.classifiers.append(full_classifier)
+            
+            # Attribute des vollständigen Modells für bestehende Aufrufer
+            self.weights = full_classifier.weights
+            self.model = full_classifier.model
+            self.preprocess = full_classifier.preprocess
+            self.categories = full_classifier.categories
+            self.batcher = full_classifier.batcher
+            
+            # Bilder werden nur so groß dekodiert, wie Klassifikator und OCR es brauchen
+            self.classifier_min_side = max(classifier.resize_side for classifier in self.classifiers)
+            self.ocr_min_side = int(os.environ.get("OCR_MIN_SIDE", "1600"))
+            self._stats_lock = threading.Lock()
+            self.decode_stats = {'images': 0, 'decode_ms': 0.0, 'source_pixels': 0, 'decoded_pixels': 0}
+            
+            # Ergebnis-Cache für wiederholt fotografierte Produkte
+            self.prediction_cache = PredictionCache()
             
-            # Get the preprocessing transform from the weights
-            self.preprocess = self.weights.transforms()
+            # Zähler, welche Stufe der Kaskade wie oft geantwortet hat
+            self._tier_lock = threading.Lock()
+            self.tier_counts = {classifier.name: 0 for classifier in self.classifiers}
             
-            # Get class names from the weights metadata
-            self.categories = self.weights.meta["categories"]
+            # Configure OCR (persistent tesserocr engine if available, otherwise pytesseract)
+            self.ocr_backend = get_ocr_backend(ocr_backend or os.environ.get("OCR_BACKEND", "auto"))
+            logger.info("Using OCR backend: %s", self.ocr_backend.name)
             
-            logger.info("Model loaded successfully with %d categories", len(self.categories))
+            # Die OCR-Durchläufe laufen parallel auf einem gemeinsamen Thread-Pool
+            self.ocr_workers = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 1)))
+            self.ocr_pass_timeout = float(os.environ.get("OCR_PASS_TIMEOUT", "10"))
             
-            # Configure pytesseract
-            self.tesseract_config = '--psm 11 --oem 3'  # Page segmentation mode and OCR Engine mode
+            # OCR nur auf erkannten Textregionen statt auf dem ganzen Foto
+            self.ocr_text_regions = os.environ.get("OCR_TEXT_REGIONS", "1").lower() in ("1", "true", "yes")
+            self.ocr_stats = {'images': 0, 'region_images': 0, 'regions': 0, 'mhd_regions': 0,
+                              'image_pixels': 0, 'ocr_pixels': 0, 'timeouts': 0}
+            
+            # Threads für das Dekodieren und Auswerten mehrerer Bilder (/predict/batch)
+            self.batch_workers = int(os.environ.get("BATCH_PREDICT_WORKERS", str(os.cpu_count() or 1)))
+            
+            # Produktbegriffe und Wortschatz (kompilierter Katalog aus PRODUCT_CATALOG oder eingebaute Tabellen)
+            self.product_catalog = ProductCatalog()
+            
+            # Barcode-Schnellpfad: EAN lesen und im lokalen Produktindex nachschlagen, ohne Klassifikator und OCR
+            self.gtin_index = None
+            if os.environ.get("BARCODE_FAST_PATH", "1").lower() in ("1", "true", "yes"):
+                self.gtin_index = self._load_gtin_index(os.environ.get("BARCODE_INDEX", DEFAULT_INDEX_PATH))
+            self.barcode_stats = {'attempts': 0, 'decoded': 0, 'hits': 0, 'unknown': 0, 'decode_ms': 0.0}
             logger.info("OCR text recognition initialized with text-based product mapping")
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise
 
+    @staticmethod
+    def _load_gtin_index(path):
+        """Open the GTIN product index, or return None to disable the barcode fast path"""
+        if not path or not os.path.exists(path):
+            logger.info(f"No GTIN index at {path}, barcode fast path disabled")
+            return None
+        try:
+            gtin_index = GtinIndex(path)
+        except Exception as e:
+            logger.error(f"Could not load GTIN index {path}: {str(e)}")
+            return None
+        logger.info(f"Barcode fast path enabled with {len(gtin_index)} products from {path}")
+        return gtin_index
+
+    def _ocr_pass(self, name, img, psm, whitelist=None, cancellation=None):
+        """
+        Run a single OCR pass
+        
+        Args:
+            name: Name of the pass (for logging)
+            img: PIL Image object prepared for this pass
+            psm: Tesseract page segmentation mode
+            whitelist: Optional string of allowed characters
+            cancellation: Optional OcrCancellation to stop the pass early
+            
+        Returns:
+            Recognized text (empty string on error, timeout or cancellation)
+        """
+        try:
+            return self.ocr_backend.image_to_string(img, psm, whitelist=whitelist, timeout=self.ocr_pass_timeout,
+                                                    cancellation=cancellation)
+        except Exception as e:
+            # Beide Backends brechen selbst ab, wenn das Timeout erreicht ist ("Tesseract process timeout")
+            if 'timeout' in str(e).lower():
+                logger.warning(f"OCR pass '{name}' exceeded {self.ocr_pass_timeout} s")
+                with self._stats_lock:
+                    self.ocr_stats['timeouts'] += 1
+            else:
+                logger.debug(f"Error during OCR pass '{name}': {e}")
+            return ""
+
+    def _has_confident_product(self, texts):
+        """Check whether the text found so far already identifies a known product"""
+        return is_specific_match(self.identify_product_from_text(' '.join(texts)))
+
+    def _prepare_crop(self, gray_img, box):
+        """Cut out a text region and scale it to a size Tesseract reads well"""
+        crop = ImageOps.autocontrast(gray_img.crop(box))
+        if crop.height < MIN_CROP_HEIGHT:
+            factor = min(3.0, MIN_CROP_HEIGHT / max(1, crop.height))
+            crop = crop.resize((round(crop.width * factor), round(crop.height * factor)), Image.BICUBIC)
+        return crop
+
+    def _extract_text_from_regions(self, gray_img, regions):
+        """
+        Run OCR on the detected text regions only
+        
+        Every region is read as a single text block in parallel. The MHD pass
+        with its digit whitelist only runs on regions whose text looks like a
+        date.
+        
+        Args:
+            gray_img: Grayscale PIL Image object
+            regions: List of (left, top, right, bottom) boxes
+            
+        Returns:
+            Tuple of (recognized text per region, MHD text per region index, OCR pixels)
+        """
+        crops = [self._prepare_crop(gray_img, box) for box in regions]
+        ocr_pixels = sum(crop.width * crop.height for crop in crops)
+        
+        pool = get_pool('ocr', self.ocr_workers)
+        # Beendet bei Zeitüberschreitung noch laufende Tesseract-Prozesse
+        cancellation = OcrCancellation()
+        futures = {pool.submit(self._ocr_pass, f'region {index}', crop, 6, None, cancellation): index
+                   for index, crop in enumerate(crops)}
+        
+        texts = [''] * len(crops)
+        mhd_futures = {}
+        try:
+            for future in as_completed(futures, timeout=self.ocr_pass_timeout * len(crops) + 1):
+                index = futures[future]
+                texts[index] = future.result()
+                # Den MHD-Durchlauf sofort starten, sobald eine Region nach Datum aussieht
+                if looks_like_date(texts[index]):
+                    mhd_futures[pool.submit(self._ocr_pass, f'mhd {index}', crops[index], 7, MHD_WHITELIST,
+                                            cancellation)] = index
+                    ocr_pixels += crops[index].width * crops[index].height
+            
+            mhd_texts = {}
+            for future in as_completed(mhd_futures, timeout=self.ocr_pass_timeout + 1):
+                mhd_texts[mhd_futures[future]] = future.result()
+        except FuturesTimeoutError:
+            logger.warning("OCR of text regions did not finish in time, using partial results")
+            mhd_texts = {mhd_futures[future]: future.result() for future in mhd_futures if future.done()}
+        finally:
+            for future in list(futures) + list(mhd_futures):
+                future.cancel()
+            cancellation.cancel()
+        
+        with self._stats_lock:
+            self.ocr_stats['region_images'] += 1
+            self.ocr_stats['regions'] += len(regions)
+            self.ocr_stats['mhd_regions'] += len(mhd_futures)
+        return texts, mhd_texts, ocr_pixels
+
+    def _extract_text_from_image(self, gray_img):
+        """
+        Run the OCR passes on the whole image
+        
+        The passes run concurrently on a shared thread pool. As soon as one
+        pass yields a confident product match, the other passes are cancelled
+        (running tesseract processes are killed), except the MHD pass that the
+        expiry dates come from.
+        
+        Args:
+            gray_img: Grayscale PIL Image object
+            
+        Returns:
+            Tuple of (recognized text per pass, OCR pixels)
+        """
+        # Kontrast erhöhen für bessere Erkennung kleiner Texte (wie MHD)
+        high_contrast = ImageEnhance.Contrast(gray_img).enhance(2.0)
+        
+        passes = [
+            # Original grayscale conversion - Standard-Ansatz (sparse text)
+            ('plain', gray_img, 11, None),
+            # Angepasster Kontrast, einzelner Textblock
+            ('contrast', high_contrast, 6, None),
+            # MHD-spezifische OCR-Konfiguration für Datumserkennung
+            ('mhd', gray_img, 3, MHD_WHITELIST),
+        ]
+        
+        pool = get_pool('ocr', self.ocr_workers)
+        cancellations = [OcrCancellation() for _ in passes]
+        futures = {pool.submit(self._ocr_pass, name, pass_img, psm, whitelist, cancellations[index]): index
+                   for index, (name, pass_img, psm, whitelist) in enumerate(passes)}
+        
+        results = {}
+        pending = set(futures)
+        deadline = time.monotonic() + self.ocr_pass_timeout * len(passes) + 1
+        confident = False
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.warning("OCR passes did not finish in time, using partial results")
+                    break
+                for future in done:
+                    text = future.result()
+                    if text.strip():
+                        results[futures[future]] = text
+                
+                # Frühzeitig abbrechen, wenn ein Produkt bereits sicher erkannt wurde (MHD-Durchlauf läuft weiter)
+                if not confident and pending and self._has_confident_product(results.values()):
+                    confident = True
+                    logger.info("OCR identified a product, cancelling remaining passes except MHD")
+                    # Wartende Durchläufe entfallen, laufende Tesseract-Prozesse werden beendet
+                    for future in list(pending):
+                        if passes[futures[future]][0] != 'mhd':
+                            future.cancel()
+                            cancellations[futures[future]].cancel()
+                            pending.discard(future)
+        finally:
+            for future in futures:
+                future.cancel()
+            # Nach Ablauf der Frist noch laufende Prozesse beenden
+            for cancellation in cancellations:
+                cancellation.cancel()
+        
+        ocr_pixels = sum(gray_img.width * gray_img.height for future in futures if not future.cancelled())
+        return [results[index] for index in sorted(results)], ocr_pixels
+
     def extract_text(self, img):
         """
         Extract text from the image using OCR with improved processing
         for better recognition of expiry dates and product information
         
+        Text regions (labels, date prints) are detected first and only those
+        crops are read. If no regions are found or they cover most of the
+        image, the OCR passes run on the whole image instead.
+        
         Args:
             img: PIL Image object
             
@@ -81,40 +584,24 @@ class ImageRecognizer:
             Extracted text as string
         """
         try:
-            # Erstelle mehrere Bildvarianten für bessere Texterkennung
-            results = []
-            
-            # Original grayscale conversion - Standard-Ansatz
             gray_img = img.convert('L')
-            text1 = pytesseract.image_to_string(gray_img, config=self.tesseract_config)
-            if text1.strip():
-                results.append(text1)
             
-            # Versuch mit angepasstem Kontrast für kleine Texte wie Ablaufdaten
-            try:
-                from PIL import ImageEnhance
-                # Kontrast erhöhen für bessere Erkennung kleiner Texte (wie MHD)
-                enhancer = ImageEnhance.Contrast(gray_img)
-                high_contrast = enhancer.enhance(2.0)  # Kontrast verdoppeln
-                text2 = pytesseract.image_to_string(high_contrast, config='--psm 6 --oem 3')  # Einzelne Textzeile
-                if text2.strip():
-                    results.append(text2)
-            except Exception as contrast_error:
-                logger.debug(f"Error during contrast enhancement: {contrast_error}")
-            
-            # Weitere Verarbeitung für MHD-spezifische Texterkennung
-            try:
-                # MHD-spezifische OCR-Konfiguration für Datumserkennung
-                text3 = pytesseract.image_to_string(gray_img, config='--psm 3 -c tessedit_char_whitelist="0123456789MHD./-: "')
-                if text3.strip():
-                    results.append(text3)
-            except Exception as mhd_error:
-                logger.debug(f"Error during MHD-specific recognition: {mhd_error}")
+            regions = detect_text_regions(gray_img) if self.ocr_text_regions else []
+            if regions and region_coverage(regions, gray_img.size) <= MAX_REGION_COVERAGE:
+                texts, mhd_texts, ocr_pixels = self._extract_text_from_regions(gray_img, regions)
+                # Regionen von oben nach unten, danach die MHD-Ergebnisse
+                texts = texts + [mhd_texts[index] for index in sorted(mhd_texts)]
+                logger.info(f"OCR on {len(regions)} text regions, {len(mhd_texts)} with MHD pass")
+            else:
+                texts, ocr_pixels = self._extract_text_from_image(gray_img)
             
-            # Kombiniere alle Ergebnisse
-            all_text = '\n'.join(results)
+            with self._stats_lock:
+                self.ocr_stats['images'] += 1
+                self.ocr_stats['image_pixels'] += gray_img.width * gray_img.height
+                self.ocr_stats['ocr_pixels'] += ocr_pixels
             
             # Filter out empty lines and clean up the text
+            all_text = '\n'.join(texts)
             text_lines = [line.strip() for line in all_text.split('\n') if line.strip()]
             clean_text = ' '.join(text_lines)
             
@@ -162,22 +649,9 @@ class ImageRecognizer:
         if len(meaningful_words) < 1:
             return False
         
-        # Prüfe auf bekannte Wörter und Muster (deutsches Wörterbuch oder häufige Wörter)
-        # Diese Liste könnte durch ein vollständiges Wörterbuch ersetzt werden
-        common_german_words = ["und", "der", "die", "das", "mit", "für", "von", "bei", "aus", "Buch", 
-                             "Text", "Wort", "Preis", "Euro", "Kauf", "Geld", "Zeit", "Jahr", "Leben",
-                             "Mensch", "Mann", "Frau", "Kind", "Stadt", "Land", "Haus", "Auto", "Wasser",
-                             "Essen", "Milch", "Brot", "Zucker", "Salz", "Butter", "Käse", "Fleisch", 
-                             "Obst", "Gemüse", "Wein", "Bier", "Hotel", "Restaurant", "Schule", "Arbeit",
-                             "Schrift", "Brief", "Post", "Zeitung", "Markt", "Straße", "Zimmer", "Tisch",
-                             "Stuhl", "Bett", "Küche", "Bad", "Wohnung", "Fenster", "Tür", "Dach", "Wand",
-                             "Mehl", "Weizen", "Weißmehl", "Weizenmehl", "Vollkorn", "Vollkornmehl", "Teig", 
-                             "Teigwaren", "Pasta", "Spaghetti", "Nudel", "Nudeln", "Reis", "Kartoffel", 
-                             "Kartoffeln", "Getränk", "Getränke", "Cola", "Limonade", "Saft", "Apfel",
-                             "Banane", "Orange", "Birne", "Erdbeere", "Himbeere", "Brombeere", "Heidelbeere"]
-        
+        # Prüfe auf bekannte Wörter und Muster (Wortschatz aus dem Produktkatalog)
         # Zähle, wie viele erkannte Wörter in der "bekannten Wörter"-Liste vorkommen
-        known_words = [w.lower() for w in words if w.lower() in common_german_words]
+        known_words = [w.lower() for w in words if self.product_catalog.is_known_word(w.lower())]
         
         # Sehr strenge Regeln für Wortgröße und Bekanntheitsgrad
         if len(known_words) >= 2 or (len(known_words) >= 1 and len(meaningful_words) >= 2):
@@ -321,47 +795,12 @@ class ImageRecognizer:
         if not text or text.strip() == "":
             return None
         
-        # Definiere bekannte Produktmappings (aus Textfragmenten zu Produktbeschreibungen)
-        PRODUCT_TEXT_MAPPING = {
-            "Mehl": {"name": "Mehl", "description": "Weizenmehl", "confidence_boost": 1.2},
-            "Weizenmehl": {"name": "Weizenmehl", "description": "Weizenmehl", "confidence_boost": 1.5},
-            "Zucker": {"name": "Zucker", "description": "Zucker", "confidence_boost": 1.2},
-            "Raffinadezucker": {"name": "Raffinadezucker", "description": "Feiner Zucker", "confidence_boost": 1.5},
-            "Milch": {"name": "Milch", "description": "Frische Milch", "confidence_boost": 1.2},
-            "Vollmilch": {"name": "Vollmilch", "description": "Vollmilch", "confidence_boost": 1.5},
-            "Brot": {"name": "Brot", "description": "Brot", "confidence_boost": 1.2},
-            "Vollkornbrot": {"name": "Vollkornbrot", "description": "Vollkornbrot", "confidence_boost": 1.5},
-            "Wasser": {"name": "Wasser", "description": "Mineralwasser", "confidence_boost": 1.2},
-            "Mineralwasser": {"name": "Mineralwasser", "description": "Mineralwasser", "confidence_boost": 1.5},
-            "Butter": {"name": "Butter", "description": "Butter", "confidence_boost": 1.5},
-            "Käse": {"name": "Käse", "description": "Käse", "confidence_boost": 1.2},
-            "Gouda": {"name": "Gouda", "description": "Gouda Käse", "confidence_boost": 1.5},
-            "Buch": {"name": "Buch", "description": "Buch", "confidence_boost": 1.2},
-            "ISBN": {"name": "Buch", "description": "Buch mit ISBN", "confidence_boost": 1.5},
-            "Roman": {"name": "Roman", "description": "Romanwerk", "confidence_boost": 1.3},
-            "Kaffee": {"name": "Kaffee", "description": "Kaffee", "confidence_boost": 1.3},
-            "Tee": {"name": "Tee", "description": "Tee", "confidence_boost": 1.3},
-            "Zeitung": {"name": "Zeitung", "description": "Tageszeitung", "confidence_boost": 1.3},
-            "Magazin": {"name": "Magazin", "description": "Zeitschrift", "confidence_boost": 1.3},
-            "Wein": {"name": "Wein", "description": "Weinflasche", "confidence_boost": 1.3},
-            "Rotwein": {"name": "Rotwein", "description": "Rotwein", "confidence_boost": 1.5},
-            "Weißwein": {"name": "Weißwein", "description": "Weißwein", "confidence_boost": 1.5}
-        }
-        
-        text_lower = text.lower()
-        best_match = None
-        best_score = 0
-        
-        # Durchsuche den Text nach bekannten Produktbegriffen
-        for key, product in PRODUCT_TEXT_MAPPING.items():
-            # Prüfe auf genaue Übereinstimmung (ohne Berücksichtigung von Groß-/Kleinschreibung)
-            if key.lower() in text_lower:
-                # Berechne einen Score basierend auf der Länge des gefundenen Begriffs
-                # Längere Übereinstimmungen sind oft spezifischer (z.B. "Weizenmehl" vs. "Mehl")
-                score = len(key) * product["confidence_boost"]
-                if score > best_score:
-                    best_score = score
-                    best_match = product
+        # Alle bekannten Begriffe in einem Durchlauf suchen. Längere Übereinstimmungen
+        # sind oft spezifischer (z.B. "Weizenmehl" vs. "Mehl"), daher zählt die Länge mit.
+        # OCR-Fehler wie "Weizenrnehl" oder "Vol1milch" werden fehlertolerant gefunden,
+        # jede nötige Korrektur verringert den Score
+        best_match = self.product_catalog.match_product(
+            text, score=lambda key, product, distance: (len(key) - distance) * product["confidence_boost"])
         
         # Wenn kein spezielles Produkt gefunden wurde, aber sinnvoller Text vorhanden ist,
         # identifiziere den Gegenstand mit dem erkannten Text selbst - aber nur bei wirklich
@@ -381,6 +820,134 @@ class ImageRecognizer:
         
         return best_match
 
+    def decode_image(self, image_file):
+        """
+        Decode an uploaded image at the smallest resolution that is still
+        sufficient for both the classifier input and OCR
+        
+        JPEGs are decoded directly at a reduced scale (draft mode, 1/2 to 1/8),
+        other formats are reduced right after decoding. The EXIF orientation is
+        applied once, in place.
+        
+        Args:
+            image_file: File object containing the image
+            
+        Returns:
+            PIL Image object
+        """
+        started = time.perf_counter()
+        img = Image.open(image_file)
+        width, height = img.size
+        
+        # Kleinster Faktor, bei dem der Klassifikator (kurze Seite) und die OCR (lange Seite) genug Pixel haben
+        scale = max(self.classifier_min_side / min(width, height), self.ocr_min_side / max(width, height))
+        if scale < 1:
+            target = (math.ceil(width * scale), math.ceil(height * scale))
+            if img.format == 'JPEG':
+                # Der JPEG-Decoder liefert direkt ein verkleinertes Bild, mindestens in Zielgröße
+                img.draft(img.mode, target)
+            img.load()
+            
+            factor = min(img.width // target[0], img.height // target[1])
+            if factor >= 2:
+                try:
+                    img = img.reduce(factor)
+                except ValueError:
+                    # Nicht jeder Modus (z.B. Palettenbilder) unterstützt reduce()
+                    pass
+        else:
+            img.load()
+        
+        ImageOps.exif_transpose(img, in_place=True)
+        
+        decode_ms = (time.perf_counter() - started) * 1000.0
+        with self._stats_lock:
+            self.decode_stats['images'] += 1
+            self.decode_stats['decode_ms'] += decode_ms
+            self.decode_stats['source_pixels'] += width * height
+            self.decode_stats['decoded_pixels'] += img.width * img.height
+        logger.debug(f"Decoded {width}x{height} image at {img.width}x{img.height} in {decode_ms:.1f} ms")
+        return img
+
+    def lookup_barcode(self, img):
+        """
+        Decode EAN/UPC barcodes in the image and look them up in the GTIN index
+        
+        Args:
+            img: Decoded PIL image
+            
+        Returns:
+            Tuple of (GTIN or None, product dictionary or None); the GTIN is
+            also returned for codes that are not in the index
+        """
+        if self.gtin_index is None:
+            return None, None
+        
+        started = time.perf_counter()
+        try:
+            codes = decode_barcodes(img)
+        except Exception as e:
+            logger.warning(f"Barcode decoding failed: {str(e)}")
+            codes = []
+        decode_ms = (time.perf_counter() - started) * 1000.0
+        
+        gtin = None
+        product = None
+        for code in codes:
+            product = self.gtin_index.get(code)
+            if product is not None:
+                gtin = code
+                break
+        if product is None and codes:
+            gtin = codes[0]
+        
+        with self._stats_lock:
+            self.barcode_stats['attempts'] += 1
+            self.barcode_stats['decode_ms'] += decode_ms
+            if codes:
+                self.barcode_stats['decoded'] += 1
+                self.barcode_stats['hits' if product is not None else 'unknown'] += 1
+        if gtin:
+            logger.info(f"Barcode {gtin} {'found in' if product is not None else 'not in'} GTIN index "
+                        f"({decode_ms:.1f} ms)")
+        return gtin, product
+
+    def _barcode_analysis(self, img, gtin, product, on_progress=None, require_text=False):
+        """
+        Build the analysis for a product identified by its barcode
+        
+        Classification and product matching are skipped; OCR only runs if the
+        expiry dates are required.
+        """
+        prediction = {
+            'class_id': -2,  # Spezielle ID für die Erkennung über den Barcode
+            'class_name': product.get('name') or product['description'],
+            'class_description': product.get('description') or product['name'],
+            'confidence': 1.0,
+            'gtin': gtin,
+            'identified_by_barcode': True
+        }
+        metadata = {
+            'model': 'barcode',
+            'tier': 'barcode',
+            'escalated': False,
+            'barcode': {'gtin': gtin, 'known': True},
+            'text_recognition': 'skipped'
+        }
+        if on_progress:
+            on_progress('classification', {'predictions': [prediction], 'metadata': metadata})
+        
+        expiry_dates = []
+        if require_text:
+            # Das Produkt steht fest, der Text wird nur für das MHD gelesen
+            extracted_text = self.extract_text(img)
+            expiry_dates = parse_expiry_dates(extracted_text)
+            metadata['text_recognition'] = 'expiry_only'
+            if on_progress:
+                on_progress('text', {'extracted_text': extracted_text, 'product': None,
+                                     'expiry_dates': expiry_dates})
+        return {'predictions': [prediction], 'expiry_dates': expiry_dates, 'metadata': metadata}
+
     def preprocess_image(self, image_file):
         """
         Preprocess the image for the model
@@ -389,33 +956,135 @@ class ImageRecognizer:
             image_file: File object containing the image
             
         Returns:
-            Tuple of (preprocessed image tensor, original PIL image)
+            Tuple of (preprocessed image tensor, decoded PIL image)
         """
         try:
-            # Read image file
-            image_bytes = image_file.read()
-            
-            # Open image with PIL
-            img = Image.open(io.BytesIO(image_bytes))
+            # Decode the image (already reduced to the needed resolution)
+            img = self.decode_image(image_file)
             
-            # Store original image for text extraction
-            original_img = img.copy()
+            # Apply the preprocessing transform of the first model in the cascade
+            img_tensor = self.classifiers[0].prepare(img)
             
-            # Convert to RGB if not already
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            return img_tensor, img
+        
+        except Exception as e:
+            logger.error(f"Error preprocessing image: {str(e)}")
+            raise
+
+    def classify(self, img_tensor, img=None):
+        """
+        Run the classifier cascade on a preprocessed image
+        
+        The first model answers on its own if its top-1 confidence reaches the
+        cascade threshold, otherwise the image is passed on to the full model.
+        
+        Args:
+            img_tensor: Image tensor preprocessed for the first model in the cascade
+            img: Original PIL image, needed to preprocess for the full model
             
-            # Apply preprocessing transform
-            img_tensor = self.preprocess(img)
+        Returns:
+            Tuple of (top 5 probabilities, top 5 class indices, answering classifier, metadata)
+        """
+        return self.classify_many([img_tensor], [img])[0]
+
+    def classify_many(self, img_tensors, imgs):
+        """
+        Run the classifier cascade on several images as real batches
+        
+        Args:
+            img_tensors: Image tensors preprocessed for the first model in the cascade
+            imgs: Original PIL images (same order), needed to preprocess for the full model
             
-            # Add batch dimension
-            img_tensor = img_tensor.unsqueeze(0)
+        Returns:
+            List of (top 5 probabilities, top 5 class indices, answering classifier, metadata) tuples
+        """
+        first = self.classifiers[0]
+        outputs = [(top5_prob, top5_indices, first) for top5_prob, top5_indices in first.classify_many(img_tensors)]
+        first_confidences = [top5_prob[0] for top5_prob, _, _ in outputs]
+        
+        # Unsichere Bilder gemeinsam an das vollständige Modell weitergeben
+        escalate = []
+        if len(self.classifiers) > 1:
+            escalate = [i for i, confidence in enumerate(first_confidences)
+                        if confidence < self.cascade_threshold and imgs[i] is not None]
+        if escalate:
+            logger.info(f"Fast model {first.name} not confident enough for {len(escalate)} image(s), escalating")
+            full = self.classifiers[-1]
+            escalated_outputs = full.classify_many([full.prepare(imgs[i]) for i in escalate])
+            for i, (top5_prob, top5_indices) in zip(escalate, escalated_outputs):
+                outputs[i] = (top5_prob, top5_indices, full)
+        
+        results = []
+        for i, (top5_prob, top5_indices, classifier) in enumerate(outputs):
+            with self._tier_lock:
+                self.tier_counts[classifier.name] += 1
             
-            return img_tensor, original_img
+            metadata = {
+                'model': classifier.name,
+                'tier': 'fast' if classifier is not self.classifiers[-1] else 'full',
+                'escalated': classifier is not first,
+                'first_tier_confidence': float(first_confidences[i])
+            }
+            results.append((top5_prob, top5_indices, classifier, metadata))
+        return results
+
+    def warm_up(self):
+        """
+        Run one forward pass per model and one OCR call on a blank image
+        
+        The first inference allocates buffers and (for compiled backends)
+        triggers optimizations, and the first OCR call loads the language
+        data. Doing both before the first request keeps that out of its
+        latency. Runtime counters are not touched.
+        """
+        blank = Image.new('RGB', (self.classifier_min_side, self.classifier_min_side), (128, 128, 128))
+        for classifier in self.classifiers:
+            started = time.perf_counter()
+            run_topk(classifier.model, classifier.prepare(blank), 5)
+            logger.info(f"Warm-up forward pass of {classifier.name} took {(time.perf_counter() - started) * 1000:.0f} ms")
         
+        started = time.perf_counter()
+        try:
+            self.ocr_backend.image_to_string(blank.convert('L').resize((200, 48)), psm=7,
+                                             timeout=self.ocr_pass_timeout)
+            logger.info(f"Warm-up OCR call took {(time.perf_counter() - started) * 1000:.0f} ms")
         except Exception as e:
-            logger.error(f"Error preprocessing image: {str(e)}")
-            raise
+            # Ohne OCR funktioniert die Bilderkennung weiterhin
+            logger.warning(f"OCR warm-up failed: {str(e)}")
+
+    def get_metrics(self):
+        """
+        Collect runtime metrics of the recognizer
+        
+        Returns:
+            Dictionary with metrics per component
+        """
+        metrics = {'backend': self.backend}
+        with self._tier_lock:
+            metrics['tiers'] = dict(self.tier_counts)
+        metrics['cache'] = self.prediction_cache.get_metrics()
+        with self._stats_lock:
+            decode = dict(self.decode_stats)
+        decode['avg_decode_ms'] = decode['decode_ms'] / decode['images'] if decode['images'] else 0.0
+        decode['pixel_ratio'] = decode['decoded_pixels'] / decode['source_pixels'] if decode['source_pixels'] else 1.0
+        metrics['decode'] = decode
+        metrics['catalog'] = self.product_catalog.get_metrics()
+        with self._stats_lock:
+            ocr = dict(self.ocr_stats)
+        # Verhältnis der von Tesseract gelesenen Pixel zu den Bildpixeln (ganzes Bild, drei Durchläufe: 3.0)
+        ocr['pixels_per_image_pixel'] = ocr['ocr_pixels'] / ocr['image_pixels'] if ocr['image_pixels'] else 0.0
+        metrics['ocr'] = ocr
+        with self._stats_lock:
+            barcode = dict(self.barcode_stats)
+        barcode['enabled'] = self.gtin_index is not None
+        barcode['index_size'] = len(self.gtin_index) if self.gtin_index is not None else 0
+        barcode['hit_rate'] = barcode['hits'] / barcode['attempts'] if barcode['attempts'] else 0.0
+        barcode['avg_decode_ms'] = barcode['decode_ms'] / barcode['attempts'] if barcode['attempts'] else 0.0
+        metrics['barcode'] = barcode
+        batching = {c.name: c.batcher.get_metrics() for c in self.classifiers if c.batcher is not None}
+        if batching:
+            metrics['batching'] = batching
+        return metrics
 
     def predict(self, image_file):
         """
@@ -427,95 +1096,416 @@ class ImageRecognizer:
         Returns:
             List of top 5 predictions with class names, confidence scores, and extracted text
         """
-        try:
-            # Preprocess the image
-            img_tensor, original_img = self.preprocess_image(image_file)
+        return self.analyze(image_file)['predictions']
+
+    def _format_image_results(self, top5_indices, top5_prob, classifier):
+        """Convert the classifier output into prediction dictionaries"""
+        results = []
+        for idx, prob in zip(top5_indices, top5_prob):
+            class_name = classifier.categories[idx]
+            # Create URL-friendly version of class name for CSS classes
+            class_name_slug = class_name.lower().replace(' ', '_').replace("'", '').replace(',', '')
             
-            # Disable gradient calculation for inference - erst die Bilderkennung durchführen
-            with torch.no_grad():
-                # Forward pass through the model
-                output = self.model(img_tensor)
-                
-                # Apply softmax to convert to probabilities
-                probabilities = torch.nn.functional.softmax(output[0], dim=0)
-                
-                # Get top 5 predictions
-                top5_prob, top5_indices = torch.topk(probabilities, 5)
+            results.append({
+                'class_id': int(idx),
+                'class_name': class_name_slug,
+                'class_description': class_name,
+                'confidence': float(prob)
+            })
+        return results
+
+    def _lookup_exact(self, image_bytes):
+        """
+        Look up an upload in the prediction cache by its exact content
+        
+        Returns:
+            Tuple of (cached analysis or None, content hash)
+        """
+        cache_key = content_hash(image_bytes)
+        cached = self.prediction_cache.get_exact(cache_key)
+        if cached is not None:
+            logger.info("Prediction cache hit (exact)")
+            cached['metadata']['cache'] = 'exact'
+        return cached, cache_key
+
+    def _lookup_similar(self, img, require_text=False):
+        """
+        Look up a decoded image in the prediction cache by perceptual hash
+        
+        A near-duplicate is a different photo, so its expiry dates are not
+        returned, and with require_text (the dates are needed, e.g. for the
+        calendar) near-duplicates are not used at all.
+        
+        Returns:
+            Tuple of (cached analysis or None, perceptual hash)
+        """
+        if not self.prediction_cache.enabled:
+            return None, None
+        
+        # Fast identische Fotos (gleiches Produkt, neu aufgenommen) über den pHash finden
+        phash = perceptual_hash(img)
+        if require_text:
+            return None, phash
+        cached, distance = self.prediction_cache.get_similar(phash)
+        if cached is not None:
+            logger.info(f"Prediction cache hit (perceptual hash distance {distance})")
+            # Das MHD stammt vom anderen Foto und gilt nicht für dieses
+            cached['expiry_dates'] = []
+            cached['metadata']['cache'] = 'near'
+            cached['metadata']['cache_distance'] = distance
+        return cached, phash
+
+    def _complete_analysis(self, original_img, top5_prob, image_results, metadata, on_progress=None,
+                           require_text=False):
+        """
+        Run text recognition if needed and assemble the final predictions
+        
+        Args:
+            original_img: Decoded PIL image
+            top5_prob: Top 5 probabilities of the classifier
+            image_results: Formatted classifier predictions
+            metadata: Request metadata from the classifier cascade
+            on_progress: Optional progress callback (see analyze)
+            require_text: Run OCR for the expiry dates even if the image
+                recognition alone is confident enough
+            
+        Returns:
+            Dictionary with the top 5 'predictions', the 'expiry_dates' found
+            in the text and request 'metadata'
+        """
+        # Extrahiere Text nur, wenn die Bilderkennung nicht sehr sicher ist
+        top_image_confidence = top5_prob[0]
+        
+        # Format the results
+        results = []
+        
+        # Wenn die Bilderkennung sehr sicher ist (>75%), verwende nur diese
+        if top_image_confidence > 0.75 and not require_text:
+            logger.info(f"Image recognition has very high confidence ({top_image_confidence:.2f}), skipping text recognition")
+            extracted_text = ""
+            text_based_product = None
+            metadata['text_recognition'] = 'skipped'
+        elif top_image_confidence > 0.75:
+            # Text nur für das MHD lesen, die Bilderkennung bleibt maßgeblich
+            extracted_text = self.extract_text(original_img)
+            text_based_product = None
+            metadata['text_recognition'] = 'expiry_only'
+        else:
+            # Ansonsten führe auch Texterkennung durch
+            # Extract text from the image
+            extracted_text = self.extract_text(original_img)
+            logger.info(f"Extracted text: {extracted_text}")
+            metadata['text_recognition'] = 'done'
+            
+            # Überprüfen, ob der Text wirklich bedeutungsvoll ist - SEHR STRENGE Regeln
+            text_based_product = None
+            if self.is_meaningful_text(extracted_text):
+                # Nur wenn der Text wirklich sinnvoll ist, identifiziere ein Produkt
+                text_based_product = self.identify_product_from_text(extracted_text)
                 
-                # Convert to Python lists
-                top5_prob = top5_prob.numpy().tolist()
-                top5_indices = top5_indices.numpy().tolist()
+                # Zusätzliche Überprüfung: Ist das führende Bild-Erkennungsergebnis zumindest mäßig sicher?
+                # Wenn ja, müssen wir die Texterkennung sehr spezifisch haben
+                if top_image_confidence > 0.4:
+                    # Bei mittlerer Bildsicherheit muss der Text sehr spezifisch sein (bekanntes Produkt,
+                    # fehlertolerant nur bei langen Begriffen mit wenigen OCR-Fehlern)
+                    if not is_specific_match(text_based_product):
+                        logger.info(f"Image recognition confidence is reasonable ({top_image_confidence:.2f}), text not specific enough")
+                        text_based_product = None
+        
+        # Mindesthaltbarkeitsdaten als ISO-Datum mit Konfidenz
+        expiry_dates = parse_expiry_dates(extracted_text)
+        if expiry_dates:
+            logger.info(f"Expiry date candidates: {', '.join(d['date'] for d in expiry_dates)}")
+        
+        if on_progress and metadata['text_recognition'] != 'skipped':
+            on_progress('text', {'extracted_text': extracted_text, 'product': text_based_product,
+                                 'expiry_dates': expiry_dates})
+        
+        # Wenn ein Produkt aus dem Text erkannt wurde, füge es an erster Stelle hinzu
+        if text_based_product:
+            logger.info(f"Text-based product identified: {text_based_product['description']}")
             
-            # Extrahiere Text nur, wenn die Bilderkennung nicht sehr sicher ist
-            top_image_confidence = top5_prob[0]
+            # Erstelle ein Ergebnisobjekt für das textbasierte Produkt
+            text_result = {
+                'class_id': -1,  # Spezielle ID für textbasierte Erkennung
+                'class_name': text_based_product['name'],
+                'class_description': text_based_product['description'],
+                'confidence': 0.95 * text_based_product.get('confidence_boost', 0.9),  # Anpassung der Konfidenz je nach Qualität
+                'extracted_text': extracted_text,
+                'identified_by_text': True  # Markiere, dass dies durch Text erkannt wurde
+            }
             
-            # Format the results
-            results = []
+            results.append(text_result)
+        
+        # Füge die Bilderkennungsergebnisse hinzu
+        for i, image_result in enumerate(image_results):
+            result = dict(image_result)
             
-            # Wenn die Bilderkennung sehr sicher ist (>75%), verwende nur diese
-            if top_image_confidence > 0.75:
-                logger.info(f"Image recognition has very high confidence ({top_image_confidence:.2f}), skipping text recognition")
-                extracted_text = ""
-                text_based_product = None
-            else:
-                # Ansonsten führe auch Texterkennung durch
-                # Extract text from the image
-                extracted_text = self.extract_text(original_img)
-                logger.info(f"Extracted text: {extracted_text}")
-                
-                # Überprüfen, ob der Text wirklich bedeutungsvoll ist - SEHR STRENGE Regeln
-                text_based_product = None
-                if self.is_meaningful_text(extracted_text):
-                    # Nur wenn der Text wirklich sinnvoll ist, identifiziere ein Produkt
-                    text_based_product = self.identify_product_from_text(extracted_text)
-                    
-                    # Zusätzliche Überprüfung: Ist das führende Bild-Erkennungsergebnis zumindest mäßig sicher?
-                    # Wenn ja, müssen wir die Texterkennung sehr spezifisch haben
-                    if top_image_confidence > 0.4:
-                        # Bei mittlerer Bildsicherheit muss der Text sehr spezifisch sein (bekanntes Produkt)
-                        if not text_based_product or ('confidence_boost' in text_based_product 
-                                and text_based_product['confidence_boost'] < 1.2):
-                            logger.info(f"Image recognition confidence is reasonable ({top_image_confidence:.2f}), text not specific enough")
-                            text_based_product = None
-            
-            # Wenn ein Produkt aus dem Text erkannt wurde, füge es an erster Stelle hinzu
-            if text_based_product:
-                logger.info(f"Text-based product identified: {text_based_product['description']}")
-                
-                # Erstelle ein Ergebnisobjekt für das textbasierte Produkt
-                text_result = {
-                    'class_id': -1,  # Spezielle ID für textbasierte Erkennung
-                    'class_name': text_based_product['name'],
-                    'class_description': text_based_product['description'],
-                    'confidence': 0.95 * text_based_product.get('confidence_boost', 0.9),  # Anpassung der Konfidenz je nach Qualität
-                    'extracted_text': extracted_text,
-                    'identified_by_text': True  # Markiere, dass dies durch Text erkannt wurde
-                }
-                
-                results.append(text_result)
+            # Add extracted text to the first (top) model result only if no text-based product was found
+            if i == 0 and extracted_text and not text_based_product:
+                result['extracted_text'] = extracted_text
             
-            # Füge die Bilderkennungsergebnisse hinzu
-            for i, (idx, prob) in enumerate(zip(top5_indices, top5_prob)):
-                class_name = self.categories[idx]
-                # Create URL-friendly version of class name for CSS classes
-                class_name_slug = class_name.lower().replace(' ', '_').replace("'", '').replace(',', '')
-                
-                result = {
-                    'class_id': int(idx),
-                    'class_name': class_name_slug,
-                    'class_description': class_name,
-                    'confidence': float(prob)
-                }
-                
-                # Add extracted text to the first (top) model result only if no text-based product was found
-                if i == 0 and extracted_text and not text_based_product:
-                    result['extracted_text'] = extracted_text
-                
-                results.append(result)
+            results.append(result)
+        
+        # Begrenze auf maximal 5 Ergebnisse, selbst wenn ein textbasiertes Produkt erkannt wurde
+        return {'predictions': results[:5], 'expiry_dates': expiry_dates, 'metadata': metadata}
+
+    @staticmethod
+    def _cached_has_text(cached, require_text):
+        # Ein Cache-Eintrag ohne Texterkennung reicht nicht, wenn das MHD gebraucht wird
+        return not require_text or cached['metadata'].get('text_recognition', 'skipped') != 'skipped'
+
+    def analyze(self, image_file, on_progress=None, require_text=False):
+        """
+        Make predictions on the image and report how they were obtained
+        
+        Args:
+            image_file: File object containing the image
+            on_progress: Optional callback on_progress(stage, data), called with
+                'classification' as soon as the image predictions are known and
+                with 'text' after OCR and product matching
+            require_text: Always run OCR so expiry dates are found, even if the
+                image recognition is confident
+            
+        Returns:
+            Dictionary with the top 5 'predictions', 'expiry_dates' and request
+            'metadata' (which model/tier of the cascade answered, cache hit or miss)
+        """
+        try:
+            # Identische Uploads direkt aus dem Cache beantworten, ohne zu dekodieren
+            image_bytes = image_file.read()
+            # Genau ein Cache-Ergebnis pro Anfrage zählen: exact, near oder miss
+            cached, cache_key = self._lookup_exact(image_bytes)
+            if cached is not None and self._cached_has_text(cached, require_text):
+                self.prediction_cache.record_lookup('exact')
+                return cached
+            
+            # Decode the image (already reduced to the needed resolution)
+            original_img = self.decode_image(io.BytesIO(image_bytes))
+            
+            # Verpackte Produkte mit bekanntem Barcode ohne Klassifikator und OCR beantworten
+            gtin, product = self.lookup_barcode(original_img)
+            if product is not None:
+                self.prediction_cache.record_lookup('miss')
+                analysis = self._barcode_analysis(original_img, gtin, product, on_progress, require_text)
+                if self.prediction_cache.enabled:
+                    self.prediction_cache.put(cache_key, None, analysis)
+                analysis['metadata']['cache'] = 'miss'
+                return analysis
+            
+            cached, phash = self._lookup_similar(original_img, require_text)
+            if cached is not None:
+                self.prediction_cache.record_lookup('near')
+                return cached
+            self.prediction_cache.record_lookup('miss')
             
-            # Begrenze auf maximal 5 Ergebnisse, selbst wenn ein textbasiertes Produkt erkannt wurde
-            return results[:5]
+            # Erst die Bilderkennung durchführen (ggf. gebündelt mit anderen Anfragen)
+            img_tensor = self.classifiers[0].prepare(original_img)
+            top5_prob, top5_indices, classifier, metadata = self.classify(img_tensor, original_img)
+            if gtin:
+                metadata['barcode'] = {'gtin': gtin, 'known': False}
+            image_results = self._format_image_results(top5_indices, top5_prob, classifier)
+            if on_progress:
+                on_progress('classification', {'predictions': image_results, 'metadata': metadata})
+            
+            analysis = self._complete_analysis(original_img, top5_prob, image_results, metadata, on_progress,
+                                               require_text)
+            if self.prediction_cache.enabled:
+                self.prediction_cache.put(cache_key, phash, analysis)
+            metadata['cache'] = 'miss'
+            return analysis
         
         except Exception as e:
             logger.error(f"Error making prediction: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def _decode_for_batch(self, image_bytes):
+        """
+        Decode one batch upload and try the barcode fast path
+        
+        Returns:
+            Tuple of (image tensor or None on a barcode hit, decoded PIL image, GTIN, product)
+        """
+        original_img = self.decode_image(io.BytesIO(image_bytes))
+        gtin, product = self.lookup_barcode(original_img)
+        if product is not None:
+            return None, original_img, gtin, product
+        return self.classifiers[0].prepare(original_img), original_img, gtin, product
+
+    def iter_analyze_batch(self, images):
+        """
+        Analyze several uploads together, yielding each result when it is ready
+        
+        All images are decoded in parallel, classified as real batches and
+        then go through text recognition concurrently. Cache hits and products
+        identified by their barcode are yielded first.
+        
+        Args:
+            images: List of raw image bytes
+            
+        Yields:
+            Tuples of (index, analysis) in completion order; images that fail
+            yield (index, {'error': message})
+        """
+        cache_keys = {}
+        pending = []
+        for index, image_bytes in enumerate(images):
+            cached, cache_key = self._lookup_exact(image_bytes)
+            if cached is not None:
+                self.prediction_cache.record_lookup('exact')
+                yield index, cached
+                continue
+            cache_keys[index] = cache_key
+            pending.append(index)
+        
+        # Bilder parallel dekodieren und nach Barcodes durchsuchen (PIL gibt dabei den GIL frei)
+        decode_pool = get_pool('batch-decode', self.batch_workers)
+        decode_futures = {index: decode_pool.submit(self._decode_for_batch, images[index]) for index in pending}
+        decoded = {}
+        phashes = {}
+        barcode_hits = {}
+        unknown_gtins = {}
+        for index in pending:
+            try:
+                img_tensor, original_img, gtin, product = decode_futures[index].result()
+            except Exception as e:
+                self.prediction_cache.record_lookup('miss')
+                yield index, {'error': f'Bild konnte nicht gelesen werden: {str(e)}'}
+                continue
+            
+            if product is not None:
+                self.prediction_cache.record_lookup('miss')
+                barcode_hits[index] = (original_img, gtin, product)
+                continue
+            if gtin:
+                unknown_gtins[index] = gtin
+            
+            cached, phash = self._lookup_similar(original_img)
+            if cached is not None:
+                self.prediction_cache.record_lookup('near')
+                yield index, cached
+                continue
+            self.prediction_cache.record_lookup('miss')
+            decoded[index] = (img_tensor, original_img)
+            phashes[index] = phash
+        
+        for index, (original_img, gtin, product) in barcode_hits.items():
+            analysis = self._barcode_analysis(original_img, gtin, product)
+            if self.prediction_cache.enabled:
+                self.prediction_cache.put(cache_keys[index], None, analysis)
+            analysis['metadata']['cache'] = 'miss'
+            yield index, analysis
+        
+        if not decoded:
+            return
+        
+        # Alle verbleibenden Bilder gemeinsam klassifizieren
+        order = list(decoded)
+        try:
+            outputs = self.classify_many([decoded[index][0] for index in order],
+                                         [decoded[index][1] for index in order])
+        except Exception as e:
+            logger.error(f"Error during batch classification: {str(e)}")
+            for index in order:
+                yield index, {'error': f'Fehler bei der Bildverarbeitung: {str(e)}'}
+            return
+        
+        # Texterkennung und Zusammenführung laufen gleichzeitig für alle Bilder
+        pool = get_pool('batch-analysis', self.batch_workers)
+        futures = {}
+        for index, (top5_prob, top5_indices, classifier, metadata) in zip(order, outputs):
+            if index in unknown_gtins:
+                metadata['barcode'] = {'gtin': unknown_gtins[index], 'known': False}
+            image_results = self._format_image_results(top5_indices, top5_prob, classifier)
+            future = pool.submit(self._complete_analysis, decoded[index][1], top5_prob, image_results, metadata)
+            futures[future] = index
+        
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                analysis = future.result()
+            except Exception as e:
+                logger.error(f"Error analyzing batch image {index}: {str(e)}")
+                yield index, {'error': f'Fehler bei der Bildverarbeitung: {str(e)}'}
+                continue
+            
+            if self.prediction_cache.enabled:
+                self.prediction_cache.put(cache_keys[index], phashes[index], analysis)
+            analysis['metadata']['cache'] = 'miss'
+            yield index, analysis
+
+def benchmark_ocr_backends(image_paths, backends=("pytesseract", "tesserocr"), repeat=3):
+    """
+    Compare the per-image OCR latency of the OCR backends
+    
+    Every image runs through the same three passes as extract_text, one
+    after another, so the numbers reflect the cost of the engine itself.
+    
+    Args:
+        image_paths: List of image file paths
+        backends: Names of the backends to compare
+        repeat: Number of timed runs per image
+        
+    Returns:
+        List of dictionaries with one row per backend
+    """
+    images = []
+    for path in image_paths:
+        with Image.open(path) as img:
+            gray = img.convert('L')
+            images.append((gray, ImageEnhance.Contrast(gray).enhance(2.0)))
+    
+    rows = []
+    for name in backends:
+        try:
+            backend = get_ocr_backend(name)
+        except Exception as e:
+            logger.warning(f"Skipping OCR backend {name}: {e}")
+            continue
+        if backend.name != name:
+            logger.warning(f"Skipping OCR backend {name}: not available")
+            continue
+        
+        # Aufwärmdurchlauf (lädt bei tesserocr die Sprachdaten)
+        backend.image_to_string(images[0][0], 11)
+        
+        latencies = []
+        for gray, high_contrast in images:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                backend.image_to_string(gray, 11)
+                backend.image_to_string(high_contrast, 6)
+                backend.image_to_string(gray, 3, whitelist=MHD_WHITELIST)
+                latencies.append((time.perf_counter() - started) * 1000.0)
+        
+        latencies.sort()
+        rows.append({
+            "backend": name,
+            "images": len(images),
+            "latency_ms_avg": round(sum(latencies) / len(latencies), 2),
+            "latency_ms_p50": round(latencies[len(latencies) // 2], 2),
+            "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    # Aufruf: python image_recognition.py <bildordner> - vergleicht die OCR-Backends
+    import sys
+    import json
+    
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        print("Usage: python image_recognition.py <image directory>")
+        sys.exit(1)
+    
+    image_dir = sys.argv[1]
+    paths = sorted(
+        os.path.join(image_dir, name) for name in os.listdir(image_dir)
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+    )
+    if not paths:
+        print(f"No images found in {image_dir}")
+        sys.exit(1)
+    
+    print(json.dumps(benchmark_ocr_backends(paths), indent=2))
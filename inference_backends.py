@@ -0,0 +1,283 @@
+import os
+import sys
+import time
+import json
+import logging
+
+import torch
+
+from model_zoo import load_backbone, load_quantized_backbone, get_default_weights, get_quantized_weights, resolve_name
+
+logger = logging.getLogger(__name__)
+
+# Verfügbare Inferenz-Backends für den Klassifikator
+BACKENDS = ("eager", "channels_last", "torchscript", "dynamic_int8", "static_int8")
+
+# Was tatsächlich in welcher Genauigkeit gerechnet wird (für Berichte)
+BACKEND_PRECISION = {
+    "eager": "fp32",
+    "channels_last": "fp32",
+    "torchscript": "fp32",
+    # quantize_dynamic erfasst nur Linear-Schichten, bei ResNet50 allein die fc-Schicht
+    "dynamic_int8": "fp32, Linear layers int8",
+    "static_int8": "int8",
+}
+
+# Backends, deren kompilierte Modelle von der quantisierten Engine abhängen
+_QUANTIZED_BACKENDS = ("dynamic_int8", "static_int8")
+
+# Kompilierte Modelle werden hier abgelegt, damit spätere Starts das Tracing überspringen
+DEFAULT_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ecofoodai"))
+
+# Eingabegröße, mit der die TorchScript-Modelle getraced werden
+EXAMPLE_INPUT_SHAPE = (1, 3, 224, 224)
+
+
+class ChannelsLastModel(torch.nn.Module):
+    """Wraps a model converted to channels_last so inputs are converted as well"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model.to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+def _select_quantized_engine():
+    # x86/fbgemm auf Intel/AMD, qnnpack auf ARM
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    return torch.backends.quantized.engine
+
+
+def _build_static_int8(model_name, weights):
+    # Vorab kalibriertes int8-Modell aus torchvision (statische Quantisierung)
+    _select_quantized_engine()
+    return load_quantized_backbone(model_name, weights)
+
+
+def _build_dynamic_int8(model_name, weights):
+    # Dynamische Quantisierung betrifft nur die Linear-Schichten (bei ResNet50 die fc-Schicht)
+    _select_quantized_engine()
+    model = load_backbone(model_name, weights)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _compile(model):
+    """Trace and freeze a model into a TorchScript module"""
+    example = torch.zeros(EXAMPLE_INPUT_SHAPE)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        return torch.jit.freeze(traced.eval())
+
+
+def backend_weights(backend, model_name="resnet50", weights=None):
+    """
+    Return the weights a backend actually runs
+
+    static_int8 uses torchvision's pre-calibrated int8 weights, which come
+    with their own float origin and preprocessing; every other backend runs
+    the given (or default) float weights. Use the transforms() of the
+    returned weights to preprocess inputs for the backend.
+
+    Args:
+        backend: One of BACKENDS
+        model_name: Model name from the model zoo
+        weights: Float weights enum, defaults to the model's default weights
+
+    Returns:
+        torchvision weights enum member
+    """
+    if backend == "static_int8":
+        if weights is not None and "unquantized" in weights.meta:
+            return weights
+        return get_quantized_weights(model_name)
+    return weights or get_default_weights(model_name)
+
+
+def cache_path(backend, weights, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Path of the compiled model file for a backend
+
+    The torch version is part of the name because TorchScript archives are
+    not guaranteed to load across versions; for quantized backends also the
+    quantized engine, whose packed weights the archive contains.
+    """
+    weights_name = str(weights).replace('.', '_')
+    torch_version = torch.__version__.split('+')[0]
+    if backend in _QUANTIZED_BACKENDS:
+        backend = f"{backend}-{torch.backends.quantized.engine}"
+    return os.path.join(cache_dir, f"{weights_name}-{backend}-torch{torch_version}.pt")
+
+
+def build_model(backend="eager", model_name="resnet50", weights=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Build a classifier for the given inference backend
+
+    eager and channels_last run the regular torchvision module. torchscript,
+    dynamic_int8 and static_int8 are traced, frozen and saved to cache_dir
+    once; later calls load the compiled file directly. dynamic_int8 only
+    quantizes the Linear layers, static_int8 runs different (pre-quantized)
+    weights, see backend_weights.
+
+    Args:
+        backend: One of BACKENDS
+        model_name: Model name from the model zoo
+        weights: torchvision weights enum, defaults to the model's default weights
+            (replaced by the quantized weights for static_int8)
+        cache_dir: Directory for compiled models (None disables the cache)
+
+    Returns:
+        Callable model in evaluation mode
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+
+    model_name = resolve_name(model_name)
+    weights = backend_weights(backend, model_name, weights)
+
+    if backend == "eager":
+        return load_backbone(model_name, weights)
+
+    if backend == "channels_last":
+        return ChannelsLastModel(load_backbone(model_name, weights)).eval()
+
+    if backend in _QUANTIZED_BACKENDS:
+        _select_quantized_engine()
+
+    path = cache_path(backend, weights, cache_dir) if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            started = time.perf_counter()
+            model = torch.jit.load(path, map_location="cpu")
+            model.eval()
+            logger.info("Loaded compiled %s model from %s in %.2fs", backend, path, time.perf_counter() - started)
+            return model
+        except Exception as e:
+            logger.warning(f"Could not load cached model {path}, recompiling: {str(e)}")
+
+    started = time.perf_counter()
+    if backend == "torchscript":
+        model = _compile(load_backbone(model_name, weights))
+    elif backend == "dynamic_int8":
+        model = _compile(_build_dynamic_int8(model_name, weights))
+    else:
+        model = _compile(_build_static_int8(model_name, weights))
+    logger.info("Compiled %s model in %.2fs", backend, time.perf_counter() - started)
+
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Erst in eine temporäre Datei schreiben, damit parallele Worker nie eine halbe Datei laden
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            torch.jit.save(model, tmp_path)
+            os.replace(tmp_path, path)
+            logger.info("Saved compiled %s model to %s", backend, path)
+        except Exception as e:
+            logger.warning(f"Could not cache compiled model: {str(e)}")
+
+    return model
+
+
+def backend_report(image_paths, backends=BACKENDS, repeat=3, model_name="resnet50", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Compare accuracy and latency of all backends on the same images
+
+    Top-1 agreement is measured against the eager fp32 model. Every backend
+    gets the preprocessing of the weights it runs; same_weights tells whether
+    these are the eager weights, otherwise the agreement compares two
+    different models rather than a compiled or quantized copy.
+
+    Args:
+        image_paths: List of image file paths
+        backends: Backends to compare
+        repeat: Number of timed runs per image
+        model_name: Model name from the model zoo
+        cache_dir: Directory for compiled models
+
+    Returns:
+        List of dictionaries with one row per backend
+    """
+    from PIL import Image
+
+    if not image_paths:
+        raise ValueError("No images given for the backend report")
+
+    images = []
+    for path in image_paths:
+        with Image.open(path) as img:
+            images.append(img.convert('RGB'))
+
+    model_name = resolve_name(model_name)
+    reference_weights = get_default_weights(model_name)
+    reference = None
+    rows = []
+    for backend in ["eager"] + [b for b in backends if b != "eager"]:
+        weights = backend_weights(backend, model_name)
+        preprocess = weights.transforms()
+        tensors = [preprocess(img).unsqueeze(0) for img in images]
+
+        load_started = time.perf_counter()
+        model = build_model(backend, model_name=model_name, weights=weights, cache_dir=cache_dir)
+        load_seconds = time.perf_counter() - load_started
+
+        top1 = []
+        latencies = []
+        with torch.no_grad():
+            # Aufwärmdurchlauf, damit Profiling-Läufe des JIT nicht mitgemessen werden
+            model(tensors[0])
+            for tensor in tensors:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    output = model(tensor)
+                    latencies.append((time.perf_counter() - started) * 1000.0)
+                top1.append(int(output[0].argmax()))
+
+        if reference is None:
+            reference = top1
+
+        latencies.sort()
+        agreement = sum(a == b for a, b in zip(top1, reference)) / len(reference)
+        rows.append({
+            "backend": backend,
+            "weights": str(weights),
+            "same_weights": weights == reference_weights,
+            "precision": BACKEND_PRECISION[backend],
+            "load_seconds": round(load_seconds, 3),
+            "latency_ms_p50": round(latencies[len(latencies) // 2], 2),
+            "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+            "top1_agreement": round(agreement, 4),
+        })
+        if backend not in backends:
+            rows.pop()
+
+    return rows
+
+
+if __name__ == "__main__":
+    # Aufruf: python inference_backends.py <bildordner> [backend ...]
+    # Das Modell kann über CLASSIFIER_MODEL gewählt werden (Standard: resnet50)
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        print("Usage: python inference_backends.py <image directory> [backend ...]")
+        sys.exit(1)
+
+    image_dir = sys.argv[1]
+    selected = tuple(sys.argv[2:]) or BACKENDS
+    paths = sorted(
+        os.path.join(image_dir, name) for name in os.listdir(image_dir)
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+    )
+
+    report = backend_report(paths, backends=selected, model_name=os.environ.get("CLASSIFIER_MODEL", "resnet50"))
+    print(f"{'backend':<15}{'precision':<27}{'load s':>9}{'p50 ms':>10}{'p95 ms':>10}{'top-1 agree':>13}  weights")
+    for row in report:
+        # "*": andere Gewichte als das eager-Modell, die Übereinstimmung vergleicht zwei Modelle
+        marker = "" if row['same_weights'] else " *"
+        print(f"{row['backend']:<15}{row['precision']:<27}{row['load_seconds']:>9.2f}{row['latency_ms_p50']:>10.2f}"
+              f"{row['latency_ms_p95']:>10.2f}{row['top1_agreement']:>13.2%}  {row['weights']}{marker}")
+    print(json.dumps(report, indent=2))
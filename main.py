@@ -1,5 +1,12 @@
+import startup_profile
+
+# Mit STARTUP_PROFILE=<datei.json> Importzeiten, Modell-Ladezeit und erste Anfragen aufzeichnen
+startup_profile.install_from_env()
+
 from app import app
 
+startup_profile.imports_done()
+
 if __name__ == "__main__":
     # Debug-Modus aktivieren und Server auf 0.0.0.0 (alle Interfaces) hören lassen
     app.run(host="0.0.0.0", port=5000, debug=True)
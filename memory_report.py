@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Felder aus /proc/<pid>/smaps_rollup, die für die Auswertung relevant sind (Werte in kB)
+SMAPS_FIELDS = {
+    "Rss": "rss_kb",
+    "Pss": "pss_kb",
+    "Shared_Clean": "shared_clean_kb",
+    "Shared_Dirty": "shared_dirty_kb",
+    "Private_Clean": "private_clean_kb",
+    "Private_Dirty": "private_dirty_kb",
+}
+
+
+def process_memory(pid=None):
+    """
+    Read the memory usage of a process
+
+    PSS (proportional set size) splits shared pages between all processes
+    that map them, so the PSS of all gunicorn workers adds up to the real
+    memory use. Pages shared copy-on-write with the master show up as
+    Shared_*, pages a worker has touched and copied as Private_Dirty.
+
+    Args:
+        pid: Process ID, defaults to the current process
+
+    Returns:
+        Dictionary with memory figures in kB
+    """
+    pid = pid or os.getpid()
+    report = {"pid": pid}
+
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].rstrip(':') in SMAPS_FIELDS:
+                    report[SMAPS_FIELDS[parts[0].rstrip(':')]] = int(parts[1])
+        report["shared_kb"] = report.get("shared_clean_kb", 0) + report.get("shared_dirty_kb", 0)
+        report["private_kb"] = report.get("private_clean_kb", 0) + report.get("private_dirty_kb", 0)
+    except OSError:
+        # Kein /proc (z.B. macOS) - nur die Spitzen-RSS des eigenen Prozesses verfügbar
+        if pid == os.getpid():
+            import resource
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            report["max_rss_kb"] = maxrss // 1024 if sys.platform == "darwin" else maxrss
+    return report
+
+
+def child_pids(pid):
+    """Return the PIDs of the direct children of a process (Linux only)"""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(children))
+
+
+def server_memory_report(master_pid):
+    """
+    Build a memory report for a gunicorn master and all of its workers
+
+    Args:
+        master_pid: PID of the gunicorn master process
+
+    Returns:
+        Dictionary with the master figures, one entry per worker and totals
+    """
+    workers = [process_memory(pid) for pid in child_pids(master_pid)]
+    return {
+        "master": process_memory(master_pid),
+        "workers": workers,
+        "total_worker_pss_kb": sum(w.get("pss_kb", 0) for w in workers),
+        "total_worker_private_kb": sum(w.get("private_kb", 0) for w in workers),
+    }
+
+
+if __name__ == "__main__":
+    # Aufruf: python memory_report.py <master-pid|pidfile>
+    if len(sys.argv) != 2:
+        print("Usage: python memory_report.py <gunicorn master pid or pidfile>")
+        sys.exit(1)
+
+    target = sys.argv[1]
+    if not target.isdigit():
+        with open(target) as f:
+            target = f.read().strip()
+
+    print(json.dumps(server_memory_report(int(target)), indent=2))
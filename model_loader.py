@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# "background": Modell nach dem Start in einem Thread laden; "eager": beim Import blockierend laden
+# (für gunicorn mit preload_app, damit die Gewichte vor dem Fork geladen und geteilt werden)
+DEFAULT_LOAD_MODE = os.environ.get("MODEL_LOADING", "background")
+# Wartezeit (Sekunden), die Clients bis zum nächsten Versuch empfohlen wird
+DEFAULT_RETRY_AFTER = int(os.environ.get("MODEL_RETRY_AFTER", "5"))
+# Abstand (Sekunden) zwischen Ladeversuchen nach einem Fehler
+DEFAULT_RELOAD_INTERVAL = float(os.environ.get("MODEL_LOAD_RETRY_INTERVAL", "30"))
+
+
+class LazyModel:
+    """
+    Builds an expensive object (the image recognizer) off the request path
+
+    The factory and an optional warm-up run in a daemon thread, so the app
+    serves requests that do not need the model right away. Until the object
+    is ready, get() returns None. If loading fails, it is retried after
+    reload_interval seconds. In eager mode start() builds the object in the
+    calling thread and raises if that fails.
+    """
+
+    def __init__(self, factory, warm_up=None, name="model", mode=DEFAULT_LOAD_MODE,
+                 retry_after=DEFAULT_RETRY_AFTER, reload_interval=DEFAULT_RELOAD_INTERVAL, on_ready=None):
+        """
+        Args:
+            factory: Callable without arguments that builds the object
+            warm_up: Optional callable warm_up(obj), run before the object is marked ready
+            name: Name for logs
+            mode: "background" or "eager" (build synchronously in start())
+            retry_after: Seconds clients should wait while the object is not ready
+            reload_interval: Seconds between attempts after a failed load
+            on_ready: Optional callback on_ready(loader), called once the object is ready
+        """
+        self.factory = factory
+        self.warm_up = warm_up
+        self.name = name
+        self.mode = mode
+        self.retry_after = retry_after
+        self.reload_interval = reload_interval
+        self.on_ready = on_ready
+
+        self._value = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = 'idle'
+        self.error = None
+        self.attempts = 0
+        self.load_seconds = None
+        self.warm_up_seconds = None
+        self.created_at = time.time()
+
+    def start(self):
+        """Start loading (only the first call has an effect)"""
+        with self._lock:
+            if self._thread is not None or self.state != 'idle':
+                return self
+            if self.mode == 'eager':
+                self.state = 'loading'
+            else:
+                self._thread = threading.Thread(target=self._load_loop, name=f"{self.name}-loader", daemon=True)
+                self._thread.start()
+                return self
+        self._load_loop()
+        return self
+
+    def _load_loop(self):
+        if self.mode == 'eager':
+            # Ohne Modell soll der Start (wie bisher) fehlschlagen, statt Worker ohne Modell zu forken
+            self._load_once(raise_errors=True)
+            return
+        while not self._load_once():
+            time.sleep(self.reload_interval)
+
+    def _load_once(self, raise_errors=False):
+        self.attempts += 1
+        self.state = 'loading'
+        started = time.perf_counter()
+        try:
+            value = self.factory()
+            self.load_seconds = time.perf_counter() - started
+            if self.warm_up is not None:
+                self.state = 'warming'
+                warm_up_started = time.perf_counter()
+                self.warm_up(value)
+                self.warm_up_seconds = time.perf_counter() - warm_up_started
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            logger.exception(f"Loading {self.name} failed (attempt {self.attempts})")
+            if raise_errors:
+                raise
+            return False
+
+        self._value = value
+        self.error = None
+        self.state = 'ready'
+        self._ready.set()
+        logger.info(f"{self.name} ready after {time.perf_counter() - started:.1f} s "
+                    f"(load {self.load_seconds:.1f} s, warm-up {self.warm_up_seconds or 0.0:.1f} s)")
+        if self.on_ready is not None:
+            try:
+                self.on_ready(self)
+            except Exception as e:
+                logger.warning(f"on_ready callback of {self.name} failed: {str(e)}")
+        return True
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self):
+        """The object, or None while it is still loading"""
+        return self._value if self._ready.is_set() else None
+
+    def wait(self, timeout=None):
+        """
+        Block until the object is ready
+
+        Returns:
+            The object, or None on timeout
+        """
+        self._ready.wait(timeout)
+        return self.get()
+
+    def get_metrics(self):
+        return {
+            'name': self.name,
+            'state': self.state,
+            'mode': self.mode,
+            'attempts': self.attempts,
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+            'warm_up_seconds': self.warm_up_seconds,
+            'uptime_seconds': time.time() - self.created_at
+        }
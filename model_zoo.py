@@ -0,0 +1,117 @@
+import logging
+
+import torchvision
+from torchvision import models
+
+logger = logging.getLogger(__name__)
+
+# Kurznamen für häufig genutzte Klassifikatoren. Jeder andere Name aus
+# torchvision.models.list_models() funktioniert ebenfalls.
+MODEL_ALIASES = {
+    "resnet": "resnet50",
+    "mobilenet": "mobilenet_v3_large",
+    "mobilenet_small": "mobilenet_v3_small",
+    "efficientnet": "efficientnet_b0",
+}
+
+# Zusätzlich registrierte Modelle (Name -> (Builder, Gewichte))
+_CUSTOM_MODELS = {}
+
+
+def register_model(name, builder, weights=None):
+    """
+    Register a custom classification model under a name
+
+    Args:
+        name: Name used to load the model
+        builder: Callable taking a weights argument and returning an nn.Module
+        weights: Weights enum passed to the builder (needs transforms() and meta["categories"])
+    """
+    _CUSTOM_MODELS[name] = (builder, weights)
+
+
+def resolve_name(name):
+    """Map an alias to the torchvision model name"""
+    return MODEL_ALIASES.get(name, name)
+
+
+def available_models():
+    """Return the names of all loadable classification models"""
+    return sorted(set(models.list_models(module=torchvision.models)) | set(_CUSTOM_MODELS))
+
+
+def get_default_weights(name):
+    """
+    Return the default pretrained weights for a model
+
+    Args:
+        name: Model name or alias
+
+    Returns:
+        torchvision weights enum member
+    """
+    name = resolve_name(name)
+    if name in _CUSTOM_MODELS:
+        return _CUSTOM_MODELS[name][1]
+    if name not in models.list_models(module=torchvision.models):
+        raise ValueError(f"Unknown classification model '{name}', see model_zoo.available_models()")
+    return models.get_model_weights(name).DEFAULT
+
+
+def load_backbone(name, weights=None):
+    """
+    Build a classification model in evaluation mode
+
+    Args:
+        name: Model name or alias
+        weights: Weights enum, defaults to the model's default pretrained weights
+
+    Returns:
+        torch.nn.Module
+    """
+    name = resolve_name(name)
+    weights = weights or get_default_weights(name)
+    if name in _CUSTOM_MODELS:
+        model = _CUSTOM_MODELS[name][0](weights=weights)
+    else:
+        model = models.get_model(name, weights=weights)
+    model.eval()
+    return model
+
+
+def get_quantized_weights(name):
+    """
+    Return the default weights of the pre-calibrated int8 variant of a model
+
+    These are not necessarily derived from the same float weights as
+    get_default_weights(name) and bring their own preprocessing.
+
+    Args:
+        name: Model name or alias
+
+    Returns:
+        torchvision quantized weights enum member
+    """
+    name = resolve_name(name)
+    quantized_name = f"quantized_{name}"
+    if quantized_name not in models.list_models(module=torchvision.models.quantization):
+        raise ValueError(f"No pre-quantized variant of '{name}' available in torchvision")
+    return models.get_model_weights(quantized_name).DEFAULT
+
+
+def load_quantized_backbone(name, weights=None):
+    """
+    Build the pre-calibrated int8 variant of a model, if torchvision has one
+
+    Args:
+        name: Model name or alias
+        weights: Quantized weights enum, defaults to get_quantized_weights(name)
+
+    Returns:
+        Quantized torch.nn.Module
+    """
+    name = resolve_name(name)
+    weights = weights or get_quantized_weights(name)
+    model = models.get_model(f"quantized_{name}", weights=weights, quantize=True)
+    model.eval()
+    return model
@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Standardwerte, überschreibbar per Umgebungsvariable
+DEFAULT_MAX_BYTES = int(float(os.environ.get("PREDICTION_CACHE_MB", "16")) * 1024 * 1024)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_ENTRIES", "4096"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+DEFAULT_MAX_DISTANCE = int(os.environ.get("PREDICTION_CACHE_MAX_DISTANCE", "4"))
+
+# Bilder mit geringerer Helligkeitsstreuung gelten als strukturlos und bekommen keinen pHash
+MIN_DETAIL_STD = 4.0
+
+# pHash: 32x32-Graustufenbild, davon die 8x8 niedrigsten DCT-Frequenzen
+_PHASH_SIZE = 32
+_PHASH_LOW = 8
+_PHASH_BITS = _PHASH_LOW * _PHASH_LOW
+
+# Ergebnis einer Cache-Abfrage, genau eines pro Anfrage (siehe PredictionCache.record_lookup)
+LOOKUP_OUTCOMES = ('exact', 'near', 'miss')
+
+
+def _dct_matrix(n):
+    # Orthonormale DCT-II-Matrix, damit die 2D-DCT zwei Matrixmultiplikationen sind
+    k = np.arange(n).reshape(-1, 1)
+    i = np.arange(n).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix
+
+
+_DCT = _dct_matrix(_PHASH_SIZE)
+
+
+def content_hash(image_bytes):
+    """Exact hash of the uploaded file content"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(img):
+    """
+    Compute a 64-bit perceptual hash (pHash) of an image
+
+    Re-encoded, rescaled or slightly shifted photos of the same scene end up
+    within a small Hamming distance of each other.
+
+    Args:
+        img: PIL Image object
+
+    Returns:
+        Hash as Python int, or None for nearly uniform images (blank or
+        completely dark photos would otherwise all share the same hash)
+    """
+    small = img.convert('L').resize((_PHASH_SIZE, _PHASH_SIZE), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.float64)
+    if pixels.std() < MIN_DETAIL_STD:
+        return None
+    dct = _DCT @ pixels @ _DCT.T
+    low = dct[:_PHASH_LOW, :_PHASH_LOW].flatten()
+    # Gleichanteil (DC) nicht in den Median einbeziehen
+    bits = low > np.median(low[1:])
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+def hash_bands(phash, count):
+    """
+    Split a pHash into count bit bands
+
+    Two hashes within count - 1 bits of each other agree completely in at
+    least one band (pigeonhole principle), so a near-duplicate search only
+    has to compare entries that share a band.
+
+    Returns:
+        List of (band index, band value) keys
+    """
+    width = _PHASH_BITS // count
+    keys = []
+    for index in range(count):
+        start = index * width
+        bits = width if index < count - 1 else _PHASH_BITS - start
+        keys.append((index, (phash >> start) & ((1 << bits) - 1)))
+    return keys
+
+
+class PredictionCache:
+    """
+    LRU/TTL cache for prediction results
+
+    Entries are found by the exact content hash of the upload or, for
+    near-duplicate photos, by a perceptual hash within max_distance bits.
+    The perceptual hashes are indexed by max_distance + 1 bit bands, so a
+    near-duplicate lookup only compares the entries sharing a band instead of
+    scanning the whole cache. Values are stored as JSON so callers always get
+    an independent copy and the byte size of the cache is known exactly.
+
+    The lookups do not count hits and misses themselves; the caller reports
+    one outcome per request with record_lookup, because only it knows
+    whether a hit was actually used.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.band_count = max(1, min(_PHASH_BITS, max_distance + 1))
+
+        self._lock = threading.Lock()
+        # content_hash -> (perceptual_hash, json_value, expires_at)
+        self._entries = OrderedDict()
+        # (Band-Index, Bandwert) -> content_hashes mit diesem Band
+        self._bands = {}
+        self._bytes = 0
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def _remove(self, key):
+        phash, payload, _ = self._entries.pop(key)
+        self._bytes -= len(payload)
+        if phash is not None:
+            for band in hash_bands(phash, self.band_count):
+                keys = self._bands.get(band)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._bands[band]
+
+    def record_lookup(self, outcome):
+        """Count the outcome of one request's cache lookup ('exact', 'near' or 'miss')"""
+        if not self.enabled:
+            return
+        if outcome not in LOOKUP_OUTCOMES:
+            raise ValueError(f"Unknown cache lookup outcome '{outcome}'")
+        with self._lock:
+            if outcome == 'exact':
+                self.exact_hits += 1
+            elif outcome == 'near':
+                self.near_hits += 1
+            else:
+                self.misses += 1
+
+    def get_exact(self, key):
+        """
+        Look up a result by exact content hash
+
+        Returns:
+            Cached value or None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            payload = entry[1]
+        return json.loads(payload)
+
+    def get_similar(self, phash):
+        """
+        Look up a result by perceptual hash
+
+        Returns:
+            Tuple of (cached value, Hamming distance) or (None, None)
+        """
+        if not self.enabled or phash is None:
+            return None, None
+        bands = hash_bands(phash, self.band_count)
+        with self._lock:
+            candidates = {key for band in bands for key in self._bands.get(band, ())}
+            candidates = [(key, self._entries[key][0]) for key in candidates]
+
+        # Abstände außerhalb der Sperre berechnen
+        matches = sorted((distance, key) for key, distance in
+                         ((key, hamming_distance(phash, entry_hash)) for key, entry_hash in candidates)
+                         if distance <= self.max_distance)
+
+        with self._lock:
+            now = time.monotonic()
+            for distance, key in matches:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[2] <= now:
+                    self._remove(key)
+                    self.expirations += 1
+                    continue
+                self._entries.move_to_end(key)
+                payload = entry[1]
+                break
+            else:
+                return None, None
+        return json.loads(payload), distance
+
+    def put(self, key, phash, value):
+        """
+        Store a result
+
+        Args:
+            key: Exact content hash
+            phash: Perceptual hash of the decoded image (None: exact lookups only)
+            value: JSON-serializable result
+        """
+        if not self.enabled:
+            return
+        payload = json.dumps(value, separators=(',', ':'))
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (phash, payload, time.monotonic() + self.ttl_seconds)
+            self._bytes += len(payload)
+            if phash is not None:
+                for band in hash_bands(phash, self.band_count):
+                    self._bands.setdefault(band, set()).add(key)
+
+            # Älteste Einträge verdrängen, bis Größen- und Anzahlgrenze eingehalten sind
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+            self._bytes = 0
+
+    def get_metrics(self):
+        """Return cache counters and size as a dictionary"""
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -0,0 +1,435 @@
+import io
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+from worker_pools import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Grenzen für asynchrone Vorhersage-Jobs, überschreibbar per Umgebungsvariable
+DEFAULT_JOB_WORKERS = int(os.environ.get("PREDICTION_JOB_WORKERS", "2"))
+DEFAULT_MAX_QUEUED = int(os.environ.get("PREDICTION_JOB_QUEUE", "16"))
+DEFAULT_MAX_JOB_AGE = float(os.environ.get("PREDICTION_JOB_MAX_AGE", "60"))
+DEFAULT_RESULT_TTL = float(os.environ.get("PREDICTION_JOB_RESULT_TTL", "300"))
+# Laufende Jobs werden nach so vielen Sekunden als abgelaufen gemeldet und geben ihren Platz frei
+DEFAULT_MAX_RUN_SECONDS = float(os.environ.get("PREDICTION_JOB_TIMEOUT", "120"))
+# Gemeinsame SQLite-Datei für Status und Ergebnisse, damit jeder Worker-Prozess jeden Job kennt
+# (leer: nur im Speicher des annehmenden Workers)
+DEFAULT_DB_PATH = os.environ.get("PREDICTION_JOB_DB", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "prediction_jobs.db"))
+
+# Zustände, in denen ein Job abgeschlossen ist
+FINISHED_STATES = ('done', 'failed', 'expired')
+
+# So oft liest ein Event-Stream den Zustand eines Jobs aus einem anderen Worker nach (Sekunden)
+_POLL_INTERVAL = 0.25
+
+
+class JobQueueFull(Exception):
+    """Raised when no more jobs can be accepted"""
+
+    def __init__(self, retry_after):
+        super().__init__("Prediction job queue is full")
+        self.retry_after = retry_after
+
+
+class PredictionJob:
+    """State and progress events of one asynchronous prediction"""
+
+    def __init__(self, image_bytes, filename=None, store=None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.image_bytes = image_bytes
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        # Liste von (Ereignisname, Daten); wächst nur, damit Streams per Index lesen können
+        self.events = []
+        self.store = store
+        self._condition = threading.Condition()
+        self._save()
+
+    def _save(self):
+        # Jede Zustandsänderung auch in die gemeinsame Datei schreiben
+        if self.store is None:
+            return
+        try:
+            self.store.save(self.to_state())
+        except sqlite3.Error as e:
+            logger.warning(f"Saving prediction job {self.id} failed: {str(e)}")
+
+    def start(self):
+        with self._condition:
+            self.started_at = time.time()
+            self.status = 'running'
+            self._save()
+
+    def add_event(self, name, data):
+        with self._condition:
+            if self.status in FINISHED_STATES:
+                return
+            self.events.append((name, data))
+            self._save()
+            self._condition.notify_all()
+
+    def finish(self, status, result=None, error=None):
+        """
+        Mark the job as finished
+
+        Returns:
+            False if the job had already finished (e.g. a late result after
+            the job timed out); the new outcome is then discarded
+        """
+        with self._condition:
+            if self.status in FINISHED_STATES:
+                return False
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.image_bytes = None
+            if status == 'done':
+                self.events.append(('result', result))
+            else:
+                self.events.append(('error', {'status': status, 'error': error}))
+            self._save()
+            self._condition.notify_all()
+            return True
+
+    def wait_for_events(self, index, timeout):
+        """
+        Wait until there are events after the given index
+
+        Returns:
+            List of new (name, data) events (empty on timeout)
+        """
+        with self._condition:
+            if len(self.events) <= index and self.status not in FINISHED_STATES:
+                self._condition.wait(timeout)
+            return self.events[index:]
+
+    def to_state(self):
+        """Complete state as a JSON-serializable dictionary (as stored in JobStore)"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+            'events': self.events
+        }
+
+    def to_dict(self):
+        with self._condition:
+            data = {
+                'id': self.id,
+                'status': self.status,
+                'filename': self.filename,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                # Zwischenergebnisse (z.B. Bildklassifikation vor der Texterkennung)
+                'progress': {name: data for name, data in self.events if name not in ('result', 'error')}
+            }
+            if self.status == 'done':
+                data['result'] = self.result
+            elif self.error:
+                data['error'] = self.error
+            return data
+
+
+class StoredJob(PredictionJob):
+    """
+    Read-only view of a job run by another worker process
+
+    The state comes from the JobStore; wait_for_events polls the store
+    instead of waiting on the condition of the running job.
+    """
+
+    def __init__(self, state, store):
+        self.id = state['id']
+        self.filename = state['filename']
+        self.image_bytes = None
+        self.store = store
+        self._condition = threading.Condition()
+        self._apply(state)
+
+    def _apply(self, state):
+        self.created_at = state['created_at']
+        self.started_at = state['started_at']
+        self.finished_at = state['finished_at']
+        self.status = state['status']
+        self.result = state['result']
+        self.error = state['error']
+        self.events = [tuple(event) for event in state['events']]
+
+    def _reload(self):
+        try:
+            state = self.store.load(self.id)
+        except sqlite3.Error as e:
+            logger.warning(f"Loading prediction job {self.id} failed: {str(e)}")
+            return
+        if state is not None:
+            with self._condition:
+                self._apply(state)
+
+    def wait_for_events(self, index, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                if len(self.events) > index or self.status in FINISHED_STATES:
+                    return self.events[index:]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            time.sleep(min(_POLL_INTERVAL, remaining))
+            self._reload()
+
+
+class JobStore:
+    """
+    Job state shared by all worker processes in an SQLite file
+
+    The worker that accepted a job runs it and writes every state change;
+    any worker can then answer status and event requests for it.
+    Connections are kept per thread and process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS prediction_jobs (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    finished_at REAL
+                )
+            """)
+
+    def _connection(self):
+        pid = os.getpid()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != pid:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+    def save(self, state):
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO prediction_jobs VALUES (?, ?, ?)",
+                               (state['id'], json.dumps(state, separators=(',', ':')), state['finished_at']))
+
+    def load(self, job_id):
+        """State dictionary of the job or None"""
+        row = self._connection().execute("SELECT state FROM prediction_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def purge(self, finished_before):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM prediction_jobs WHERE finished_at < ?", (finished_before,))
+
+
+class JobManager:
+    """
+    Runs the recognition pipeline for asynchronous /predict requests
+
+    At most max_workers jobs run at once and at most max_queued wait; further
+    submissions raise JobQueueFull. Queued jobs older than max_job_age are not
+    started anymore, running jobs are expired after max_run_seconds, finished
+    jobs are kept for result_ttl seconds. With a db_path the job state is also
+    written to a JobStore, so every worker process can answer for any job.
+    """
+
+    def __init__(self, run_fn, max_workers=DEFAULT_JOB_WORKERS, max_queued=DEFAULT_MAX_QUEUED,
+                 max_job_age=DEFAULT_MAX_JOB_AGE, result_ttl=DEFAULT_RESULT_TTL,
+                 max_run_seconds=DEFAULT_MAX_RUN_SECONDS, db_path=DEFAULT_DB_PATH):
+        self.run_fn = run_fn
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_job_age = max_job_age
+        self.result_ttl = result_ttl
+        self.max_run_seconds = max_run_seconds
+        self.store = None
+        if db_path:
+            try:
+                self.store = JobStore(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Prediction job database {db_path} not available, jobs stay in this process: {str(e)}")
+
+        self._lock = threading.Lock()
+        self._jobs = {}
+        # IDs der Jobs, die noch einen Platz belegen (wartend oder laufend)
+        self._slots = set()
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.timed_out = 0
+
+    def _purge(self, now):
+        # Hängende Analysen melden und ihren Platz freigeben; der Thread selbst lässt sich nicht beenden,
+        # sein spätes Ergebnis wird verworfen
+        for job in list(self._jobs.values()):
+            if job.status == 'running' and now - job.started_at > self.max_run_seconds \
+                    and job.finish('expired', error='Die Analyse hat das Zeitlimit überschritten'):
+                logger.warning(f"Prediction job {job.id} exceeded {self.max_run_seconds} s")
+                self.timed_out += 1
+                self._slots.discard(job.id)
+
+        stale = [job_id for job_id, job in self._jobs.items()
+                 if job.finished_at is not None and now - job.finished_at > self.result_ttl]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+    def submit(self, image_bytes, filename=None):
+        """
+        Queue a prediction job
+
+        Args:
+            image_bytes: Raw content of the uploaded image
+            filename: Original file name (informational)
+
+        Returns:
+            PredictionJob
+
+        Raises:
+            JobQueueFull: If too many jobs are queued or running
+        """
+        with self._lock:
+            now = time.time()
+            self._purge(now)
+            if len(self._slots) >= self.max_workers + self.max_queued:
+                self.rejected += 1
+                # Grobe Schätzung, wann wieder ein Platz frei wird
+                raise JobQueueFull(retry_after=max(1, int(self.max_job_age / 4)))
+            job = PredictionJob(image_bytes, filename, store=self.store)
+            self._jobs[job.id] = job
+            self._slots.add(job.id)
+            self.submitted += 1
+
+        if self.store is not None and self.submitted % 50 == 0:
+            try:
+                self.store.purge(now - self.result_ttl)
+            except sqlite3.Error as e:
+                logger.warning(f"Purging prediction jobs failed: {str(e)}")
+
+        get_pool('prediction-jobs', self.max_workers).submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        try:
+            if time.time() - job.created_at > self.max_job_age:
+                logger.warning(f"Prediction job {job.id} expired in the queue")
+                job.finish('expired', error='Job wartete zu lange in der Warteschlange')
+                with self._lock:
+                    self.expired += 1
+                return
+
+            job.start()
+            result = self.run_fn(io.BytesIO(job.image_bytes), on_progress=job.add_event)
+            if job.finish('done', result=result):
+                with self._lock:
+                    self.completed += 1
+        except Exception as e:
+            logger.exception(f"Prediction job {job.id} failed")
+            if job.finish('failed', error=str(e)):
+                with self._lock:
+                    self.failed += 1
+        finally:
+            with self._lock:
+                self._slots.discard(job.id)
+
+    def get(self, job_id):
+        """
+        Return the job with the given ID or None
+
+        Jobs of this process are returned directly, jobs accepted by another
+        worker as a StoredJob read from the shared store.
+        """
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+
+        try:
+            state = self.store.load(job_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Loading prediction job {job_id} failed: {str(e)}")
+            return None
+        if state is None or (state['finished_at'] is not None and now - state['finished_at'] > self.result_ttl):
+            return None
+        # Läuft ein Job über alle Zeitlimits hinaus, ist sein Worker beendet worden
+        if state['status'] not in FINISHED_STATES \
+                and now - state['created_at'] > self.max_job_age + self.max_run_seconds:
+            state['status'] = 'expired'
+            state['error'] = 'Der Worker, der den Job ausgeführt hat, wurde beendet'
+            state['finished_at'] = now
+            state['events'].append(('error', {'status': 'expired', 'error': state['error']}))
+        return StoredJob(state, self.store)
+
+    def stream(self, job, keepalive_seconds=15):
+        """
+        Generate Server-Sent Events for a job
+
+        Already recorded events are replayed first, so a client that connects
+        late still receives the classification before the text result.
+
+        Yields:
+            SSE-formatted strings
+        """
+        index = 0
+        while True:
+            events = job.wait_for_events(index, keepalive_seconds)
+            if not events:
+                # Kommentarzeile hält die Verbindung über Proxys hinweg offen
+                yield ": keep-alive\n\n"
+                continue
+
+            for name, data in events:
+                index += 1
+                yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+                if name in ('result', 'error'):
+                    return
+
+    def get_metrics(self):
+        """Return queue depth and job counters as a dictionary"""
+        with self._lock:
+            now = time.time()
+            self._purge(now)
+            queued = [job for job in self._jobs.values() if job.status == 'queued']
+            return {
+                'active': len(self._slots),
+                'queued': len(queued),
+                'oldest_queued_age_s': max((now - job.created_at for job in queued), default=0.0),
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expired,
+                'timed_out': self.timed_out,
+                'shared': self.store is not None
+            }
@@ -0,0 +1,615 @@
+import os
+import re
+import sys
+import csv
+import json
+import mmap
+import time
+import logging
+import argparse
+import threading
+from array import array
+from bisect import bisect_left
+
+from text_matcher import AhoCorasickMatcher
+from fuzzy_matcher import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+# Pfad zum kompilierten Katalog; ohne Datei werden die eingebauten Tabellen verwendet
+DEFAULT_CATALOG_PATH = os.environ.get("PRODUCT_CATALOG", "")
+# Wie oft (Sekunden) geprüft wird, ob sich die Katalogdatei geändert hat
+DEFAULT_CHECK_INTERVAL = float(os.environ.get("PRODUCT_CATALOG_CHECK_INTERVAL", "5"))
+# Fehlertolerante Suche (z.B. "Weizenrnehl" -> "Weizenmehl") über einen Trigramm-Index
+FUZZY_MATCHING = os.environ.get("FUZZY_MATCHING", "1").lower() in ("1", "true", "yes")
+# Ab diesem confidence_boost ist ein Textbegriff spezifisch genug, eine mäßig sichere Bilderkennung zu übersteuern
+SPECIFIC_BOOST = 1.2
+# Fehlertolerante Treffer übersteuern sie nur bei langen Begriffen mit wenigen Korrekturen
+# (höchstens FUZZY_OVERRIDE_MAX_RATIO Korrekturen je Buchstabe, "Vol1milch" ja, "Buttcr" nein)
+FUZZY_OVERRIDE_MIN_LENGTH = int(os.environ.get("FUZZY_OVERRIDE_MIN_LENGTH", "7"))
+FUZZY_OVERRIDE_MAX_RATIO = float(os.environ.get("FUZZY_OVERRIDE_MAX_RATIO", "0.25"))
+# Wortschatz-Prüfung nur für lange Wörter fehlertolerant (kurze wie "Sand" -> "Land" wären sonst bekannt)
+FUZZY_MIN_WORD_LENGTH = int(os.environ.get("FUZZY_MIN_WORD_LENGTH", "7"))
+
+# Kennung und Version des Dateiformats
+CATALOG_MAGIC = b"EFCATLG1"
+CATALOG_VERSION = 1
+
+# Bekannte Produktbegriffe (aus Textfragmenten zu Produktbeschreibungen)
+PRODUCT_TEXT_MAPPING = {
+    "Mehl": {"name": "Mehl", "description": "Weizenmehl", "confidence_boost": 1.2},
+    "Weizenmehl": {"name": "Weizenmehl", "description": "Weizenmehl", "confidence_boost": 1.5},
+    "Zucker": {"name": "Zucker", "description": "Zucker", "confidence_boost": 1.2},
+    "Raffinadezucker": {"name": "Raffinadezucker", "description": "Feiner Zucker", "confidence_boost": 1.5},
+    "Milch": {"name": "Milch", "description": "Frische Milch", "confidence_boost": 1.2},
+    "Vollmilch": {"name": "Vollmilch", "description": "Vollmilch", "confidence_boost": 1.5},
+    "Brot": {"name": "Brot", "description": "Brot", "confidence_boost": 1.2},
+    "Vollkornbrot": {"name": "Vollkornbrot", "description": "Vollkornbrot", "confidence_boost": 1.5},
+    "Wasser": {"name": "Wasser", "description": "Mineralwasser", "confidence_boost": 1.2},
+    "Mineralwasser": {"name": "Mineralwasser", "description": "Mineralwasser", "confidence_boost": 1.5},
+    "Butter": {"name": "Butter", "description": "Butter", "confidence_boost": 1.5},
+    "Käse": {"name": "Käse", "description": "Käse", "confidence_boost": 1.2},
+    "Gouda": {"name": "Gouda", "description": "Gouda Käse", "confidence_boost": 1.5},
+    "Buch": {"name": "Buch", "description": "Buch", "confidence_boost": 1.2},
+    "ISBN": {"name": "Buch", "description": "Buch mit ISBN", "confidence_boost": 1.5},
+    "Roman": {"name": "Roman", "description": "Romanwerk", "confidence_boost": 1.3},
+    "Kaffee": {"name": "Kaffee", "description": "Kaffee", "confidence_boost": 1.3},
+    "Tee": {"name": "Tee", "description": "Tee", "confidence_boost": 1.3},
+    "Zeitung": {"name": "Zeitung", "description": "Tageszeitung", "confidence_boost": 1.3},
+    "Magazin": {"name": "Magazin", "description": "Zeitschrift", "confidence_boost": 1.3},
+    "Wein": {"name": "Wein", "description": "Weinflasche", "confidence_boost": 1.3},
+    "Rotwein": {"name": "Rotwein", "description": "Rotwein", "confidence_boost": 1.5},
+    "Weißwein": {"name": "Weißwein", "description": "Weißwein", "confidence_boost": 1.5}
+}
+
+# Bekannte Wörter für die Prüfung auf sinnvollen Text (Vergleich mit kleingeschriebenen Wörtern)
+COMMON_GERMAN_WORDS = ["und", "der", "die", "das", "mit", "für", "von", "bei", "aus", "Buch",
+                       "Text", "Wort", "Preis", "Euro", "Kauf", "Geld", "Zeit", "Jahr", "Leben",
+                       "Mensch", "Mann", "Frau", "Kind", "Stadt", "Land", "Haus", "Auto", "Wasser",
+                       "Essen", "Milch", "Brot", "Zucker", "Salz", "Butter", "Käse", "Fleisch",
+                       "Obst", "Gemüse", "Wein", "Bier", "Hotel", "Restaurant", "Schule", "Arbeit",
+                       "Schrift", "Brief", "Post", "Zeitung", "Markt", "Straße", "Zimmer", "Tisch",
+                       "Stuhl", "Bett", "Küche", "Bad", "Wohnung", "Fenster", "Tür", "Dach", "Wand",
+                       "Mehl", "Weizen", "Weißmehl", "Weizenmehl", "Vollkorn", "Vollkornmehl", "Teig",
+                       "Teigwaren", "Pasta", "Spaghetti", "Nudel", "Nudeln", "Reis", "Kartoffel",
+                       "Kartoffeln", "Getränk", "Getränke", "Cola", "Limonade", "Saft", "Apfel",
+                       "Banane", "Orange", "Birne", "Erdbeere", "Himbeere", "Brombeere", "Heidelbeere"]
+
+# Reihenfolge der uint32-Tabellen und Byte-Blöcke in der Datei
+_SECTIONS = ("term_offsets", "term_blob", "value_offsets", "value_blob", "pattern_lengths",
+             "edge_start", "edge_chars", "edge_targets", "fail", "out_start", "out_terms",
+             "word_offsets", "word_blob")
+_BLOB_SECTIONS = ("term_blob", "value_blob", "word_blob")
+
+
+def _string_table(strings):
+    # Offsets (n+1 Einträge) plus aneinandergehängte UTF-8-Bytes
+    offsets = array('I', [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def build_catalog(products, vocabulary, path):
+    """
+    Compile product terms and vocabulary into a memory-mappable catalog file
+
+    The file contains the Aho-Corasick automaton of all product terms as flat
+    integer arrays, the product records as JSON and the vocabulary as a sorted
+    string table. It is written to a temporary file first and then renamed,
+    so running workers never see a half-written catalog.
+
+    Args:
+        products: Mapping of term -> product dict (or iterable of pairs); the
+            order decides ties between equally scored terms
+        vocabulary: Iterable of known words
+        path: Output file path
+
+    Returns:
+        Dictionary with the number of terms, automaton states and words
+    """
+    items = list(products.items() if hasattr(products, 'items') else products)
+    matcher = AhoCorasickMatcher(items)
+    goto, fail, output, lengths = matcher.tables()
+
+    term_offsets, term_blob = _string_table(matcher.terms)
+    value_offsets, value_blob = _string_table(
+        json.dumps(value, ensure_ascii=False, separators=(',', ':')) for value in matcher.values)
+
+    # Übergänge pro Zustand nach Codepoint sortiert, damit sie per Binärsuche gefunden werden
+    edge_start = array('I', [0])
+    edge_chars = array('I')
+    edge_targets = array('I')
+    for transitions in goto:
+        for char, target in sorted(transitions.items()):
+            edge_chars.append(ord(char))
+            edge_targets.append(target)
+        edge_start.append(len(edge_chars))
+
+    out_start = array('I', [0])
+    out_terms = array('I')
+    for term_ids in output:
+        out_terms.extend(term_ids)
+        out_start.append(len(out_terms))
+
+    words = sorted(set(vocabulary), key=lambda word: word.encode('utf-8'))
+    word_offsets, word_blob = _string_table(words)
+
+    sections = {
+        "term_offsets": term_offsets, "term_blob": term_blob,
+        "value_offsets": value_offsets, "value_blob": value_blob,
+        "pattern_lengths": array('I', lengths),
+        "edge_start": edge_start, "edge_chars": edge_chars, "edge_targets": edge_targets,
+        "fail": array('I', fail), "out_start": out_start, "out_terms": out_terms,
+        "word_offsets": word_offsets, "word_blob": word_blob,
+    }
+
+    # Layout berechnen: jeder Abschnitt beginnt an einer 8-Byte-Grenze
+    header = {"version": CATALOG_VERSION, "byteorder": sys.byteorder,
+              "terms": len(matcher.terms), "states": len(goto), "words": len(words), "sections": {}}
+    payloads = [bytes(sections[name]) if name in _BLOB_SECTIONS else sections[name].tobytes() for name in _SECTIONS]
+    # Die Headergröße hängt von den Offsets ab, daher mit großzügigem Platz reservieren
+    header_size = 4096
+    while True:
+        offset = header_size
+        for name, payload in zip(_SECTIONS, payloads):
+            header["sections"][name] = [offset, len(payload)]
+            offset += (len(payload) + 7) // 8 * 8
+        encoded = json.dumps(header).encode('utf-8')
+        if len(CATALOG_MAGIC) + 4 + len(encoded) <= header_size:
+            break
+        header_size *= 2
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(CATALOG_MAGIC)
+        f.write(len(encoded).to_bytes(4, 'little'))
+        f.write(encoded)
+        for name, payload in zip(_SECTIONS, payloads):
+            f.seek(header["sections"][name][0])
+            f.write(payload)
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+
+    logger.info("Compiled catalog %s: %d terms, %d states, %d words", path, len(matcher.terms), len(goto), len(words))
+    return {"terms": len(matcher.terms), "states": len(goto), "words": len(words)}
+
+
+class CompiledCatalog:
+    """
+    Read-only view of a compiled catalog file
+
+    The file is memory-mapped and read in place, so all worker processes
+    share its pages through the page cache instead of each holding the
+    tables on its own heap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(CATALOG_MAGIC)] != CATALOG_MAGIC:
+            raise ValueError(f"{path} is not a product catalog file")
+        header_start = len(CATALOG_MAGIC) + 4
+        header_length = int.from_bytes(self._mmap[len(CATALOG_MAGIC):header_start], 'little')
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+        if header["version"] != CATALOG_VERSION:
+            raise ValueError(f"Unsupported catalog version {header['version']} in {path}")
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"Catalog {path} was built for {header['byteorder']}-endian machines")
+
+        self.term_count = header["terms"]
+        self.state_count = header["states"]
+        self.word_count = header["words"]
+
+        view = memoryview(self._mmap)
+        for name in _SECTIONS:
+            offset, length = header["sections"][name]
+            section = view[offset:offset + length]
+            setattr(self, f"_{name}", section if name in _BLOB_SECTIONS else section.cast('I'))
+
+    def __len__(self):
+        return self.term_count
+
+    @staticmethod
+    def _string(offsets, blob, index):
+        return str(blob[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def term(self, term_id):
+        return self._string(self._term_offsets, self._term_blob, term_id)
+
+    def value(self, term_id):
+        return json.loads(self._string(self._value_offsets, self._value_blob, term_id))
+
+    def words(self):
+        for index in range(self.word_count):
+            yield self._string(self._word_offsets, self._word_blob, index)
+
+    def _matches(self, text):
+        # Wie AhoCorasickMatcher, aber auf den Arrays der Datei
+        edge_start = self._edge_start
+        edge_chars = self._edge_chars
+        edge_targets = self._edge_targets
+        fail = self._fail
+        out_start = self._out_start
+        state = 0
+        for position, char in enumerate(text.lower()):
+            code = ord(char)
+            while True:
+                low, high = edge_start[state], edge_start[state + 1]
+                index = bisect_left(edge_chars, code, low, high)
+                if index < high and edge_chars[index] == code:
+                    state = edge_targets[index]
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if out_start[state] != out_start[state + 1]:
+                yield position, self._out_terms[out_start[state]:out_start[state + 1]]
+
+    def find_all(self, text):
+        """
+        Find all term occurrences in a text
+
+        Yields:
+            Tuples of (start, end, term_id) with positions in text.lower()
+        """
+        for position, term_ids in self._matches(text):
+            for term_id in term_ids:
+                yield position + 1 - self._pattern_lengths[term_id], position + 1, term_id
+
+    def matched_ids(self, text):
+        """Return the IDs of all terms contained in the text"""
+        found = set()
+        for _, term_ids in self._matches(text):
+            found.update(term_ids)
+        return found
+
+    def best_match(self, text, score):
+        """
+        Return the product of the best-scoring term contained in the text
+
+        Args:
+            text: Text to search
+            score: Callable (term, product) -> number; only scores above 0 count
+
+        Returns:
+            Product dict or None. On equal scores the term listed first wins.
+        """
+        best_value = None
+        best_score = 0
+        for term_id in sorted(self.matched_ids(text)):
+            value = self.value(term_id)
+            term_score = score(self.term(term_id), value)
+            if term_score > best_score:
+                best_score = term_score
+                best_value = value
+        return best_value
+
+    def contains_word(self, word):
+        """Check whether a word is in the vocabulary (exact comparison)"""
+        key = word.encode('utf-8')
+        offsets = self._word_offsets
+        blob = self._word_blob
+        low, high = 0, self.word_count
+        while low < high:
+            middle = (low + high) // 2
+            if blob[offsets[middle]:offsets[middle + 1]].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low < self.word_count and blob[offsets[low]:offsets[low + 1]].tobytes() == key
+
+
+class MemoryCatalog:
+    """Catalog built in memory from Python tables (used without a catalog file)"""
+
+    path = None
+
+    def __init__(self, products, vocabulary):
+        self._matcher = AhoCorasickMatcher(products)
+        self._words = frozenset(vocabulary)
+        self.term_count = len(self._matcher)
+        self.word_count = len(self._words)
+
+    def __len__(self):
+        return self.term_count
+
+    def term(self, term_id):
+        return self._matcher.terms[term_id]
+
+    def value(self, term_id):
+        return self._matcher.values[term_id]
+
+    def words(self):
+        return iter(self._words)
+
+    def find_all(self, text):
+        return self._matcher.find_all(text)
+
+    def matched_ids(self, text):
+        return self._matcher.matched_ids(text)
+
+    def best_match(self, text, score):
+        return self._matcher.best_match(text, score)
+
+    def contains_word(self, word):
+        return word in self._words
+
+
+def is_specific_match(product):
+    """
+    Check whether a text match may override a moderately confident image classification
+
+    The product needs a confidence_boost of at least SPECIFIC_BOOST. A fuzzy
+    hit (with ocr_distance) additionally needs a term of at least
+    FUZZY_OVERRIDE_MIN_LENGTH characters and at most FUZZY_OVERRIDE_MAX_RATIO
+    corrections per character; short terms one edit away from everyday
+    words never override the image.
+
+    Args:
+        product: Product dict from match_product (or None)
+
+    Returns:
+        True if the text should win
+    """
+    if not product or product.get("confidence_boost", 0) < SPECIFIC_BOOST:
+        return False
+    distance = product.get("ocr_distance", 0)
+    if not distance:
+        return True
+    term = product.get("matched_term", "")
+    return len(term) >= FUZZY_OVERRIDE_MIN_LENGTH and distance <= FUZZY_OVERRIDE_MAX_RATIO * len(term)
+
+
+class ProductCatalog:
+    """
+    Product and vocabulary lookup with hot reloading
+
+    Uses the compiled catalog at path if it exists, otherwise the built-in
+    tables. At most every check_interval seconds the file is checked for
+    changes; a new version is mapped and swapped in without a restart. If a
+    new file cannot be loaded, the previous catalog stays active.
+
+    With fuzzy matching enabled, trigram indexes over the terms and the
+    lowercased vocabulary are built for each loaded catalog, so OCR errors
+    like "Vol1milch" still find "Vollmilch".
+
+    New versions must replace the file (rename, as build_catalog does) rather
+    than overwrite it in place: truncating a mapped file crashes the readers.
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, check_interval=DEFAULT_CHECK_INTERVAL,
+                 products=PRODUCT_TEXT_MAPPING, vocabulary=COMMON_GERMAN_WORDS, fuzzy=FUZZY_MATCHING):
+        self.path = path or None
+        self.check_interval = check_interval
+        self.fuzzy = fuzzy
+        self._fallback = MemoryCatalog(products, vocabulary)
+        self._catalog = self._fallback
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        # (Katalog, Index der Begriffe, Index des Wortschatzes) für den aktiven Katalog
+        self._fuzzy_indexes = None
+        self._fuzzy_lock = threading.Lock()
+
+        self.reloads = 0
+        self.reload_errors = 0
+        self.loaded_at = None
+
+        self._check(force=True)
+        if self.fuzzy:
+            self._get_fuzzy_indexes()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _check(self, force=False):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+
+        with self._lock:
+            if not force and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            signature = self._file_signature()
+            if signature == self._signature:
+                return
+
+            if signature is None:
+                logger.warning(f"Product catalog {self.path} not found, using built-in tables")
+                self._catalog = self._fallback
+                self._signature = None
+                return
+
+            try:
+                started = time.perf_counter()
+                catalog = CompiledCatalog(self.path)
+            except Exception as e:
+                self.reload_errors += 1
+                logger.error(f"Could not load product catalog {self.path}: {str(e)}")
+                return
+
+            self._catalog = catalog
+            self._signature = signature
+            self.loaded_at = time.time()
+            if not force:
+                self.reloads += 1
+            logger.info("Loaded product catalog %s (%d terms, %d words) in %.1f ms", self.path,
+                        catalog.term_count, catalog.word_count, (time.perf_counter() - started) * 1000.0)
+
+    @property
+    def current(self):
+        """The active catalog (reloaded first if the file changed)"""
+        self._check()
+        return self._catalog
+
+    def best_match(self, text, score):
+        return self.current.best_match(text, score)
+
+    def contains_word(self, word):
+        return self.current.contains_word(word)
+
+    def _get_fuzzy_indexes(self):
+        catalog = self.current
+        indexes = self._fuzzy_indexes
+        if indexes is not None and indexes[0] is catalog:
+            return indexes
+
+        with self._fuzzy_lock:
+            indexes = self._fuzzy_indexes
+            if indexes is None or indexes[0] is not catalog:
+                started = time.perf_counter()
+                terms = TrigramIndex(catalog.term(term_id) for term_id in range(catalog.term_count))
+                words = TrigramIndex(sorted({word.lower() for word in catalog.words()}))
+                indexes = (catalog, terms, words)
+                self._fuzzy_indexes = indexes
+                logger.info("Built fuzzy indexes for %d terms and %d words in %.1f ms", len(terms), len(words),
+                            (time.perf_counter() - started) * 1000.0)
+        return indexes
+
+    def match_product(self, text, score):
+        """
+        Return the best product for a text, tolerating OCR errors
+
+        Terms contained exactly count with distance 0; with fuzzy matching on,
+        terms close to single words of the text are considered as well. A
+        fuzzy hit is returned as a copy with the matched term and its
+        ocr_distance, see is_specific_match.
+
+        Args:
+            text: Text to search (e.g. OCR output)
+            score: Callable (term, product, edit distance) -> number; only
+                scores above 0 count
+
+        Returns:
+            Product dict or None. On equal scores the term listed first wins.
+        """
+        # Katalog und Index einmal holen, damit ein Neuladen nicht zwei Versionen mischt
+        catalog, terms, _ = self._get_fuzzy_indexes() if self.fuzzy else (self.current, None, None)
+        candidates = dict.fromkeys(catalog.matched_ids(text), 0)
+
+        if terms is not None:
+            for token in set(re.findall(r'\w+', text)):
+                for term_id, distance in terms.lookup(token, limit=3):
+                    if distance < candidates.get(term_id, distance + 1):
+                        candidates[term_id] = distance
+
+        best_value = None
+        best_term = None
+        best_distance = 0
+        best_score = 0
+        for term_id in sorted(candidates):
+            value = catalog.value(term_id)
+            term = catalog.term(term_id)
+            term_score = score(term, value, candidates[term_id])
+            if term_score > best_score:
+                best_score = term_score
+                best_value = value
+                best_term = term
+                best_distance = candidates[term_id]
+        if best_value is not None and best_distance:
+            best_value = dict(best_value, matched_term=best_term, ocr_distance=best_distance)
+        return best_value
+
+    def is_known_word(self, word):
+        """Check whether a word is in the vocabulary, tolerating OCR errors in long words if fuzzy matching is on"""
+        if self.contains_word(word):
+            return True
+        if not self.fuzzy or len(word) < FUZZY_MIN_WORD_LENGTH:
+            return False
+        return bool(self._get_fuzzy_indexes()[2].lookup(word, limit=1))
+
+    def get_metrics(self):
+        """Return the source and size of the active catalog as a dictionary"""
+        catalog = self._catalog
+        return {
+            'source': catalog.path or 'builtin',
+            'terms': catalog.term_count,
+            'words': catalog.word_count,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'fuzzy': self.fuzzy
+        }
+
+
+def _read_records(path):
+    # CSV (mit Kopfzeile) oder JSONL, eine Zeile pro Eintrag
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def load_products(path):
+    """
+    Read product terms from a CSV or JSONL file
+
+    Each record needs a "term" and may set "name", "description" and
+    "confidence_boost" (default 1.2). Further fields are kept in the product.
+
+    Returns:
+        List of (term, product dict) pairs in file order
+    """
+    products = []
+    for record in _read_records(path):
+        term = (record.get("term") or "").strip()
+        if not term:
+            continue
+        product = {key: value for key, value in record.items() if key != "term" and value not in (None, "")}
+        product["name"] = product.get("name") or term
+        product["description"] = product.get("description") or product["name"]
+        product["confidence_boost"] = float(product.get("confidence_boost", 1.2))
+        products.append((term, product))
+    return products
+
+
+def load_vocabulary(path):
+    """
+    Read known words from a text file (one word per line), CSV or JSONL
+
+    CSV and JSONL records need a "word" field. Words are stored as given;
+    lookups compare against lowercased OCR words.
+
+    Returns:
+        List of words
+    """
+    if path.lower().endswith('.txt'):
+        with open(path, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    return [record["word"].strip() for record in _read_records(path) if (record.get("word") or "").strip()]
+
+
+if __name__ == "__main__":
+    # Aufruf: python product_catalog.py <ausgabe> [--products datei] [--vocabulary datei] [--with-builtin]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compile a product catalog for the text recognition")
+    parser.add_argument("output", help="Path of the compiled catalog file")
+    parser.add_argument("--products", action="append", default=[], help="CSV/JSONL file with product terms")
+    parser.add_argument("--vocabulary", action="append", default=[], help="TXT/CSV/JSONL file with known words")
+    parser.add_argument("--with-builtin", action="store_true", help="Include the built-in terms and words")
+    args = parser.parse_args()
+
+    products = list(PRODUCT_TEXT_MAPPING.items()) if args.with_builtin else []
+    vocabulary = list(COMMON_GERMAN_WORDS) if args.with_builtin else []
+    for products_path in args.products:
+        products.extend(load_products(products_path))
+    for vocabulary_path in args.vocabulary:
+        vocabulary.extend(load_vocabulary(vocabulary_path))
+
+    print(json.dumps(build_catalog(products, vocabulary, args.output), indent=2))
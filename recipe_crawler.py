@@ -0,0 +1,457 @@
+import os
+import re
+import json
+import time
+import fcntl
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import deque
+from urllib.parse import urljoin, urldefrag, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from http_client import HttpClient
+from recipe_sources import source_urls
+
+logger = logging.getLogger(__name__)
+
+# Lokaler Index der gecrawlten Rezepte (SQLite mit FTS5), aus dem /search-online-recipes antwortet
+DEFAULT_INDEX_PATH = os.environ.get("ONLINE_RECIPE_INDEX", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "online_recipes.db"))
+# Datei mit Start-URLs (eine pro Zeile, "#" für Kommentare); leer: Suchseiten für SEED_TERMS
+DEFAULT_SEEDS_PATH = os.environ.get("RECIPE_CRAWL_SEEDS", "")
+DEFAULT_MAX_PAGES = int(os.environ.get("RECIPE_CRAWL_MAX_PAGES", "300"))
+# Linktiefe ab den Start-URLs (1: Suchseite -> Rezeptseiten)
+DEFAULT_MAX_DEPTH = int(os.environ.get("RECIPE_CRAWL_MAX_DEPTH", "1"))
+# Mindestabstand (Sekunden) zwischen zwei Anfragen an denselben Host
+DEFAULT_CRAWL_DELAY = float(os.environ.get("RECIPE_CRAWL_DELAY", "1.0"))
+# Rezeptseiten, die jünger sind, werden nicht erneut geladen
+DEFAULT_RECRAWL_DAYS = float(os.environ.get("RECIPE_CRAWL_RECRAWL_DAYS", "7"))
+# Crawl im Hintergrund der App alle n Stunden (0: aus, dann nur per CLI/Cronjob)
+DEFAULT_CRAWL_INTERVAL_HOURS = float(os.environ.get("RECIPE_CRAWL_INTERVAL_HOURS", "0"))
+# Wartende Worker prüfen so oft, ob der crawlende Worker beendet wurde (Sekunden)
+_LEADER_RETRY_SECONDS = 60
+
+# Suchbegriffe für die Standard-Start-URLs
+SEED_TERMS = ("kartoffel", "tomate", "gurke", "karotte", "zwiebel", "knoblauch", "käse", "milch", "eier",
+              "nudeln", "reis", "hähnchen", "rindfleisch", "fisch", "lachs", "apfel", "banane", "erdbeere",
+              "zucchini", "paprika", "spinat", "brokkoli", "linsen", "quark")
+
+# Anzeigename der Quelle je Host
+SOURCE_NAMES = {
+    "www.chefkoch.de": "Chefkoch.de",
+    "www.essen-und-trinken.de": "Essen und Trinken",
+    "www.lecker.de": "Lecker.de"
+}
+
+USER_AGENT = "ecooklogically-crawler"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS online_recipes ("
+    "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL, source TEXT NOT NULL, "
+    "image_url TEXT, ingredients TEXT NOT NULL, rating REAL, review_count INTEGER, crawled_at REAL NOT NULL)",
+    # Volltextindex über Titel und Zutaten, per Trigger synchron gehalten
+    "CREATE VIRTUAL TABLE IF NOT EXISTS online_recipes_fts USING fts5("
+    "title, ingredients, content='online_recipes', content_rowid='id', tokenize='unicode61 remove_diacritics 0')",
+    "CREATE TRIGGER IF NOT EXISTS online_recipes_fts_insert AFTER INSERT ON online_recipes BEGIN "
+    "INSERT INTO online_recipes_fts(rowid, title, ingredients) VALUES (new.id, new.title, new.ingredients); END",
+    "CREATE TRIGGER IF NOT EXISTS online_recipes_fts_delete AFTER DELETE ON online_recipes BEGIN "
+    "INSERT INTO online_recipes_fts(online_recipes_fts, rowid, title, ingredients) "
+    "VALUES ('delete', old.id, old.title, old.ingredients); END",
+    "CREATE TRIGGER IF NOT EXISTS online_recipes_fts_update AFTER UPDATE ON online_recipes BEGIN "
+    "INSERT INTO online_recipes_fts(online_recipes_fts, rowid, title, ingredients) "
+    "VALUES ('delete', old.id, old.title, old.ingredients); "
+    "INSERT INTO online_recipes_fts(rowid, title, ingredients) VALUES (new.id, new.title, new.ingredients); END",
+)
+
+
+class OnlineRecipeIndex:
+    """
+    Searchable local index of crawled recipes
+
+    An SQLite file with an FTS5 table over title and ingredients. The
+    crawler writes it, the app only reads it, so a search costs a single
+    indexed query instead of several page downloads. Connections are kept
+    per thread and process.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self):
+        pid = os.getpid()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != pid:
+            connection = sqlite3.connect(self.path, timeout=10.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM online_recipes").fetchone()[0]
+
+    def add(self, recipe):
+        """Insert or update a recipe (keyed by URL)"""
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO online_recipes (url, title, source, image_url, ingredients, rating, review_count, "
+                "crawled_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO UPDATE SET title = excluded.title, "
+                "source = excluded.source, image_url = excluded.image_url, ingredients = excluded.ingredients, "
+                "rating = excluded.rating, review_count = excluded.review_count, crawled_at = excluded.crawled_at",
+                (recipe["url"], recipe["title"], recipe["source"], recipe.get("image_url"),
+                 "\n".join(recipe["ingredients"]), recipe.get("rating"), recipe.get("review_count"), time.time()))
+
+    def crawled_since(self, url, timestamp):
+        """Whether url was indexed after timestamp"""
+        row = self._connection().execute("SELECT crawled_at FROM online_recipes WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] >= timestamp
+
+    def search(self, search_term, limit=10):
+        """
+        Find recipes whose title or ingredients contain any word of the search term
+
+        Words are matched as prefixes ("kartoffel" finds "Kartoffeln"),
+        recipes matching more and rarer words rank first (BM25, title
+        weighted double), then by rating.
+
+        Args:
+            search_term: Prepared (German) search term
+            limit: Maximum number of results
+
+        Returns:
+            List of result dictionaries in the format of /search-online-recipes
+        """
+        words = [word for word in re.findall(r"\w+", search_term.lower()) if len(word) > 1]
+        if not words:
+            return []
+        query = " OR ".join(f'"{word}"*' for word in words)
+        rows = self._connection().execute(
+            "SELECT r.url, r.title, r.source, r.image_url, r.ingredients, r.rating, r.review_count "
+            "FROM online_recipes_fts JOIN online_recipes r ON r.id = online_recipes_fts.rowid "
+            "WHERE online_recipes_fts MATCH ? "
+            "ORDER BY bm25(online_recipes_fts, 2.0, 1.0), r.rating DESC LIMIT ?", (query, limit)).fetchall()
+
+        results = []
+        for url, title, source, image_url, ingredients, rating, review_count in rows:
+            ingredients = ingredients.split("\n") if ingredients else []
+            matched = [line for line in ingredients if any(word in line.lower() for word in words)]
+            results.append({
+                "title": title,
+                "url": url,
+                "source": source,
+                "image_url": image_url or "",
+                "ingredient_match": matched[:5] or [search_term.capitalize()],
+                "rating": rating,
+                "review_count": review_count or 0
+            })
+        return results
+
+    def get_metrics(self):
+        row = self._connection().execute("SELECT COUNT(*), MAX(crawled_at) FROM online_recipes").fetchone()
+        return {'recipes': row[0], 'last_crawled_at': row[1]}
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _find_recipe_ld(data):
+    # Recipe-Objekt in JSON-LD finden (auch in Listen und @graph)
+    for item in _as_list(data):
+        if not isinstance(item, dict):
+            continue
+        types = _as_list(item.get("@type"))
+        if "Recipe" in types:
+            return item
+        found = _find_recipe_ld(item.get("@graph"))
+        if found is not None:
+            return found
+    return None
+
+
+def _image_url(value):
+    for item in _as_list(value):
+        if isinstance(item, str) and item:
+            return item
+        if isinstance(item, dict) and (item.get("url") or item.get("contentUrl")):
+            return item.get("url") or item.get("contentUrl")
+    return None
+
+
+def _number(value, cast):
+    try:
+        return cast(float(str(value).replace(",", ".")))
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_recipe(html, url):
+    """
+    Extract a recipe from a page
+
+    The schema.org Recipe in JSON-LD (which the large recipe sites embed)
+    provides name, ingredients, image and rating; microdata
+    (itemprop="recipeIngredient") and trafilatura's metadata (title,
+    og:image, site name) fill the gaps.
+
+    Args:
+        html: Page content (bytes, str or parsed lxml tree)
+        url: URL of the page
+
+    Returns:
+        Dictionary with url, title, source, image_url, ingredients, rating
+        and review_count, or None if the page has no ingredient list
+    """
+    from trafilatura import extract_metadata, load_html
+
+    tree = load_html(html)
+    if tree is None:
+        return None
+
+    recipe = None
+    for script in tree.xpath('//script[@type="application/ld+json"]/text()'):
+        try:
+            recipe = _find_recipe_ld(json.loads(script))
+        except ValueError:
+            continue
+        if recipe is not None:
+            break
+    recipe = recipe or {}
+
+    ingredients = [" ".join(str(line).split()) for line in _as_list(recipe.get("recipeIngredient"))]
+    if not ingredients:
+        ingredients = [" ".join(node.text_content().split())
+                       for node in tree.xpath('//*[@itemprop="recipeIngredient" or @itemprop="ingredients"]')]
+    ingredients = [line for line in ingredients if line]
+    if not ingredients:
+        return None
+
+    rating = recipe.get("aggregateRating") if isinstance(recipe.get("aggregateRating"), dict) else {}
+    metadata = extract_metadata(tree, default_url=url)
+    host = urlsplit(url).netloc.lower()
+    title = recipe.get("name") or (metadata.title if metadata is not None else None)
+    if not title:
+        return None
+    return {
+        "url": url,
+        "title": " ".join(str(title).split()),
+        "source": SOURCE_NAMES.get(host) or (metadata.sitename if metadata is not None else None) or host,
+        "image_url": _image_url(recipe.get("image")) or (metadata.image if metadata is not None else None),
+        "ingredients": ingredients,
+        "rating": _number(rating.get("ratingValue"), float),
+        "review_count": _number(rating.get("ratingCount") or rating.get("reviewCount"), int)
+    }
+
+
+def extract_links(html, base_url):
+    """Absolute links of a page to the same host (without fragments)"""
+    from trafilatura import load_html
+
+    tree = load_html(html)
+    if tree is None:
+        return []
+    host = urlsplit(base_url).netloc
+    links = []
+    for href in tree.xpath("//a/@href"):
+        link = urldefrag(urljoin(base_url, href.strip()))[0]
+        if urlsplit(link).scheme in ("http", "https") and urlsplit(link).netloc == host:
+            links.append(link)
+    return list(dict.fromkeys(links))
+
+
+def load_seeds(path=DEFAULT_SEEDS_PATH):
+    """Start URLs from a file, or the search pages of all sources for SEED_TERMS"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    seeds = []
+    for term in SEED_TERMS:
+        urls = source_urls(term)
+        seeds.extend([urls["chefkoch"], urls["essen_und_trinken"], urls["lecker"]])
+    return seeds
+
+
+class RecipeCrawler:
+    """
+    Crawls recipe pages from the seed pages into an OnlineRecipeIndex
+
+    Breadth-first up to max_depth links from the seeds, same host only,
+    honouring robots.txt and a minimum delay per host. Pages with an
+    ingredient list are indexed; recipe pages indexed within the last
+    recrawl_days are skipped.
+    """
+
+    def __init__(self, index, client=None, max_pages=DEFAULT_MAX_PAGES, max_depth=DEFAULT_MAX_DEPTH,
+                 delay=DEFAULT_CRAWL_DELAY, recrawl_days=DEFAULT_RECRAWL_DAYS):
+        self.index = index
+        self.client = client or HttpClient(user_agent=USER_AGENT)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.delay = delay
+        self.recrawl_days = recrawl_days
+        self._robots = {}
+        self._last_request = {}
+
+    def _allowed(self, url):
+        parts = urlsplit(url)
+        base = f"{parts.scheme}://{parts.netloc}"
+        if base not in self._robots:
+            robots = RobotFileParser(f"{base}/robots.txt")
+            content = self.client.fetch(f"{base}/robots.txt")
+            # Ohne robots.txt ist alles erlaubt
+            robots.parse(content.decode("utf-8", "replace").splitlines() if content else [])
+            self._robots[base] = robots
+        return self._robots[base].can_fetch(USER_AGENT, url)
+
+    def _fetch(self, url):
+        host = urlsplit(url).netloc
+        wait = self._last_request.get(host, 0.0) + self.delay - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return self.client.fetch(url)
+        finally:
+            self._last_request[host] = time.monotonic()
+
+    def crawl(self, seeds):
+        """
+        Crawl from the given start URLs
+
+        Returns:
+            Dictionary with the numbers of fetched pages, indexed recipes,
+            skipped and failed URLs
+        """
+        stats = {'fetched': 0, 'indexed': 0, 'skipped': 0, 'failed': 0}
+        recrawl_after = time.time() - self.recrawl_days * 86400
+        queue = deque((url, 0) for url in seeds)
+        seen = set(seeds)
+        started = time.monotonic()
+
+        from trafilatura import load_html
+
+        while queue and stats['fetched'] < self.max_pages:
+            url, depth = queue.popleft()
+            if depth > 0 and self.index.crawled_since(url, recrawl_after):
+                stats['skipped'] += 1
+                continue
+            if not self._allowed(url):
+                stats['skipped'] += 1
+                continue
+
+            html = self._fetch(url)
+            stats['fetched'] += 1
+            if html is None:
+                stats['failed'] += 1
+                continue
+
+            try:
+                # Einmal parsen, Rezept- und Linkextraktion nutzen denselben Baum
+                tree = load_html(html)
+                recipe = extract_recipe(tree, url) if tree is not None else None
+                if recipe is not None:
+                    self.index.add(recipe)
+                    stats['indexed'] += 1
+                elif tree is not None and depth < self.max_depth:
+                    for link in extract_links(tree, url):
+                        if link not in seen:
+                            seen.add(link)
+                            queue.append((link, depth + 1))
+            except Exception as e:
+                stats['failed'] += 1
+                logger.warning(f"Processing {url} failed: {str(e)}")
+
+        logger.info(f"Recipe crawl finished in {time.monotonic() - started:.0f} s: {stats}, "
+                    f"{len(self.index)} recipes in the index")
+        return stats
+
+
+def crawl_once(index_path=DEFAULT_INDEX_PATH, seeds=None, **kwargs):
+    """
+    Run one crawl, unless another process is already crawling into the same index
+
+    Returns:
+        Crawl statistics, or None if the index is locked by another crawl
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    with open(f"{index_path}.lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Another recipe crawl is running, skipping")
+            return None
+        try:
+            crawler = RecipeCrawler(OnlineRecipeIndex(index_path), **kwargs)
+            return crawler.crawl(seeds if seeds is not None else load_seeds())
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def start_background_crawler(interval_hours=DEFAULT_CRAWL_INTERVAL_HOURS, index_path=DEFAULT_INDEX_PATH):
+    """
+    Crawl every interval_hours in a daemon thread (no-op if interval_hours is 0)
+
+    Must be called in the serving process, not before a fork (with gunicorn
+    from the post_fork hook in gunicorn.conf.py). Every worker may call it:
+    only the one holding the leader lock crawls, the others wait and take
+    over if that worker exits.
+    """
+    if interval_hours <= 0:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+
+    def loop():
+        # Die Sperre wird bis zum Prozessende gehalten und vom Betriebssystem freigegeben
+        with open(f"{index_path}.crawler.lock", "w") as leader_file:
+            while True:
+                try:
+                    fcntl.flock(leader_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    time.sleep(_LEADER_RETRY_SECONDS)
+            logger.info(f"Recipe crawler running in process {os.getpid()}")
+            while True:
+                try:
+                    crawl_once(index_path)
+                except Exception:
+                    logger.exception("Recipe crawl failed")
+                time.sleep(interval_hours * 3600)
+
+    thread = threading.Thread(target=loop, name="recipe-crawler", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # Aufruf: python recipe_crawler.py crawl [--seeds datei] [--max-pages n] | search <begriff>
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Crawl recipe pages into the local online recipe index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path of the index database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    crawl_parser = subparsers.add_parser("crawl", help="Crawl from the seed URLs")
+    crawl_parser.add_argument("--seeds", default=DEFAULT_SEEDS_PATH, help="File with start URLs, one per line")
+    crawl_parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES)
+    crawl_parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    crawl_parser.add_argument("--delay", type=float, default=DEFAULT_CRAWL_DELAY)
+    search_parser = subparsers.add_parser("search", help="Search the index")
+    search_parser.add_argument("term")
+    search_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "crawl":
+        result = crawl_once(args.index, load_seeds(args.seeds), max_pages=args.max_pages,
+                            max_depth=args.max_depth, delay=args.delay)
+    else:
+        result = OnlineRecipeIndex(args.index).search(args.term, args.limit)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,237 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rezeptkatalog für /recipes (bei einer echten Anwendung aus einer Rezept-API oder Datenbank)
+RECIPES = [
+    {
+        "id": 1,
+        "name": "Einfache Pfannkuchen",
+        "ingredients": ["Mehl", "Eier", "Milch", "Salz", "Butter", "Zucker"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1544413964-e694753a3ce0?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 20,
+        "difficulty": "Einfach",
+        "source": "Chefkoch",
+        "url": "https://www.chefkoch.de/rezepte/966751202449923/Pfannkuchen-Crepes-Pfannkuchenteig.html",
+        "description": "Klassische Pfannkuchen mit wenigen Zutaten schnell zubereitet."
+    },
+    {
+        "id": 2,
+        "name": "Eierkuchen mit Apfelmus",
+        "ingredients": ["Mehl", "Eier", "Milch", "Apfelmus", "Zimt", "Zucker"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1509365465985-25d11c17e812?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 25,
+        "difficulty": "Einfach",
+        "source": "Küchengötter",
+        "url": "https://www.kuechengoetter.de/rezepte/pfannkuchen-mit-apfelmus-und-zimt-14292",
+        "description": "Eine fruchtige Variante der klassischen Pfannkuchen mit selbstgemachtem Apfelmus."
+    },
+    {
+        "id": 3,
+        "name": "Französische Crêpes",
+        "ingredients": ["Mehl", "Eier", "Milch", "Butter", "Vanillezucker", "Salz"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1519676867240-f03562e64548?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 30,
+        "difficulty": "Mittel",
+        "source": "Essen und Trinken",
+        "url": "https://www.essen-und-trinken.de/rezepte/56295-rzpt-crepes",
+        "description": "Hauchdünne französische Crêpes, perfekt mit süßen oder herzhaften Füllungen."
+    },
+    {
+        "id": 4,
+        "name": "Schneller Brokkoliauflauf mit Feta",
+        "ingredients": ["Brokkoli", "Feta", "Eier", "Sahne", "Zwiebeln", "Knoblauch"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1608614169738-6d041e32c91f?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 40,
+        "difficulty": "Einfach",
+        "source": "Lecker",
+        "url": "https://www.lecker.de/brokkoli-feta-auflauf-so-einfach-gehts-77502.html",
+        "description": "Gesunder Gemüseauflauf mit cremiger Fetakäse-Note."
+    },
+    {
+        "id": 5,
+        "name": "Vollkorn-Spaghetti mit Linsenbolognese",
+        "ingredients": ["Vollkornspaghetti", "Linsen", "Tomaten", "Karotten", "Zwiebeln", "Knoblauch"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": True,
+        "image_url": "https://images.unsplash.com/photo-1555949258-eb67b1ef0ceb?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 35,
+        "difficulty": "Mittel",
+        "source": "EAT SMARTER",
+        "url": "https://eatsmarter.de/rezepte/vollkornspaghetti-mit-linsenbolognese",
+        "description": "Eine proteinreiche vegane Alternative zur klassischen Bolognese."
+    },
+    {
+        "id": 6,
+        "name": "Schneller Kartoffelsalat",
+        "ingredients": ["Kartoffeln", "Gurke", "Zwiebeln", "Essig", "Öl", "Senf"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": True,
+        "image_url": "https://images.unsplash.com/photo-1594066521341-8d19ddd27e66?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 30,
+        "difficulty": "Einfach",
+        "source": "DasKochrezept",
+        "url": "https://www.daskochrezept.de/rezepte/schneller-kartoffelsalat",
+        "description": "Klassischer deutscher Kartoffelsalat, perfekt als Beilage oder eigenständiges Gericht."
+    },
+    {
+        "id": 7,
+        "name": "Haferflocken-Bananen-Cookies",
+        "ingredients": ["Haferflocken", "Bananen", "Honig", "Rosinen", "Zimt", "Nüsse"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1499636136210-6f4ee915583e?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 25,
+        "difficulty": "Einfach",
+        "source": "Springlane",
+        "url": "https://www.springlane.de/magazin/rezeptideen/bananen-haferflocken-cookies/",
+        "description": "Gesunde Kekse ohne raffiniertem Zucker, perfekt zum Frühstück oder als Snack."
+    },
+    {
+        "id": 8,
+        "name": "Griechischer Bauernsalat",
+        "ingredients": ["Tomaten", "Gurke", "Paprika", "Feta", "Oliven", "Olivenöl", "Zwiebeln"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1503442947665-4bd1ab8694af?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 15,
+        "difficulty": "Einfach",
+        "source": "Simply Yummy",
+        "url": "https://www.simplyyummy.de/rezepte/griechischer-bauernsalat/",
+        "description": "Frischer, mediterraner Salat mit Feta und Oliven, ideal für heiße Sommertage."
+    },
+    {
+        "id": 9,
+        "name": "Veganes Schokoladenmousse",
+        "ingredients": ["Avocado", "Banane", "Kakaopulver", "Agavendicksaft", "Vanille"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": True,
+        "image_url": "https://images.unsplash.com/photo-1614088685677-75369ede2869?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 15,
+        "difficulty": "Einfach",
+        "source": "Bianca Zapatka",
+        "url": "https://biancazapatka.com/de/avocado-schokoladenmousse-vegan/",
+        "description": "Cremiges Dessert ohne tierische Produkte, das mit gesunden Zutaten überzeugt."
+    },
+    {
+        "id": 10,
+        "name": "Apfel-Zimt-Porridge",
+        "ingredients": ["Haferflocken", "Milch", "Äpfel", "Zimt", "Honig", "Nüsse"],
+        "healthy": True,
+        "vegetarian": True,
+        "vegan": False,
+        "image_url": "https://images.unsplash.com/photo-1517673400267-0251440c45dc?q=80&w=600&h=400&auto=format",
+        "duration_minutes": 10,
+        "difficulty": "Einfach",
+        "source": "Kochkarussell",
+        "url": "https://kochkarussell.com/zimt-apfel-porridge/",
+        "description": "Warmes, nahrhaftes Frühstück mit Haferflocken und Äpfeln, perfekt für kalte Tage."
+    }
+]
+
+
+def _bits(bitset):
+    # Positionen der gesetzten Bits in aufsteigender Reihenfolge
+    while bitset:
+        lowest = bitset & -bitset
+        yield lowest.bit_length() - 1
+        bitset ^= lowest
+
+
+class RecipeIndex:
+    """
+    Precompiled lookup structure over a recipe catalogue
+
+    Built once at startup. Every substring of every lowercased ingredient
+    maps to a bitset of recipe positions, and the healthy/vegetarian/vegan
+    flags are bitsets as well. A search is then a union of the bitsets of
+    the query ingredients intersected with the flag bitsets, and matches
+    exactly the former per-request substring test.
+    """
+
+    def __init__(self, recipes):
+        """
+        Args:
+            recipes: List of recipe dictionaries with "ingredients" and the
+                boolean flags "healthy", "vegetarian" and "vegan"
+        """
+        self.recipes = list(recipes)
+        self.all_bits = (1 << len(self.recipes)) - 1
+
+        # Jede Zutat nur einmal zerlegen, auch wenn sie in vielen Rezepten vorkommt
+        ingredient_bits = {}
+        for position, recipe in enumerate(self.recipes):
+            for ingredient in recipe["ingredients"]:
+                name = ingredient.lower()
+                ingredient_bits[name] = ingredient_bits.get(name, 0) | (1 << position)
+
+        self.substrings = {}
+        for name, bits in ingredient_bits.items():
+            for start in range(len(name)):
+                for end in range(start + 1, len(name) + 1):
+                    key = name[start:end]
+                    self.substrings[key] = self.substrings.get(key, 0) | bits
+
+        self.flags = {}
+        for flag in ("healthy", "vegetarian", "vegan"):
+            self.flags[flag] = sum(1 << position for position, recipe in enumerate(self.recipes) if recipe.get(flag))
+
+        logger.info(f"Recipe index built: {len(self.recipes)} recipes, {len(ingredient_bits)} ingredients, "
+                    f"{len(self.substrings)} substrings")
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def match_ingredients(self, ingredients):
+        """
+        Bitset of the recipes containing at least one of the ingredients
+
+        Args:
+            ingredients: Lowercased query ingredients; each matches every recipe
+                ingredient that contains it (an empty string matches all)
+        """
+        bits = 0
+        for ingredient in ingredients:
+            bits |= self.all_bits if not ingredient else self.substrings.get(ingredient, 0)
+        return bits
+
+    def search(self, ingredients=None, healthy=False, vegetarian=False, vegan=False):
+        """
+        Find recipes by ingredients and dietary flags
+
+        Args:
+            ingredients: Optional list of query ingredients (case-insensitive)
+            healthy: Only healthy recipes
+            vegetarian: Only vegetarian recipes
+            vegan: Only vegan recipes
+
+        Returns:
+            Matching recipe dictionaries in catalogue order (shared, do not modify)
+        """
+        bits = self.all_bits
+        if ingredients:
+            bits = self.match_ingredients([ingredient.strip().lower() for ingredient in ingredients])
+        if healthy:
+            bits &= self.flags["healthy"]
+        if vegetarian:
+            bits &= self.flags["vegetarian"]
+        if vegan:
+            bits &= self.flags["vegan"]
+        return [self.recipes[position] for position in _bits(bits)]
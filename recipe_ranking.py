@@ -0,0 +1,238 @@
+import os
+import time
+import datetime
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Gewichtung des Scores: genutzte Vorräte (nach Dringlichkeit gewichtet), Abdeckung, fehlende Zutaten
+COVERAGE_WEIGHT = float(os.environ.get("RECIPE_RANK_COVERAGE_WEIGHT", "1.0"))
+MISSING_PENALTY = float(os.environ.get("RECIPE_RANK_MISSING_PENALTY", "0.25"))
+# Vorräte, die innerhalb dieser Tage ablaufen, zählen mehr (bis zu 1 + URGENCY_BONUS)
+URGENCY_HORIZON_DAYS = int(os.environ.get("RECIPE_RANK_URGENCY_DAYS", "7"))
+URGENCY_BONUS = float(os.environ.get("RECIPE_RANK_URGENCY_BONUS", "2.0"))
+# Wie oft (Sekunden) geprüft wird, ob sich der Rezeptkatalog geändert hat
+DEFAULT_CHECK_INTERVAL = float(os.environ.get("RECIPE_RANK_CHECK_INTERVAL", "60"))
+
+FLAGS = ("healthy", "vegetarian", "vegan")
+
+
+class RecipeMatrix:
+    """
+    Recipe x ingredient incidence matrix in CSR form
+
+    Row r lists the (distinct, lowercased) ingredients of recipe r. A fridge
+    becomes a weight vector over the ingredient vocabulary, so matched
+    ingredients, used weight, coverage and missing ingredients of every
+    recipe come from one sparse matrix-vector product (np.bincount over the
+    non-zeros). Dietary flags are boolean masks over the rows.
+    """
+
+    def __init__(self, recipe_ids, ingredient_lists, flags):
+        """
+        Args:
+            recipe_ids: Recipe IDs, one per row
+            ingredient_lists: Ingredient names per recipe (same order)
+            flags: Dictionary flag name -> sequence of booleans per recipe
+        """
+        vocabulary = {}
+        indptr = [0]
+        indices = []
+        for ingredients in ingredient_lists:
+            # Doppelte Zutaten in einem Rezept zählen einmal
+            row = sorted({vocabulary.setdefault(name.lower(), len(vocabulary)) for name in ingredients})
+            indices.extend(row)
+            indptr.append(len(indices))
+
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        # Zeilennummer je Nicht-Null-Eintrag, für die Zeilensummen per bincount
+        self.rows = np.repeat(np.arange(len(self.recipe_ids), dtype=np.int32), np.diff(self.indptr))
+        self.sizes = np.diff(self.indptr).astype(np.float64)
+        self.vocabulary = np.array(sorted(vocabulary, key=vocabulary.get), dtype=str)
+        self.flags = {name: np.asarray(flags.get(name, [False] * len(self.recipe_ids)), dtype=bool)
+                      for name in FLAGS}
+
+    @classmethod
+    def from_recipes(cls, recipes):
+        """Build the matrix from recipe dictionaries (as served by /recipes)"""
+        return cls([recipe["id"] for recipe in recipes], [recipe["ingredients"] for recipe in recipes],
+                   {name: [bool(recipe.get(name)) for recipe in recipes] for name in FLAGS})
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def fridge_vector(self, fridge):
+        """
+        Map fridge items onto the ingredient vocabulary
+
+        An item covers every ingredient whose name contains it (the same
+        substring rule as the ingredient search); an ingredient covered by
+        several items gets the highest weight.
+
+        Args:
+            fridge: Dictionary item name -> weight
+
+        Returns:
+            Weight vector over the vocabulary
+        """
+        weights = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for item, weight in fridge.items():
+            item = item.strip().lower()
+            if not item or weight <= 0:
+                continue
+            covered = np.char.find(self.vocabulary, item) >= 0
+            np.maximum(weights, np.where(covered, weight, 0.0), out=weights)
+        return weights
+
+    def rank(self, fridge, limit=20, healthy=False, vegetarian=False, vegan=False):
+        """
+        Rank all recipes by how well they use the fridge
+
+        score = used weight + COVERAGE_WEIGHT * coverage - MISSING_PENALTY * missing
+
+        where used weight is the sum of the fridge weights of the recipe's
+        ingredients, coverage the share of its ingredients that are in the
+        fridge and missing the number of ingredients to buy. Recipes that
+        use nothing from the fridge are left out.
+
+        Args:
+            fridge: Dictionary item name -> weight (see fridge_weights)
+            limit: Number of recipes to return
+            healthy: Only healthy recipes
+            vegetarian: Only vegetarian recipes
+            vegan: Only vegan recipes
+
+        Returns:
+            List of dictionaries with recipe_id, score, matched, missing,
+            coverage and used_weight, best first
+        """
+        weights = self.fridge_vector(fridge)
+        present = (weights > 0).astype(np.float64)
+        count = len(self.recipe_ids)
+
+        # Ein Durchlauf über die Nicht-Null-Einträge: Zeilensummen von A·present und A·weights
+        matched = np.bincount(self.rows, weights=present[self.indices], minlength=count)
+        used_weight = np.bincount(self.rows, weights=weights[self.indices], minlength=count)
+        coverage = np.divide(matched, self.sizes, out=np.zeros(count), where=self.sizes > 0)
+        missing = self.sizes - matched
+        scores = used_weight + COVERAGE_WEIGHT * coverage - MISSING_PENALTY * missing
+
+        mask = matched > 0
+        if healthy:
+            mask &= self.flags["healthy"]
+        if vegetarian:
+            mask &= self.flags["vegetarian"]
+        if vegan:
+            mask &= self.flags["vegan"]
+        candidates = np.flatnonzero(mask)
+        if not len(candidates) or limit < 1:
+            return []
+
+        # Top-k per argpartition, danach nur die k Treffer sortieren (bei Gleichstand Katalogreihenfolge)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        return [{
+            'recipe_id': int(self.recipe_ids[row]),
+            'score': round(float(scores[row]), 4),
+            'matched': int(matched[row]),
+            'missing': int(missing[row]),
+            'coverage': round(float(coverage[row]), 4),
+            'used_weight': round(float(used_weight[row]), 4)
+        } for row in candidates]
+
+
+def fridge_weights(calendar_items, today=None, horizon_days=URGENCY_HORIZON_DAYS, bonus=URGENCY_BONUS):
+    """
+    Weight fridge items by how soon they expire
+
+    Items expiring today get weight 1 + bonus, falling linearly to 1 at the
+    horizon; items without a valid date get 1. Expired items are skipped.
+
+    Args:
+        calendar_items: Calendar entries with 'product' and 'expiryDate' (YYYY-MM-DD)
+        today: Reference date (defaults to today)
+        horizon_days: Days before expiry from which the bonus starts
+        bonus: Additional weight for items that expire today
+
+    Returns:
+        Dictionary product name -> weight
+    """
+    today = today or datetime.date.today()
+    weights = {}
+    for item in calendar_items:
+        product = (item.get('product') or '').strip()
+        if not product:
+            continue
+        weight = 1.0
+        try:
+            days_left = (datetime.date.fromisoformat(item.get('expiryDate') or '') - today).days
+        except ValueError:
+            days_left = None
+        if days_left is not None:
+            if days_left < 0:
+                continue
+            weight += bonus * max(0, horizon_days - days_left) / horizon_days if horizon_days else 0.0
+        weights[product] = max(weights.get(product, 0.0), weight)
+    return weights
+
+
+class RecipeRanker:
+    """
+    Keeps a RecipeMatrix for the current catalogue
+
+    The matrix is built on first use by the loader and rebuilt when the
+    catalogue signature (e.g. recipe count and highest ID) changes, checked
+    at most every check_interval seconds.
+    """
+
+    def __init__(self, loader, signature=None, check_interval=DEFAULT_CHECK_INTERVAL):
+        """
+        Args:
+            loader: Callable returning a RecipeMatrix
+            signature: Optional callable returning a value that changes with the catalogue
+            check_interval: Seconds between signature checks
+        """
+        self.loader = loader
+        self.signature = signature
+        self.check_interval = check_interval
+        self._matrix = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.build_seconds = None
+
+    @property
+    def matrix(self):
+        now = time.monotonic()
+        if self._matrix is not None and now - self._last_check < self.check_interval:
+            return self._matrix
+        with self._lock:
+            if self._matrix is not None and now - self._last_check < self.check_interval:
+                return self._matrix
+            self._last_check = now
+            signature = self.signature() if self.signature is not None else None
+            if self._matrix is None or signature != self._signature:
+                started = time.perf_counter()
+                matrix = self.loader()
+                self.build_seconds = time.perf_counter() - started
+                self.builds += 1
+                self._matrix = matrix
+                self._signature = signature
+                logger.info(f"Recipe matrix built: {len(matrix)} recipes, {len(matrix.vocabulary)} ingredients, "
+                            f"{matrix.nnz} entries in {self.build_seconds * 1000:.0f} ms")
+            return self._matrix
+
+    def rank(self, fridge, **kwargs):
+        return self.matrix.rank(fridge, **kwargs)
@@ -0,0 +1,452 @@
+import os
+import json
+import base64
+import logging
+import argparse
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Integer, and_, column, event, func, insert, or_, select, text
+from sqlalchemy.orm import DeclarativeBase
+
+from recipe_ranking import RecipeMatrix
+
+logger = logging.getLogger(__name__)
+
+# Datenbank für den Rezeptkatalog: SQLite lokal, PostgreSQL in Produktion (DATABASE_URL)
+DEFAULT_DATABASE_URL = os.environ.get("RECIPE_DATABASE_URL") or os.environ.get("DATABASE_URL") or \
+    "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "recipes.db")
+# Standard- und Höchstzahl von Rezepten pro Seite
+DEFAULT_PAGE_SIZE = int(os.environ.get("RECIPES_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("RECIPES_MAX_PAGE_SIZE", "200"))
+
+# Sortierung nach Schwierigkeit über eine Rangfolge statt alphabetisch
+DIFFICULTY_RANKS = {"einfach": 1, "mittel": 2, "schwer": 3}
+SORT_KEYS = ("id", "duration", "difficulty")
+
+# Sprache der PostgreSQL-Volltextsuche
+FULLTEXT_CONFIG = os.environ.get("RECIPE_FULLTEXT_CONFIG", "german")
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+db = SQLAlchemy(model_class=Base)
+
+
+class Recipe(db.Model):
+    __tablename__ = "recipes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(300), nullable=False)
+    description = db.Column(db.Text, nullable=False, default="")
+    healthy = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    vegetarian = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    vegan = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=0, index=True)
+    difficulty = db.Column(db.String(50), nullable=False, default="")
+    difficulty_rank = db.Column(db.Integer, nullable=False, default=0, index=True)
+    image_url = db.Column(db.String(1000))
+    source = db.Column(db.String(200))
+    url = db.Column(db.String(1000))
+
+
+class Ingredient(db.Model):
+    """Distinct ingredient names (lowercased); small compared to the recipes"""
+    __tablename__ = "ingredients"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False, unique=True)
+
+
+class RecipeIngredient(db.Model):
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (db.Index("ix_recipe_ingredients_ingredient", "ingredient_id", "recipe_id"),)
+
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey("ingredients.id"), nullable=False)
+    # Schreibweise wie im Rezept
+    label = db.Column(db.String(200), nullable=False)
+
+
+# Volltextindex über Name und Beschreibung; SQLite: FTS5-Tabelle, per Trigger synchron gehalten
+_SQLITE_FULLTEXT = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5("
+    "name, description, content='recipes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes BEGIN "
+    "INSERT INTO recipes_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER DELETE ON recipes BEGIN "
+    "INSERT INTO recipes_fts(recipes_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS recipes_fts_update AFTER UPDATE ON recipes BEGIN "
+    "INSERT INTO recipes_fts(recipes_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO recipes_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+]
+
+# PostgreSQL: GIN-Index über denselben Ausdruck, den die Suche verwendet
+_POSTGRES_DOCUMENT = f"to_tsvector('{FULLTEXT_CONFIG}', recipes.name || ' ' || recipes.description)"
+_POSTGRES_FULLTEXT = [
+    f"CREATE INDEX IF NOT EXISTS ix_recipes_fulltext ON recipes USING gin ({_POSTGRES_DOCUMENT})",
+]
+
+
+class InvalidQuery(ValueError):
+    """Raised for invalid paging or sorting parameters"""
+
+
+def init_store(app, database_url=DEFAULT_DATABASE_URL, seed=None):
+    """
+    Configure the recipe database for a Flask app and create missing tables
+
+    Args:
+        app: Flask app
+        database_url: SQLAlchemy URL (sqlite:///... or postgresql://...)
+        seed: Optional list of recipe dictionaries, inserted if the catalogue is empty
+    """
+    if database_url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(os.path.abspath(database_url[len("sqlite:///"):])), exist_ok=True)
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", database_url)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {"pool_recycle": 300, "pool_pre_ping": True})
+    db.init_app(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            @event.listens_for(db.engine, "connect")
+            def _sqlite_pragmas(connection, _):
+                cursor = connection.cursor()
+                # WAL: Leser blockieren nicht, während der Katalog befüllt wird
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA foreign_keys=ON")
+                cursor.close()
+
+        db.create_all()
+        statements = _SQLITE_FULLTEXT if db.engine.dialect.name == "sqlite" else _POSTGRES_FULLTEXT
+        with db.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+
+        count = db.session.scalar(select(func.count()).select_from(Recipe))
+        if not count and seed:
+            count = import_recipes(seed)
+        logger.info(f"Recipe store ready: {count} recipes ({db.engine.dialect.name})")
+        # Verbindungen nicht über einen Fork (gunicorn preload_app) hinweg teilen
+        db.engine.dispose()
+
+
+def import_recipes(recipes, batch_size=1000):
+    """
+    Insert recipes in bulk (inside an app context)
+
+    Args:
+        recipes: Iterable of recipe dictionaries as served by /recipes; "id"
+            is optional
+        batch_size: Rows per INSERT
+
+    Returns:
+        Number of recipes in the catalogue afterwards
+    """
+    ingredient_ids = dict(db.session.execute(select(Ingredient.name, Ingredient.id)).all())
+
+    def flush(recipe_rows, link_rows):
+        if not recipe_rows:
+            return
+        # Neue Zutaten zuerst anlegen, dann Rezepte und Verknüpfungen in einem Schwung
+        new_names = sorted({name for _, _, name, _ in link_rows if name not in ingredient_ids})
+        if new_names:
+            db.session.execute(insert(Ingredient), [{"name": name} for name in new_names])
+            ingredient_ids.update(db.session.execute(
+                select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(new_names))).all())
+        ids = db.session.scalars(insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True),
+                                 recipe_rows).all()
+        db.session.execute(insert(RecipeIngredient), [
+            {"recipe_id": ids[row], "position": position, "ingredient_id": ingredient_ids[name], "label": label}
+            for row, position, name, label in link_rows
+        ])
+        db.session.commit()
+
+    recipe_rows = []
+    link_rows = []
+    for recipe in recipes:
+        row = {
+            "name": recipe["name"],
+            "description": recipe.get("description") or "",
+            "healthy": bool(recipe.get("healthy")),
+            "vegetarian": bool(recipe.get("vegetarian")),
+            "vegan": bool(recipe.get("vegan")),
+            "duration_minutes": int(recipe.get("duration_minutes") or 0),
+            "difficulty": recipe.get("difficulty") or "",
+            "difficulty_rank": DIFFICULTY_RANKS.get((recipe.get("difficulty") or "").lower(), 0),
+            "image_url": recipe.get("image_url"),
+            "source": recipe.get("source"),
+            "url": recipe.get("url"),
+        }
+        if recipe.get("id") is not None:
+            row["id"] = int(recipe["id"])
+        for position, label in enumerate(recipe.get("ingredients", [])):
+            link_rows.append((len(recipe_rows), position, label.lower(), label))
+        recipe_rows.append(row)
+        if len(recipe_rows) >= batch_size:
+            flush(recipe_rows, link_rows)
+            recipe_rows, link_rows = [], []
+    flush(recipe_rows, link_rows)
+    # Statistiken aktualisieren: ohne sie durchsucht SQLite alle Verknüpfungen statt zuerst
+    # die wenigen passenden Zutaten
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+    if db.engine.dialect.name == "postgresql":
+        # Nach Einträgen mit vorgegebener id die Sequenz nachziehen, sonst kollidieren spätere Einfügungen
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('recipes', 'id'), "
+                                "(SELECT COALESCE(MAX(id), 1) FROM recipes))"))
+        db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(Recipe))
+
+
+def encode_cursor(sort, value, last_id):
+    payload = json.dumps([sort, value, last_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidQuery("Ungültiger Cursor")
+    if cursor_sort != sort:
+        raise InvalidQuery("Cursor passt nicht zur Sortierung")
+    return value, int(last_id)
+
+
+def parse_sort(sort):
+    """Split "duration" / "-duration" into (key, descending)"""
+    sort = (sort or "id").strip()
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in SORT_KEYS:
+        raise InvalidQuery(f"Unbekannte Sortierung: {key} (erlaubt: {', '.join(SORT_KEYS)})")
+    return key, descending
+
+
+def parse_limit(limit):
+    if limit in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise InvalidQuery("limit muss eine Zahl sein")
+    if limit < 1:
+        raise InvalidQuery("limit muss mindestens 1 sein")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_recipes(recipes, sort="id", limit=None, cursor=None):
+    """
+    Sort and page an in-memory list of recipes like search_recipes does
+
+    Used when no recipe database is available.
+
+    Returns:
+        Tuple of (recipes of the page, cursor of the next page or None)
+    """
+    key, descending = parse_sort(sort)
+    limit = parse_limit(limit)
+
+    def sort_key(recipe):
+        if key == "duration":
+            return recipe.get("duration_minutes") or 0, recipe["id"]
+        if key == "difficulty":
+            return DIFFICULTY_RANKS.get((recipe.get("difficulty") or "").lower(), 0), recipe["id"]
+        return recipe["id"], recipe["id"]
+
+    ordered = sorted(recipes, key=sort_key, reverse=descending)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        position = (value, last_id)
+        ordered = [recipe for recipe in ordered
+                   if (sort_key(recipe) < position if descending else sort_key(recipe) > position)]
+    if len(ordered) <= limit:
+        return ordered, None
+    page = ordered[:limit]
+    return page, encode_cursor(sort, sort_key(page[-1])[0], page[-1]["id"])
+
+
+def _fulltext_filter(query):
+    # Nutzereingabe als Folge von Präfix-Begriffen (alle müssen vorkommen)
+    terms = [term for term in query.split() if term]
+    if not terms:
+        return None
+    if db.engine.dialect.name == "sqlite":
+        match = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        return Recipe.id.in_(text("SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH :fulltext")
+                             .bindparams(fulltext=match).columns(column("rowid", Integer)))
+    tsquery = " & ".join("{}:*".format(''.join(char for char in term if char.isalnum())) for term in terms
+                         if any(char.isalnum() for char in term))
+    if not tsquery:
+        return None
+    return text(f"{_POSTGRES_DOCUMENT} @@ to_tsquery('{FULLTEXT_CONFIG}', :tsquery)").bindparams(tsquery=tsquery)
+
+
+def search_recipes(ingredients=None, healthy=False, vegetarian=False, vegan=False, query=None,
+                   sort="id", limit=None, cursor=None):
+    """
+    Page through the recipe catalogue (inside an app context)
+
+    Ingredient matching keeps the semantics of the in-memory index: a query
+    ingredient matches every recipe ingredient that contains it, and a recipe
+    matches if any query ingredient does. The substring test only runs over
+    the distinct ingredient names; recipes are then found through the
+    (ingredient_id, recipe_id) index.
+
+    Args:
+        ingredients: Optional list of query ingredients (case-insensitive)
+        healthy: Only healthy recipes
+        vegetarian: Only vegetarian recipes
+        vegan: Only vegan recipes
+        query: Optional full-text query over names and descriptions
+        sort: "id", "duration" or "difficulty", prefixed with "-" for descending
+        limit: Page size (default RECIPES_PAGE_SIZE, at most RECIPES_MAX_PAGE_SIZE)
+        cursor: next_cursor of the previous page
+
+    Returns:
+        Tuple of (list of recipe dictionaries, cursor of the next page or None)
+
+    Raises:
+        InvalidQuery: For an unknown sort key, invalid limit or cursor
+    """
+    key, descending = parse_sort(sort)
+    limit = parse_limit(limit)
+    sort_column = {"id": Recipe.id, "duration": Recipe.duration_minutes, "difficulty": Recipe.difficulty_rank}[key]
+
+    statement = select(Recipe)
+    if ingredients:
+        patterns = []
+        for ingredient in ingredients:
+            escaped = ingredient.strip().lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            patterns.append(Ingredient.name.like(f"%{escaped}%", escape='\\'))
+        statement = statement.where(Recipe.id.in_(
+            select(RecipeIngredient.recipe_id).join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+            .where(or_(*patterns))))
+    if healthy:
+        statement = statement.where(Recipe.healthy.is_(True))
+    if vegetarian:
+        statement = statement.where(Recipe.vegetarian.is_(True))
+    if vegan:
+        statement = statement.where(Recipe.vegan.is_(True))
+    if query:
+        fulltext = _fulltext_filter(query)
+        if fulltext is not None:
+            statement = statement.where(fulltext)
+
+    # Keyset-Paginierung: (Sortierwert, id) des letzten Eintrags statt OFFSET
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if key == "id":
+            statement = statement.where(Recipe.id < last_id if descending else Recipe.id > last_id)
+        elif descending:
+            statement = statement.where(or_(sort_column < value, and_(sort_column == value, Recipe.id < last_id)))
+        else:
+            statement = statement.where(or_(sort_column > value, and_(sort_column == value, Recipe.id > last_id)))
+    order = [sort_column.desc(), Recipe.id.desc()] if descending else [sort_column, Recipe.id]
+    if key == "id":
+        order = order[:1]
+    rows = db.session.scalars(statement.order_by(*order).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        value = {"id": last.id, "duration": last.duration_minutes, "difficulty": last.difficulty_rank}[key]
+        next_cursor = encode_cursor(sort, value, last.id)
+
+    return _to_dicts(rows), next_cursor
+
+
+def get_recipes_by_ids(recipe_ids):
+    """
+    Load recipes by ID (inside an app context)
+
+    Returns:
+        Recipe dictionaries in the order of recipe_ids (unknown IDs are skipped)
+    """
+    if not recipe_ids:
+        return []
+    rows = {recipe.id: recipe for recipe in db.session.scalars(select(Recipe).where(Recipe.id.in_(recipe_ids)))}
+    return _to_dicts([rows[recipe_id] for recipe_id in recipe_ids if recipe_id in rows])
+
+
+def catalogue_signature():
+    """Number of recipes and highest ID; changes when recipes are imported or deleted"""
+    return tuple(db.session.execute(select(func.count(), func.max(Recipe.id)).select_from(Recipe)).one())
+
+
+def load_recipe_matrix():
+    """Build the recipe x ingredient matrix for ranking from the database (inside an app context)"""
+    recipe_rows = db.session.execute(
+        select(Recipe.id, Recipe.healthy, Recipe.vegetarian, Recipe.vegan).order_by(Recipe.id)).all()
+    ingredient_lists = {recipe_id: [] for recipe_id, _, _, _ in recipe_rows}
+    links = db.session.execute(
+        select(RecipeIngredient.recipe_id, Ingredient.name)
+        .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id))
+    for recipe_id, name in links:
+        if recipe_id in ingredient_lists:
+            ingredient_lists[recipe_id].append(name)
+    return RecipeMatrix([row[0] for row in recipe_rows], [ingredient_lists[row[0]] for row in recipe_rows],
+                        {"healthy": [row[1] for row in recipe_rows], "vegetarian": [row[2] for row in recipe_rows],
+                         "vegan": [row[3] for row in recipe_rows]})
+
+
+def _to_dicts(rows):
+    # Zutaten nur für die angeforderten Rezepte laden
+    ingredients_by_recipe = {}
+    if rows:
+        links = db.session.execute(
+            select(RecipeIngredient.recipe_id, RecipeIngredient.label)
+            .where(RecipeIngredient.recipe_id.in_([recipe.id for recipe in rows]))
+            .order_by(RecipeIngredient.recipe_id, RecipeIngredient.position))
+        for recipe_id, label in links:
+            ingredients_by_recipe.setdefault(recipe_id, []).append(label)
+    return [_to_dict(recipe, ingredients_by_recipe.get(recipe.id, [])) for recipe in rows]
+
+
+def _to_dict(recipe, ingredients):
+    return {
+        "id": recipe.id,
+        "name": recipe.name,
+        "ingredients": ingredients,
+        "healthy": recipe.healthy,
+        "vegetarian": recipe.vegetarian,
+        "vegan": recipe.vegan,
+        "image_url": recipe.image_url,
+        "duration_minutes": recipe.duration_minutes,
+        "difficulty": recipe.difficulty,
+        "source": recipe.source,
+        "url": recipe.url,
+        "description": recipe.description
+    }
+
+
+if __name__ == "__main__":
+    # Aufruf: python recipe_store.py import <rezepte.jsonl> [--database-url URL]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Load recipes into the recipe database")
+    parser.add_argument("command", choices=["import", "seed"],
+                        help="import: JSONL file with one recipe per line; seed: the built-in recipes")
+    parser.add_argument("path", nargs="?", help="JSONL file for import")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    args = parser.parse_args()
+
+    from flask import Flask
+    from recipe_index import RECIPES
+    store_app = Flask(__name__)
+    init_store(store_app, args.database_url)
+    with store_app.app_context():
+        if args.command == "seed":
+            total = import_recipes(RECIPES)
+        else:
+            if not args.path:
+                parser.error("import needs a JSONL file")
+            with open(args.path, encoding='utf-8') as f:
+                total = import_recipes(json.loads(line) for line in f if line.strip())
+    print(json.dumps({"recipes": total}))
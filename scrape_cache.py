@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from worker_pools import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Standardwerte, überschreibbar per Umgebungsvariable
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SCRAPE_CACHE_ENTRIES", "1024"))
+# Frische gescrapter Seiten bzw. fertiger Suchergebnisse (Sekunden)
+DEFAULT_PAGE_TTL = float(os.environ.get("SCRAPE_CACHE_PAGE_TTL", "3600"))
+DEFAULT_SEARCH_TTL = float(os.environ.get("SCRAPE_CACHE_SEARCH_TTL", "900"))
+# So lange nach Ablauf der TTL wird ein Eintrag noch ausgeliefert und dabei im Hintergrund erneuert
+DEFAULT_STALE_SECONDS = float(os.environ.get("SCRAPE_CACHE_STALE", "21600"))
+# Gemeinsame SQLite-Datei für alle Worker-Prozesse (leer: nur prozesslokaler Cache)
+DEFAULT_DB_PATH = os.environ.get("SCRAPE_CACHE_DB", "")
+# Threads für Hintergrund-Aktualisierungen (pro Prozess)
+DEFAULT_REFRESH_WORKERS = int(os.environ.get("SCRAPE_CACHE_REFRESH_WORKERS", "2"))
+
+# Abgelaufene Zeilen der SQLite-Datei nach so vielen Schreibvorgängen entfernen
+_PURGE_EVERY = 200
+
+
+def normalize_key(text):
+    """Cache key for a search term: lowercased, whitespace collapsed"""
+    return ' '.join(str(text).lower().split())
+
+
+class SqliteTier:
+    """
+    Shared second cache level in an SQLite file
+
+    All worker processes use the same file, so a page scraped by one worker
+    is a hit for the others. Expiry times are wall-clock timestamps for the
+    same reason. Connections are kept per thread and process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS scrape_cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    stale_until REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+    def _connection(self):
+        pid = os.getpid()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != pid:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+    def get(self, namespace, key):
+        """Tuple (payload, fresh_until, stale_until) or None"""
+        row = self._connection().execute(
+            "SELECT value, fresh_until, stale_until FROM scrape_cache WHERE namespace = ? AND key = ?",
+            (namespace, key)).fetchone()
+        return tuple(row) if row is not None and row[2] > time.time() else None
+
+    def put(self, namespace, key, payload, fresh_until, stale_until):
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO scrape_cache VALUES (?, ?, ?, ?, ?)",
+                               (namespace, key, payload, fresh_until, stale_until))
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                connection.execute("DELETE FROM scrape_cache WHERE stale_until <= ?", (time.time(),))
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def get_sqlite_tier(path):
+    """Shared SqliteTier per file (None if path is empty or the file cannot be opened)"""
+    if not path:
+        return None
+    with _tiers_lock:
+        if path not in _tiers:
+            try:
+                _tiers[path] = SqliteTier(path)
+            except sqlite3.Error as e:
+                logger.warning(f"Scrape cache database {path} not available: {str(e)}")
+                _tiers[path] = None
+        return _tiers[path]
+
+
+class ScrapeCache:
+    """
+    Two-level TTL cache for scraped pages and search results
+
+    The first level is an in-process LRU, the optional second level an
+    SQLite file shared by all workers. Entries are fresh for ttl seconds;
+    for stale_seconds after that they are still returned, and a single
+    background refresh per key loads the new value. Concurrent misses for
+    the same key wait for one load instead of scraping in parallel. Values
+    are stored as JSON, so callers always get an independent copy.
+    """
+
+    def __init__(self, namespace, ttl_seconds, stale_seconds=DEFAULT_STALE_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, db_path=DEFAULT_DB_PATH):
+        """
+        Args:
+            namespace: Name of the cache (separates the entries in the shared file)
+            ttl_seconds: Seconds an entry is fresh
+            stale_seconds: Seconds after that an entry is served while it is refreshed
+            max_entries: Size of the in-process LRU
+            db_path: SQLite file of the shared level ("" to disable)
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.shared = get_sqlite_tier(db_path)
+
+        self._lock = threading.Lock()
+        # key -> (json_value, fresh_until, stale_until)
+        self._entries = OrderedDict()
+        # key -> Future der laufenden Ladevorgänge
+        self._loading = {}
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _store_local(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, key, now):
+        # Erst prozesslokal, dann die gemeinsame Datei
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] > now:
+            self._entries.move_to_end(key)
+            return entry, False
+        if entry is not None:
+            del self._entries[key]
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(self.namespace, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Scrape cache lookup failed: {str(e)}")
+                entry = None
+            if entry is not None:
+                self._store_local(key, entry)
+                return entry, True
+        return None, False
+
+    def put(self, key, value):
+        """Store a JSON-serializable value in both levels"""
+        if not self.enabled:
+            return
+        now = time.time()
+        entry = (json.dumps(value, separators=(',', ':')), now + self.ttl_seconds,
+                 now + self.ttl_seconds + self.stale_seconds)
+        with self._lock:
+            self._store_local(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.put(self.namespace, key, *entry)
+            except sqlite3.Error as e:
+                logger.warning(f"Scrape cache write failed: {str(e)}")
+
+    def _load(self, key, loader, cacheable):
+        value = loader()
+        if cacheable(value):
+            self.put(key, value)
+        return value
+
+    def _refresh(self, key, loader, cacheable, future):
+        try:
+            self._load(key, loader, cacheable)
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning(f"Background refresh of {self.namespace} entry '{key}' failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_result(None)
+
+    def get_or_load(self, key, loader, cacheable=bool):
+        """
+        Return the cached value for key, loading it on a miss
+
+        Args:
+            key: Cache key (see normalize_key)
+            loader: Callable without arguments that produces the value
+            cacheable: Callable deciding whether a loaded value is stored
+                (by default empty values such as failed downloads are not)
+
+        Returns:
+            The value (possibly stale, while a refresh runs in the background)
+        """
+        if not self.enabled:
+            return loader()
+
+        now = time.time()
+        with self._lock:
+            entry, shared = self._lookup(key, now)
+            if entry is not None:
+                payload, fresh_until, _ = entry
+                if fresh_until > now:
+                    if shared:
+                        self.shared_hits += 1
+                    else:
+                        self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if key not in self._loading:
+                        self.refreshes += 1
+                        future = self._loading[key] = Future()
+                        get_pool('scrape-cache-refresh', DEFAULT_REFRESH_WORKERS).submit(
+                            self._refresh, key, loader, cacheable, future)
+                return json.loads(payload)
+
+            self.misses += 1
+            waiting = self._loading.get(key)
+            if waiting is None:
+                future = self._loading[key] = Future()
+
+        if waiting is not None:
+            # Ein anderer Thread lädt denselben Schlüssel gerade; dessen Ergebnis abwarten
+            waiting.result()
+            with self._lock:
+                entry, _ = self._lookup(key, time.time())
+            if entry is not None:
+                return json.loads(entry[0])
+            return loader()
+
+        try:
+            return self._load(key, loader, cacheable)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_result(None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self):
+        """Return cache counters and size as a dictionary"""
+        with self._lock:
+            hits = self.hits + self.shared_hits + self.stale_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'evictions': self.evictions,
+                'shared': self.shared is not None
+            }
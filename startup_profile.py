@@ -0,0 +1,280 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Pfad der JSON-Ausgabe, aktiviert das Startprofil; "{pid}" wird durch die Prozess-ID ersetzt
+PROFILE_PATH = os.environ.get("STARTUP_PROFILE", "")
+
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+
+def _rss_kb():
+    # Aktueller RSS aus /proc/self/statm (schnell genug für jeden Import)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    except (OSError, IndexError, ValueError):
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+class StartupProfile:
+    """
+    Records where a process spends its startup time
+
+    Import timing works like ``python -X importtime``: every module's
+    execution is timed, with the time of nested imports counted separately
+    (self) and included (cumulative). The resident memory before and after
+    each import is recorded as well. On top of that, named phases (model
+    load, warm-up) and the latency of the first request per endpoint are
+    collected. Everything is written as one JSON report.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_rss_kb = _rss_kb()
+        self.modules = {}
+        self.phases = {}
+        self.first_requests = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finder = None
+
+    def install(self):
+        """Start timing imports (adds a finder in front of sys.meta_path)"""
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+        return self
+
+    def uninstall(self):
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _timed_exec(self, exec_module, module):
+        stack = self._stack()
+        # [Name, Start, Zeit der verschachtelten Importe]
+        frame = [module.__name__, time.perf_counter(), 0.0]
+        rss_before = _rss_kb()
+        stack.append(frame)
+        try:
+            exec_module(module)
+        finally:
+            stack.pop()
+            cumulative = time.perf_counter() - frame[1]
+            if stack:
+                stack[-1][2] += cumulative
+            with self._lock:
+                self.modules[frame[0]] = {
+                    'self_ms': round((cumulative - frame[2]) * 1000.0, 3),
+                    'cumulative_ms': round(cumulative * 1000.0, 3),
+                    'rss_delta_kb': _rss_kb() - rss_before,
+                    'parent': stack[-1][0] if stack else None,
+                    'thread': threading.current_thread().name,
+                    'at_ms': round((frame[1] - self.started) * 1000.0, 3)
+                }
+
+    def record_phase(self, name, seconds, **details):
+        """Record the duration of a startup phase (e.g. model load) and write the report"""
+        with self._lock:
+            self.phases[name] = {'seconds': round(seconds, 4),
+                                 'at_ms': round((time.perf_counter() - self.started) * 1000.0, 3), **details}
+        self.write()
+
+    def attach(self, app):
+        """Measure the latency of the first request per endpoint of a Flask app"""
+        from flask import g, request
+
+        @app.before_request
+        def _profile_request_start():
+            g.startup_profile_started = time.perf_counter()
+
+        @app.after_request
+        def _profile_request_end(response):
+            started = getattr(g, 'startup_profile_started', None)
+            endpoint = request.endpoint or request.path
+            if started is not None and endpoint not in self.first_requests:
+                now = time.perf_counter()
+                with self._lock:
+                    self.first_requests.setdefault(endpoint, {
+                        'latency_ms': round((now - started) * 1000.0, 3),
+                        'status': response.status_code,
+                        'since_start_ms': round((now - self.started) * 1000.0, 3),
+                        'pid': os.getpid()
+                    })
+                self.write()
+            return response
+
+        return app
+
+    def report(self, top=40):
+        """
+        Aggregate the collected data
+
+        Args:
+            top: Number of modules listed individually (slowest cumulative first)
+
+        Returns:
+            JSON-serializable dictionary
+        """
+        with self._lock:
+            modules = dict(self.modules)
+            phases = dict(self.phases)
+            first_requests = dict(self.first_requests)
+
+        # Nach oberstem Paket zusammenfassen (Eigenzeit, damit nichts doppelt zählt)
+        packages = {}
+        for name, entry in modules.items():
+            package = packages.setdefault(name.split('.')[0], {'modules': 0, 'self_ms': 0.0, 'rss_delta_kb': 0})
+            package['modules'] += 1
+            package['self_ms'] += entry['self_ms']
+            if entry['parent'] is None or entry['parent'].split('.')[0] != name.split('.')[0]:
+                # Nur die Einstiegs-Importe eines Pakets, sonst würde der Speicher mehrfach gezählt
+                package['rss_delta_kb'] += entry['rss_delta_kb']
+        for package in packages.values():
+            package['self_ms'] = round(package['self_ms'], 3)
+
+        slowest = sorted(modules.items(), key=lambda item: item[1]['cumulative_ms'], reverse=True)[:top]
+        return {
+            'pid': os.getpid(),
+            'python': sys.version.split()[0],
+            'elapsed_ms': round((time.perf_counter() - self.started) * 1000.0, 3),
+            'rss_start_kb': self.started_rss_kb,
+            'rss_kb': _rss_kb(),
+            'imports': {
+                'modules': len(modules),
+                'total_ms': round(sum(entry['self_ms'] for entry in modules.values()), 3),
+                'packages': dict(sorted(packages.items(), key=lambda item: item[1]['self_ms'], reverse=True)),
+                'slowest': [{'module': name, **entry} for name, entry in slowest]
+            },
+            'phases': phases,
+            'first_requests': first_requests
+        }
+
+    def write(self):
+        """Write the report to the configured path (atomically, per process)"""
+        if not self.path:
+            return
+        path = self.path.replace('{pid}', str(os.getpid()))
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write startup profile {path}: {str(e)}")
+
+
+class _TimingFinder:
+    """Meta path finder that only wraps the loaders found by the other finders"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._local, 'busy', False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.busy = False
+
+        loader = spec.loader
+        # Nur Loader-Instanzen je Modul umhüllen (nicht geteilte Klassen wie BuiltinImporter)
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, 'exec_module') \
+                and 'exec_module' not in vars(loader):
+            exec_module = loader.exec_module
+            try:
+                loader.exec_module = lambda module: self.profile._timed_exec(exec_module, module)
+            except (AttributeError, TypeError):
+                pass
+        return spec
+
+
+_active = None
+
+
+def enable(path):
+    """Start the process-wide startup profile (only the first call has an effect)"""
+    global _active
+    if _active is None:
+        _active = StartupProfile(path).install()
+    return _active
+
+
+def install_from_env():
+    """Enable the startup profile if STARTUP_PROFILE is set (call before heavy imports)"""
+    if not PROFILE_PATH:
+        return None
+    logger.info(f"Startup profile enabled, writing to {PROFILE_PATH}")
+    return enable(PROFILE_PATH)
+
+
+def active():
+    """The running profile, or None"""
+    return _active
+
+
+def record_phase(name, seconds, **details):
+    """Record a startup phase if profiling is enabled (no-op otherwise)"""
+    if _active is not None:
+        _active.record_phase(name, seconds, **details)
+
+
+def imports_done():
+    """Mark the end of the import phase and write the report"""
+    if _active is not None:
+        _active.record_phase('imports', time.perf_counter() - _active.started)
+
+
+if __name__ == "__main__":
+    # Aufruf: python startup_profile.py [--module main] [--wait-model] [--request /pfad ...]
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Profile imports, model load and first requests of the app")
+    parser.add_argument("--module", default="main", help="Module that creates the Flask app")
+    parser.add_argument("--output", default="", help="Also write the JSON report to this file")
+    parser.add_argument("--wait-model", action="store_true", help="Wait until the image recognizer is ready")
+    parser.add_argument("--request", action="append", default=[], help="GET path to request once (repeatable)")
+    parser.add_argument("--top", type=int, default=40, help="Number of modules listed individually")
+    args = parser.parse_args()
+
+    # Über den Modulnamen importieren, damit die App dasselbe Profil-Objekt sieht wie dieses Skript
+    import startup_profile
+    profile = startup_profile.enable(args.output)
+    module = __import__(args.module)
+    startup_profile.imports_done()
+
+    if args.wait_model:
+        import app as app_module
+        app_module.image_recognizer.wait()
+    client = module.app.test_client()
+    for request_path in args.request:
+        client.get(request_path)
+
+    profile.uninstall()
+    profile.write()
+    print(json.dumps(profile.report(args.top), indent=2))
@@ -0,0 +1,90 @@
+import gzip
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import HttpClient
+
+PAGE = b"<html><body><h1>Kartoffelsuppe</h1></body></html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, damit die Verbindung offen bleibt (Keep-Alive)
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/page":
+            self._send(200, PAGE)
+        elif self.path == "/gzip":
+            self._send(200, gzip.compress(PAGE), {"Content-Encoding": "gzip"})
+        elif self.path == "/large":
+            self._send(200, b"x" * (2 * 1024 * 1024))
+        elif self.path == "/slow":
+            time.sleep(3)
+            self._send(200, PAGE)
+        else:
+            self._send(404, b"not found")
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.client = HttpClient(connect_timeout=1, read_timeout=1, max_bytes=1024 * 1024)
+
+    def test_connection_is_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.fetch(f"{self.base_url}/page"), PAGE)
+        metrics = self.client.get_metrics()
+        self.assertEqual(metrics['requests'], 5)
+        self.assertEqual(metrics['hosts'], 1)
+        self.assertEqual(metrics['connections'], 1)
+
+    def test_gzip_is_decoded(self):
+        self.assertEqual(self.client.fetch(f"{self.base_url}/gzip"), PAGE)
+
+    def test_large_response_is_rejected(self):
+        self.assertIsNone(self.client.fetch(f"{self.base_url}/large"))
+        self.assertEqual(self.client.get_metrics()['too_large'], 1)
+
+    def test_not_found_returns_none(self):
+        self.assertIsNone(self.client.fetch(f"{self.base_url}/missing"))
+        self.assertEqual(self.client.get_metrics()['errors'], 1)
+
+    def test_read_timeout(self):
+        started = time.monotonic()
+        self.assertIsNone(self.client.fetch(f"{self.base_url}/slow"))
+        self.assertLess(time.monotonic() - started, 2.5)
+        self.assertEqual(self.client.get_metrics()['errors'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasickMatcher:
+    """
+    Case-insensitive multi-term matcher (Aho-Corasick automaton)
+
+    The automaton is built once from all terms; afterwards every occurrence
+    of every term is found in a single pass over the text, independent of the
+    number of terms.
+    """
+
+    def __init__(self, terms):
+        """
+        Build the automaton
+
+        Args:
+            terms: Mapping of term -> value (or iterable of (term, value) pairs).
+                The order is kept and decides ties in best_match().
+        """
+        items = terms.items() if hasattr(terms, 'items') else terms
+        self.terms = []
+        self.values = []
+        self._lengths = []
+
+        # Zustand 0 ist die Wurzel; pro Zustand Übergänge, Fehlerlink und gefundene Begriffe
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for term, value in items:
+            pattern = term.lower()
+            if not pattern:
+                continue
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self.values.append(value)
+            self._lengths.append(len(pattern))
+
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (term_id,)
+
+        self._build_failure_links()
+        logger.debug("Built matcher with %d terms and %d states", len(self.terms), len(self._goto))
+
+    def _build_failure_links(self):
+        # Breitensuche: Fehlerlinks zeigen auf den längsten echten Suffix, der ebenfalls ein Präfix ist
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Begriffe des Suffix-Zustands mit übernehmen, damit die Suche keine Links verfolgen muss
+                if self._output[self._fail[next_state]]:
+                    self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def tables(self):
+        """
+        Return the automaton as plain lists, e.g. to serialize it
+
+        Returns:
+            Tuple of (transitions, failure links, outputs, pattern lengths). Outputs
+            of a state already include the terms of its failure chain.
+        """
+        return self._goto, self._fail, self._output, self._lengths
+
+    def find_all(self, text):
+        """
+        Find all term occurrences in a text
+
+        Args:
+            text: Text to search
+
+        Yields:
+            Tuples of (start, end, term_id) with positions in text.lower()
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for position, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for term_id in output[state]:
+                yield position + 1 - self._lengths[term_id], position + 1, term_id
+
+    def matched_ids(self, text):
+        """Return the IDs of all terms contained in the text"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def best_match(self, text, score):
+        """
+        Return the value of the best-scoring term contained in the text
+
+        Args:
+            text: Text to search
+            score: Callable (term, value) -> number; only scores above 0 count
+
+        Returns:
+            Value of the best term or None. On equal scores the term that came
+            first in the mapping wins.
+        """
+        best_value = None
+        best_score = 0
+        for term_id in sorted(self.matched_ids(text)):
+            term_score = score(self.terms[term_id], self.values[term_id])
+            if term_score > best_score:
+                best_score = term_score
+                best_value = self.values[term_id]
+        return best_value
@@ -0,0 +1,194 @@
+import os
+import re
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Arbeitsauflösung der Erkennung (längste Seite in Pixeln)
+DETECTION_SIDE = int(os.environ.get("TEXT_REGION_SIDE", "800"))
+# Decken die Regionen mehr als diesen Anteil des Bildes ab, lohnt sich das Zuschneiden nicht
+MAX_REGION_COVERAGE = float(os.environ.get("TEXT_REGION_MAX_COVERAGE", "0.6"))
+
+# Heuristik für Datumsangaben im OCR-Text einer Region (z.B. "MHD 12.03.2025", "03/25")
+DATE_LIKE_PATTERN = re.compile(
+    r'\d{1,2}\s*[./-]\s*\d{1,2}\s*[./-]\s*\d{2,4}'
+    r'|\d{1,2}\s*[./-]\s*\d{4}'
+    r'|\b(?:mhd|mindestens|haltbar|verbrauchen|exp|best before)\b',
+    re.IGNORECASE
+)
+
+
+def looks_like_date(text):
+    """Check whether OCR text of a region plausibly contains a date"""
+    return bool(text) and DATE_LIKE_PATTERN.search(text) is not None
+
+
+def _connected_boxes(mask):
+    """
+    Bounding boxes of the 8-connected components of a boolean mask
+
+    Works on horizontal runs per row (union-find over overlapping runs of
+    neighbouring rows), which keeps the Python loop proportional to the
+    number of runs instead of the number of pixels.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    changes = np.diff(padded, axis=1)
+    starts_y, starts_x = np.nonzero(changes == 1)
+    _, ends_x = np.nonzero(changes == -1)
+
+    parent = list(range(len(starts_x)))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    rows = {}
+    for run, y in enumerate(starts_y.tolist()):
+        rows.setdefault(y, []).append(run)
+
+    starts = starts_x.tolist()
+    ends = ends_x.tolist()
+    for y, runs in rows.items():
+        above = rows.get(y - 1)
+        if not above:
+            continue
+        index = 0
+        for run in runs:
+            # Läufe der Zeile darüber, die sich (diagonal eingeschlossen) überlappen
+            while index < len(above) and ends[above[index]] < starts[run]:
+                index += 1
+            other = index
+            while other < len(above) and starts[above[other]] <= ends[run]:
+                root_a, root_b = find(run), find(above[other])
+                if root_a != root_b:
+                    parent[root_a] = root_b
+                other += 1
+
+    boxes = {}
+    for run, y in enumerate(starts_y.tolist()):
+        root = find(run)
+        box = boxes.get(root)
+        if box is None:
+            boxes[root] = [starts[run], y, ends[run], y + 1]
+        else:
+            box[0] = min(box[0], starts[run])
+            box[1] = min(box[1], y)
+            box[2] = max(box[2], ends[run])
+            box[3] = max(box[3], y + 1)
+    return [tuple(box) for box in boxes.values()]
+
+
+def _box_filter_1d(mask, width, axis):
+    # Horizontale/vertikale Dilatation über kumulierte Summen (ohne SciPy)
+    counts = np.cumsum(mask, axis=axis, dtype=np.int32)
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (1, 0)
+    counts = np.pad(counts, pad)
+    half = width // 2
+    size = mask.shape[axis]
+    upper = np.clip(np.arange(size) + half + 1, 0, size)
+    lower = np.clip(np.arange(size) - half, 0, size)
+    if axis == 1:
+        return (counts[:, upper] - counts[:, lower]) > 0
+    return (counts[upper, :] - counts[lower, :]) > 0
+
+
+def _merge_boxes(boxes):
+    # Überlappende Rechtecke zusammenfassen, bis sich nichts mehr ändert
+    boxes = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        while boxes:
+            left, top, right, bottom = boxes.pop()
+            for index, (l2, t2, r2, b2) in enumerate(result):
+                if left < r2 and l2 < right and top < b2 and t2 < bottom:
+                    result[index] = (min(left, l2), min(top, t2), max(right, r2), max(bottom, b2))
+                    merged = True
+                    break
+            else:
+                result.append((left, top, right, bottom))
+        boxes = result
+    return boxes
+
+
+def detect_text_regions(img, detection_side=DETECTION_SIDE, min_height=6, max_height_ratio=0.25,
+                        margin=0.35):
+    """
+    Find candidate text regions (labels, date prints) in a photo
+
+    Text shows up as dense, short vertical edges next to each other. The
+    horizontal gradient is thresholded, characters are joined into lines by
+    a horizontal dilation, and the connected components that are shaped
+    like text lines are kept.
+
+    Args:
+        img: PIL Image object (any mode)
+        detection_side: Longest side used for the detection
+        min_height: Minimum line height in detection pixels
+        max_height_ratio: Maximum line height relative to the image height
+        margin: Padding around each region relative to its height
+
+    Returns:
+        List of (left, top, right, bottom) boxes in the coordinates of img,
+        sorted top to bottom, left to right
+    """
+    gray = img.convert('L')
+    scale = min(1.0, detection_side / max(gray.size))
+    if scale < 1.0:
+        gray = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    height, width = pixels.shape
+    if height < min_height * 2 or width < min_height * 2:
+        return []
+
+    # Horizontaler Gradient: Buchstaben erzeugen viele senkrechte Kanten
+    gradient = np.abs(np.diff(pixels, axis=1))
+    threshold = max(24.0, float(gradient.mean() + 2.0 * gradient.std()))
+    edges = np.zeros((height, width), dtype=bool)
+    edges[:, 1:] = gradient > threshold
+
+    # Buchstaben zu Zeilen verbinden (horizontal), dann leicht vertikal schließen
+    joined = _box_filter_1d(edges, max(3, width // 60), axis=1)
+    joined = _box_filter_1d(joined, 3, axis=0)
+
+    boxes = []
+    max_height = max(min_height + 1, int(height * max_height_ratio))
+    for left, top, right, bottom in _connected_boxes(joined):
+        line_height = bottom - top
+        line_width = right - left
+        if line_height < min_height or line_height > max_height:
+            continue
+        # Textzeilen sind breiter als hoch
+        if line_width < line_height * 1.5:
+            continue
+        # Einzelne Kanten (z.B. Regalböden, Verpackungsränder) haben kaum Kantendichte in der Fläche
+        density = edges[top:bottom, left:right].mean()
+        if density < 0.05 or density > 0.6:
+            continue
+        pad = int(line_height * margin) + 1
+        boxes.append((max(0, left - pad), max(0, top - pad), min(width, right + pad), min(height, bottom + pad)))
+
+    boxes = _merge_boxes(boxes)
+    factor = 1.0 / scale
+    original_width, original_height = img.size
+    boxes = [(int(left * factor), int(top * factor),
+              min(original_width, int(np.ceil(right * factor))), min(original_height, int(np.ceil(bottom * factor))))
+             for left, top, right, bottom in boxes]
+    boxes.sort(key=lambda box: (box[1], box[0]))
+    return boxes
+
+
+def region_coverage(boxes, size):
+    """Fraction of the image area covered by the boxes (merged boxes do not overlap)"""
+    width, height = size
+    if not width or not height:
+        return 0.0
+    return min(1.0, sum((right - left) * (bottom - top) for left, top, right, bottom in boxes) / (width * height))
@@ -0,0 +1,39 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Gemeinsame Thread-Pools pro Prozess (Name -> (PID, Executor))
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(name, max_workers):
+    """
+    Return a shared, bounded thread pool
+
+    Pools are created on first use and recreated after fork(), because the
+    threads of a pool created in the gunicorn master do not exist in the
+    workers.
+
+    Args:
+        name: Name of the pool (also used as thread name prefix)
+        max_workers: Maximum number of threads of the pool
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor
+    """
+    pid = os.getpid()
+    entry = _pools.get(name)
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+
+    with _lock:
+        entry = _pools.get(name)
+        if entry is None or entry[0] != pid:
+            executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix=name)
+            _pools[name] = (pid, executor)
+            logger.debug("Created thread pool %s with %d workers", name, executor._max_workers)
+        return _pools[name][1]